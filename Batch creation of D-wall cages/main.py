@@ -0,0 +1,18 @@
+import os
+import sys
+
+# Shared helpers live in the 'lib' folder next to the script folders
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lib'))
+# First of the dwall modules: it references the Revit assemblies
+from dwall.bootstrap import get_document
+from dwall.batch import STAGES, run_batch
+from dwall.instrument import profile_run
+
+# Initialize document
+doc = get_document(__revit__)
+
+# Build layers A/B/D/E, the EX-links and their mirrored and copied sets for every
+# 'D-wall panel' wall of the model. Each panel is one undo step.
+# With DWALL_PROFILE set to a folder, the time of the API calls is written there.
+with profile_run("Batch creation", globals()):
+    run_batch(doc, STAGES)
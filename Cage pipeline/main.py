@@ -0,0 +1,46 @@
+import os
+import sys
+
+# Shared helpers live in the 'lib' folder next to the script folders
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lib'))
+# First of the dwall modules: it references the Revit assemblies
+from dwall.bootstrap import get_document
+from dwall.exlink import COPY_CHUNK_SIZE
+from dwall.instrument import profile_run
+from dwall.pipeline import DEFAULT_STAGES, run_pipeline
+from dwall.spec import SpecError, load_spec, validate
+
+# Stages to run, any of 'layers', 'ex-link', 'mirror', 'copy', 'data mapping'; they
+# always run in that order. Panels that already have a stage's bars are skipped.
+stages = list(DEFAULT_STAGES)
+
+# Array the EX-links as rebar sets (True) or copy them level by level (False), in
+# transactions of copy_chunk_size levels
+use_layout_rule = True
+copy_chunk_size = COPY_CHUNK_SIZE
+
+# Derive the unit weight of every bar type from its diameter
+derive_all_weights = False
+
+# Access the document
+doc = get_document(__revit__)
+
+# Cage specification (JSON, or YAML when PyYAML is available)
+spec_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'specs', 'd_wall_panel.json')
+
+try:
+    spec = load_spec(spec_path)
+    validate(spec)
+except SpecError as e:
+    spec = None
+    print(str(e))
+
+# All the stages share one lookup cache and ledger and are one undo step.
+# With DWALL_PROFILE set to a folder, the time of the API calls is written there.
+if spec is not None:
+    with profile_run("Cage pipeline", globals()):
+        try:
+            run_pipeline(doc, stages, spec, use_layout=use_layout_rule, chunk_size=copy_chunk_size,
+                         derive_all_weights=derive_all_weights)
+        except RuntimeError as e:
+            print("Nothing was changed, {}.".format(str(e)))
@@ -0,0 +1,57 @@
+import os
+import sys
+
+# Shared helpers live in the 'lib' folder next to the script folders
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lib'))
+# First of the dwall modules: it references the Revit assemblies
+from dwall.bootstrap import get_document
+from dwall.adapter import panel_parameters
+from dwall.clash import check_plan, print_violations
+from dwall.geometry import Panel
+from dwall.incremental import sync_plan
+from dwall.instrument import profile_run
+from dwall.ledger import get_ledger
+from dwall.lookup import get_lookup
+from dwall.plancache import PlanCache, spec_key
+from dwall.spec import SpecError, compile_spec, load_spec, with_panel
+
+# Check every distinct plan for clashes, clear spacing and cover before syncing
+check_clashes = True
+
+# Access the document
+doc = get_document(__revit__)
+
+# Cage specification (JSON, or YAML when PyYAML is available)
+spec_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'specs', 'd_wall_panel.json')
+
+try:
+    spec = load_spec(spec_path)
+    compile_spec(spec)
+except SpecError as e:
+    spec = None
+    print(str(e))
+
+# With DWALL_PROFILE set to a folder, the time of the API calls is written there
+with profile_run("Cage from specification", globals()):
+    if spec is not None:
+        # Panels with the same length and thickness share one cached plan; bars already in a
+        # panel are matched to its plan and only the differences are applied
+        cache = PlanCache()
+        panels = get_lookup(doc).walls(spec["host"])
+        if not panels:
+            print("No '{}' walls found.".format(spec["host"]))
+        plans, checked = [], set()
+        for wall in panels:
+            panel_spec = with_panel(spec, panel_parameters(wall, Panel(**spec["panel"])))
+            plan, hit = cache.get_or_compile(panel_spec)
+            plans.append((wall, plan))
+            # Panels sharing a plan share its problems, so each plan is checked once
+            key = spec_key(panel_spec)
+            if check_clashes and key not in checked:
+                checked.add(key)
+                print_violations(check_plan(plan), wall.Id.IntegerValue)
+        print("{} plans reused from the cache, {} compiled.".format(cache.hits, cache.misses))
+        for wall, plan in plans:
+            sync_plan(doc, plan, wall)
+        # Once for the whole run, not per panel
+        get_ledger(doc).save()
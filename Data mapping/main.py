@@ -1,45 +1,31 @@
-import clr
-clr.AddReference('RevitAPI')
-clr.AddReference('RevitAPIUI')
-from Autodesk.Revit.DB import FilteredElementCollector, ElementType, Transaction, UnitUtils, ForgeTypeId
+import os
+import sys
 
-# Define your mapping of rebar types to unit weights here (in kg/m)
-unit_weight_mapping = {
-    'H40': 9.864,
-    'H32': 6.313,
-    'H25': 3.854,
-    'H20': 2.470,
-    'H16': 1.580,
-    'H13': 1.040,
-    # ... include other rebar types and their unit weights as needed
-}
+# Shared helpers live in the 'lib' folder next to the script folders
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lib'))
+# First of the dwall modules: it references the Revit assemblies
+from dwall.bootstrap import get_document
+from dwall.lookup import get_lookup
+from dwall.params import sync_parameter
+from dwall.takeoff import bar_type_unit_weights
 
-# Get the current document (the open Revit model)
-doc = __revit__.ActiveUIDocument.Document
-
-# Start a transaction to modify the model
-t = Transaction(doc, 'Update Rebar Unit Weights')
-t.Start()
-
-try:
-    element_types = FilteredElementCollector(doc).OfClass(ElementType)
-    for element_type in element_types:
-        type_name = element_type.Name
-        if type_name in unit_weight_mapping:
-            print("Found rebar type: " + type_name)
+from Autodesk.Revit.DB import UnitTypeId
 
-            # Get the unit weight in kg/m from the mapping and convert it to internal units
-            unit_weight_internal_units = UnitUtils.ConvertToInternalUnits(unit_weight_mapping[type_name], UnitTypeId.KilogramsPerMeter)
+# The unit weights in kg/m of H40, H32, H25, H20, H16 and H13 come from the table in
+# dwall.takeoff (UNIT_WEIGHTS); any other bar type gets rho * pi * d^2 / 4 of its
+# nominal diameter, so new bar types need no table entry.
+# Set to True to derive the weight of every bar type from its diameter.
+derive_all_weights = False
 
-            param = element_type.LookupParameter('Unit weight')
-            if param is not None:
-                # Set the value of the shared parameter in internal units
-                param.Set(unit_weight_internal_units)
-                print("Set unit weight for " + type_name + " to: " + str(unit_weight_internal_units) + " internal units")
-
-    t.Commit()
-except Exception as e:
-    t.RollBack()
-    print("Error: " + str(e))
+# Get the current document (the open Revit model)
+doc = get_document(__revit__)
 
+# The bar types from the lookup cache of this run
+bar_types = get_lookup(doc).elements('bar type')
+unit_weights = bar_type_unit_weights(bar_types, derive_all_weights)
+for bar_type, unit_weight in zip(bar_types, unit_weights):
+    print("Unit weight of {}: {:.3f} kg/m".format(bar_type.Name, unit_weight))
 
+# One transaction, and only for the types whose stored unit weight differs
+sync_parameter(doc, bar_types, 'Unit weight', unit_weights, UnitTypeId.KilogramsPerMeter,
+               'Update Rebar Unit Weights')
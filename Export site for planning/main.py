@@ -0,0 +1,39 @@
+import os
+import sys
+
+# Shared helpers live in the 'lib' folder next to the script folders
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lib'))
+# First of the dwall modules: it references the Revit assemblies
+from dwall.bootstrap import get_document
+from dwall.adapter import panel_parameters
+from dwall.lookup import get_lookup
+from dwall.planner import save_site
+from dwall.spec import SpecError, load_spec, validate
+
+# Access the document
+doc = get_document(__revit__)
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+spec_path = os.path.join(root, 'specs', 'd_wall_panel.json')
+
+# Site file for the headless planner, planned on any machine with
+#     python -m dwall.planner plans/site.json plans/site.dwop
+# and replayed with the 'Replay operation log' script
+site_path = os.path.join(root, 'plans', 'site.json')
+
+try:
+    spec = load_spec(spec_path)
+    host, panel = validate(spec)[:2]
+except SpecError as e:
+    spec = None
+    print(str(e))
+
+if spec is not None:
+    walls = get_lookup(doc).walls(host)
+    if not walls:
+        print("No '{}' walls found.".format(host))
+    else:
+        if not os.path.isdir(os.path.dirname(site_path)):
+            os.makedirs(os.path.dirname(site_path))
+        save_site(site_path, spec, [(wall.Id.IntegerValue, panel_parameters(wall, panel)) for wall in walls])
+        print("{} panels written to {}".format(len(walls), site_path))
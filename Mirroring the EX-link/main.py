@@ -1,53 +1,19 @@
-import clr
-
-clr.AddReference('RevitAPI')
-clr.AddReference('RevitServices')
-
-from Autodesk.Revit.DB import FilteredElementCollector, Transaction, Plane, XYZ, ElementTransformUtils
-from Autodesk.Revit.DB.Structure import Rebar, RebarBarType
-from System.Collections.Generic import List
-from RevitServices.Persistence import DocumentManager
-
-doc = __revit__.ActiveUIDocument.Document
-
-
-def find_rebars_by_type(doc, type_name):
-    rebar_types = FilteredElementCollector(doc).OfClass(RebarBarType).ToElements()
-    target_type_id = None
-    for rebar_type in rebar_types:
-        if rebar_type.Name == type_name:
-            target_type_id = rebar_type.Id
-            break
-    if target_type_id is None:
-        print(f"No rebar type found with the name '{type_name}'.")
-        return []
-    return [rebar for rebar in FilteredElementCollector(doc).OfClass(Rebar).ToElements() if
-            rebar.GetTypeId() == target_type_id]
-
-
-def mirror_rebar(doc, rebar):
-    with Transaction(doc, "Mirror Rebar") as trans:
-        trans.Start()
-        try:
-            bbox = rebar.get_BoundingBox(None)
-            center_point = bbox.Min + 0.5 * (bbox.Max - bbox.Min)
-            mirror_plane = Plane.CreateByNormalAndOrigin(XYZ.BasisY, center_point)
-
-            mirrored_ids = ElementTransformUtils.MirrorElement(doc, rebar.Id, mirror_plane)
-            if mirrored_ids and len(list(mirrored_ids)) > 0:
-                print("Mirroring did not produce any results.")
-            else:
-                print("Rebar mirrored successfully.")
-            trans.Commit()
-        except Exception as e:
-            print(f"Failed to mirror rebar: {str(e)}")
-            trans.RollBack()
-
-
-h20_rebars = find_rebars_by_type(doc, "H20")
-if h20_rebars:
-    print(f"Found {len(h20_rebars)} rebars of type 'H20'.")
-    for rebar in h20_rebars:
-        mirror_rebar(doc, rebar)
-else:
-    print("No rebars found of type 'H20'.")
+import os
+import sys
+
+# Shared helpers live in the 'lib' folder next to the script folders
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lib'))
+# First of the dwall modules: it references the Revit assemblies
+from dwall.bootstrap import get_document
+from dwall.pipeline import run_pipeline
+
+doc = get_document(__revit__)
+
+# The mirror stage of the cage pipeline: the EX-link of every panel that has no mirrored
+# copy yet is mirrored about the panel's centre plane, one MirrorElements call per panel.
+# The links are fetched from the ledger by id; in a model built before the ledger they
+# are found by type.
+try:
+    run_pipeline(doc, ('mirror',), name="Mirror EX-links")
+except RuntimeError as e:
+    print("Nothing was changed, {}.".format(str(e)))
@@ -0,0 +1,31 @@
+import os
+import sys
+
+# Shared helpers live in the 'lib' folder next to the script folders
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lib'))
+# First of the dwall modules: it references the Revit assemblies
+from dwall.bootstrap import get_document
+from dwall.instrument import profile_run
+from dwall.oplog import read_log
+from dwall.replay import REPLAY_CHUNK_SIZE, replay_log
+
+# Access the document
+doc = get_document(__revit__)
+
+# Operation log written by the headless planner (python -m dwall.planner) from the site
+# of the 'Export site for planning' script; JSON lines (.jsonl) or binary
+log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'plans', 'site.dwop')
+
+# Panels per transaction; a failing chunk is rolled back alone
+chunk_size = REPLAY_CHUNK_SIZE
+
+# The log is read as it is applied, so a site of any size fits in memory.
+# With DWALL_PROFILE set to a folder, the time of the API calls is written there.
+if not os.path.isfile(log_path):
+    print("Operation log {} not found.".format(log_path))
+else:
+    with profile_run("Replay operation log", globals()):
+        try:
+            replay_log(doc, read_log(log_path), chunk_size)
+        except ValueError as e:
+            print("The operation log was not replayed: {}".format(str(e)))
@@ -0,0 +1,28 @@
+import os
+import sys
+
+# Shared helpers live in the 'lib' folder next to the script folders
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lib'))
+# First of the dwall modules: it references the Revit assemblies
+from dwall.bootstrap import get_document
+from dwall.ledger import get_ledger
+from dwall.takeoff import bending_schedule, ledger_rows, print_totals, takeoff, write_csv
+
+# Access the document
+doc = get_document(__revit__)
+
+# Bar bending schedule and weight per panel, layer and diameter of every bar recorded in
+# the ledger, written as CSV next to the model (or to the temp folder for a new model)
+rows = ledger_rows(get_ledger(doc))
+if len(rows['panel']) == 0:
+    print("No D-wall bars recorded in the ledger.")
+else:
+    folder = os.path.dirname(doc.PathName) if doc.PathName else os.environ.get('TEMP', '.')
+    name = os.path.splitext(os.path.basename(doc.PathName))[0] if doc.PathName else doc.Title
+    schedule_path = os.path.join(folder, name + ' - bar bending schedule.csv')
+    takeoff_path = os.path.join(folder, name + ' - steel takeoff.csv')
+    write_csv(bending_schedule(rows), schedule_path)
+    write_csv(takeoff(rows), takeoff_path)
+    print_totals(rows)
+    print("Bar bending schedule written to " + schedule_path)
+    print("Steel takeoff written to " + takeoff_path)
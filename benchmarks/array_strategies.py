@@ -0,0 +1,57 @@
+# Elements and Revit API calls produced by each way of arraying a layer along the
+# wall, predicted by layer_engine.array_strategy_costs and measured on the fake API.
+#
+#     python benchmarks/array_strategies.py
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'lib'))
+
+from dwall import fakeapi
+
+fakeapi.install()
+
+from Autodesk.Revit.DB import FilteredElementCollector
+from Autodesk.Revit.DB.Structure import Rebar, RebarBarType
+from dwall.geometry import DEFAULT_PANEL, MM_TO_FEET, layer_chain
+from layer_engine import ARRAY_STRATEGIES, array_strategy_costs, create_layer, to_bar_defs
+
+PLACEMENT_CALLS = ('Rebar.CreateFromCurves', 'ElementTransformUtils.CopyElements',
+                   'RebarShapeDrivenAccessor.SetLayout')
+
+
+def measure(bars, num_copies, spacing, strategy):
+    doc = fakeapi.new_document()
+    host = FilteredElementCollector(doc).OfClass(fakeapi.Wall).FirstElement()
+    bar_types = dict((t.Name, t) for t in FilteredElementCollector(doc).OfClass(RebarBarType))
+    create_layer(doc, host, bar_types, bars, num_copies, spacing, strategy=strategy)
+    rebars = list(FilteredElementCollector(doc).OfClass(Rebar))
+    return {
+        "elements": len(rebars),
+        "bar positions": sum(rebar.NumberOfBarPositions for rebar in rebars),
+        "api_calls": sum(doc.counters[name] for name in PLACEMENT_CALLS),
+    }
+
+
+def main():
+    rows = []
+    for letter in ('A', 'B', 'D', 'E'):
+        # The bars of the layer script, arrayed along the wall
+        bars = to_bar_defs(layer_chain(DEFAULT_PANEL, letter))
+        num_copies, spacing = DEFAULT_PANEL.bar_count - 1, DEFAULT_PANEL.bar_spacing * MM_TO_FEET
+        predicted = array_strategy_costs(len(bars), num_copies)
+        for strategy in ARRAY_STRATEGIES:
+            measured = measure(bars, num_copies, spacing, strategy)
+            rows.append((letter, strategy, predicted[strategy]["elements"], measured["elements"],
+                         measured["bar positions"], predicted[strategy]["api_calls"], measured["api_calls"]))
+
+    print("")
+    print("{:<6} {:<18} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+        "Layer", "Strategy", "elem pred", "elem meas", "positions", "calls pred", "calls meas"))
+    for row in rows:
+        print("{:<6} {:<18} {:>10} {:>10} {:>10} {:>10} {:>10}".format(*row))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+# Time the clash and clear spacing check of a site, one plan per panel, and compare the
+# number of measured segment pairs with checking every pair.
+#
+#     python benchmarks/clash.py [panels]
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'lib'))
+
+from dwall.clash import DEFAULT_RULE, candidate_pairs, check_plan, plan_segments
+from dwall.geometry import DEFAULT_PANEL
+from dwall.spec import compile_spec, default_spec, with_panel
+
+
+def main(panels=200):
+    spec = default_spec()
+    plans = [compile_spec(with_panel(spec, DEFAULT_PANEL._replace(length=DEFAULT_PANEL.length + 10 * i)))
+             for i in range(panels)]
+
+    segments = plan_segments(plans[0])
+    reach = segments.radius + max(DEFAULT_RULE.min_clear, 2 * segments.radius.max()) / 2
+    pairs = len(candidate_pairs(segments, reach)[0])
+    every = len(segments.radius) * (len(segments.radius) - 1) // 2
+    print("{} segments per panel: {} candidate pairs of {} ({:.2%})".format(
+        len(segments.radius), pairs, every, pairs / every))
+
+    start = time.perf_counter()
+    violations = [check_plan(plan) for plan in plans]
+    elapsed = time.perf_counter() - start
+    print("{} panels checked in {:.2f} s ({:.1f} ms per panel), {} violations".format(
+        panels, elapsed, elapsed * 1000 / panels, sum(len(v) for v in violations)))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,29 @@
+# Time the cage geometry for many panels: the main bars and the EX-link of every panel
+# (no Revit, no fake API needed).
+#
+#     python benchmarks/geometry.py [panels]
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'lib'))
+
+from dwall.geometry import DEFAULT_PANEL, cage_bars
+from dwall.linkshapes import link_shape
+
+
+def main(panels=200):
+    start = time.perf_counter()
+    bars = 0
+    for i in range(panels):
+        panel = DEFAULT_PANEL._replace(length=DEFAULT_PANEL.length + i)
+        bars += len(cage_bars(panel))
+        link_shape(panel)
+    elapsed = time.perf_counter() - start
+    print("{} panels, {} bars in {:.1f} ms ({:.3f} ms per panel)".format(
+        panels, bars, elapsed * 1000, elapsed * 1000 / panels))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,44 @@
+# Time the lap-splice chain solver on a batch of panels of random depth.
+#
+#     python benchmarks/lapsolver.py [panels]
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'lib'))
+
+from dwall.lapsolver import solve_chain, solve_chains
+
+STOCK_LENGTHS = [9600, 10600, 12000]
+
+
+def main(panels=1000):
+    rng = np.random.default_rng(0)
+    tops = np.full(panels, 6400.0)
+    bottoms = -rng.uniform(15000, 40000, panels).round()
+
+    start = time.perf_counter()
+    levels, types, counts = solve_chains(tops, bottoms, max(STOCK_LENGTHS))
+    vectorised = time.perf_counter() - start
+
+    start = time.perf_counter()
+    serial = [solve_chain(top, bottom, STOCK_LENGTHS) for top, bottom in zip(tops, bottoms)]
+    looped = time.perf_counter() - start
+    assert all(len(solution.lengths) == count for solution, count in zip(serial, counts))
+
+    start = time.perf_counter()
+    waste = [solve_chain(top, bottom, STOCK_LENGTHS, mode='min_waste').waste for top, bottom in zip(tops, bottoms)]
+    optimised = time.perf_counter() - start
+
+    print("{} panels, {} bars".format(panels, int(counts.sum())))
+    print("  min_bars, vectorised : {:8.1f} ms".format(vectorised * 1000))
+    print("  min_bars, per panel  : {:8.1f} ms, offcut {:.0f} m".format(
+        looped * 1000, sum(solution.waste for solution in serial) / 1000))
+    print("  min_waste, per panel : {:8.1f} ms, offcut {:.0f} m".format(optimised * 1000, sum(waste) / 1000))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
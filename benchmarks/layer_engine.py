@@ -0,0 +1,141 @@
+# Batch placement engine of the first main-layer scripts, kept for the benchmarks that
+# compare it with the per-bar transactions of the original scripts (placement.py) and
+# its ways of arraying a layer (array_strategies.py). The scripts no longer use it:
+# they sync each panel to its placement plan (dwall.incremental). Import it after
+# dwall.fakeapi.install().
+#
+# A layer is described as a list of BarDef records. Every curve is built up front and
+# all bars of the layer, together with the copies along the wall, are created inside a
+# single transaction, so the document regenerates once per layer instead of once per bar.
+from collections import namedtuple
+
+from Autodesk.Revit.DB import Transaction, XYZ, Line, Transform, ElementTransformUtils, ElementId
+from Autodesk.Revit.DB.Structure import Rebar, RebarStyle, RebarHookOrientation
+from System.Collections.Generic import List
+
+from dwall.geometry import IDENTITY_FRAME, to_world
+
+# One straight bar: rebar type name and start/end points as (x, y, z) tuples in feet
+BarDef = namedtuple('BarDef', ['type_name', 'start', 'end'])
+
+X_AXIS = (1.0, 0.0, 0.0)
+
+
+def to_bar_defs(bars, frame=IDENTITY_FRAME):
+    # geometry.Bar records in mm -> BarDef records in feet
+    return [BarDef(bar.type_name, to_world(frame, bar.start), to_world(frame, bar.end)) for bar in bars]
+
+
+def build_curves(bars):
+    # Define every rebar curve before the transaction is opened
+    return [Line.CreateBound(XYZ(*bar.start), XYZ(*bar.end)) for bar in bars]
+
+
+def missing_bar_types(bars, bar_types):
+    return sorted(set(bar.type_name for bar in bars if bar_types.get(bar.type_name) is None))
+
+
+def create_bars(doc, host, bar_types, bars, curves, normal):
+    # Create the bars; the caller owns the open transaction
+    new_rebars = []
+    for bar, curve in zip(bars, curves):
+        new_rebars.append(Rebar.CreateFromCurves(
+            doc,
+            RebarStyle.Standard,
+            bar_types[bar.type_name],
+            None,  # Start hook
+            None,  # End hook
+            host,  # Host element
+            normal,  # Normal vector to the plane of the rebar shape
+            [curve],  # Curve defining the shape and placement of the bar
+            RebarHookOrientation.Left,  # Start hook orientation
+            RebarHookOrientation.Right,  # End hook orientation
+            True,  # Use existing shape
+            False  # Deform shape in 3D
+        ))
+    return new_rebars
+
+
+def copy_layer(doc, rebar_ids, num_copies, spacing, direction=X_AXIS):
+    # Copy the whole set of bars along the wall; the caller owns the open transaction
+    ids = List[ElementId]()
+    for rebar_id in rebar_ids:
+        ids.Add(rebar_id)
+    copied_ids = []
+    for i in range(1, num_copies + 1):
+        translation = Transform.CreateTranslation(XYZ(*direction) * (i * spacing))
+        copied_ids.extend(ElementTransformUtils.CopyElements(doc, ids, doc, translation, None))
+    return copied_ids
+
+
+def array_bars(bars, num_copies, spacing, direction=X_AXIS):
+    # Every bar of every set along the wall, computed directly instead of copied
+    arrayed = list(bars)
+    for i in range(1, num_copies + 1):
+        offset = [component * i * spacing for component in direction]
+        for bar in bars:
+            arrayed.append(BarDef(bar.type_name,
+                                  tuple(a + b for a, b in zip(bar.start, offset)),
+                                  tuple(a + b for a, b in zip(bar.end, offset))))
+    return arrayed
+
+
+def set_layout(rebars, quantity, spacing):
+    # Turn every bar into a rebar set of 'quantity' positions along its normal
+    for rebar in rebars:
+        rebar.GetShapeDrivenAccessor().SetLayoutAsNumberWithSpacing(quantity, spacing, True, True, True)
+
+
+# How the copies of the first set along the wall are produced:
+#   "copy"   - create one set, then one CopyElements call per copy (the original scripts)
+#   "curves" - compute all bar curves of all sets and create every bar directly
+#   "set"    - create one set and give each bar a fixed number/spacing layout rule
+ARRAY_STRATEGIES = ("copy", "curves", "set")
+
+
+def array_strategy_costs(num_bars, num_copies):
+    # Elements in the model and Revit API calls made by each strategy for one layer
+    quantity = num_copies + 1
+    return {
+        "copy": {"elements": num_bars * quantity, "api_calls": num_bars + num_copies},
+        "curves": {"elements": num_bars * quantity, "api_calls": num_bars * quantity},
+        "set": {"elements": num_bars, "api_calls": num_bars * 2 if num_copies > 0 else num_bars},
+    }
+
+
+def create_layer(doc, host, bar_types, bars, num_copies=0, spacing=0.0, normal=None,
+                 name='Create Rebar Layer', strategy="set", direction=X_AXIS):
+    # Place a whole layer in one transaction; returns the new rebars and the ids of the copies.
+    # The sets are arrayed along 'direction', the unit vector along the wall.
+    if strategy not in ARRAY_STRATEGIES:
+        raise ValueError("Unknown array strategy '{}'".format(strategy))
+    missing = missing_bar_types(bars, bar_types)
+    if missing:
+        print("Rebar type(s) not found: {}".format(", ".join(missing)))
+        return [], []
+
+    if strategy == "curves":
+        bars = array_bars(bars, num_copies, spacing, direction)
+    if strategy == "set" and num_copies > 0:
+        # A rebar set is distributed along the normal of the bar, so it has to point along the wall
+        normal = XYZ(*direction)
+    curves = build_curves(bars)
+
+    t = Transaction(doc, name)
+    t.Start()
+    try:
+        new_rebars = create_bars(doc, host, bar_types, bars, curves, normal or XYZ.BasisY)
+        copied_ids = []
+        if strategy == "copy" and num_copies > 0:
+            copied_ids = copy_layer(doc, [rebar.Id for rebar in new_rebars], num_copies, spacing, direction)
+        elif strategy == "set" and num_copies > 0:
+            set_layout(new_rebars, num_copies + 1, spacing)
+        t.Commit()
+    except Exception as e:
+        t.RollBack()
+        print("Failed to create the rebar layer: {}".format(str(e)))
+        return [], []
+
+    print("{} rebars and {} copies created successfully ({} strategy).".format(
+        len(new_rebars), len(copied_ids), strategy))
+    return new_rebars, copied_ids
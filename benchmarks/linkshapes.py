@@ -0,0 +1,45 @@
+# Time the vertices of every EX-link of a site: one link_shape call per link against
+# all the links of all the panels at once (link_vertices), without and with the shape
+# cache of dwall.linkshapes.
+#
+#     python benchmarks/linkshapes.py [panels] [distinct panel lengths]
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'lib'))
+
+from dwall.geometry import DEFAULT_EX_LINK, DEFAULT_PANEL
+from dwall.linkshapes import LINK_SHAPES, clear_cache, link_shape, link_vertices
+
+
+def per_link(panels, link):
+    vertices = []
+    for panel in panels:
+        for i in range(link.count):
+            vertices.append(link_shape(panel, link._replace(level=link.level - i * link.spacing)))
+    return vertices
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def main(panels=200, lengths=200):
+    link = DEFAULT_EX_LINK
+    site = [DEFAULT_PANEL._replace(length=DEFAULT_PANEL.length + 10 * (i % lengths)) for i in range(panels)]
+    print("{} panels ({} distinct), {} links each".format(panels, min(panels, lengths), link.count))
+    clear_cache()
+    print("  {:<24} {:8.1f} ms".format("per link (trapezoid)", timed(per_link, site, link)))
+    for shape in LINK_SHAPES:
+        clear_cache()
+        cold = timed(link_vertices, site, link, shape)
+        warm = timed(link_vertices, site, link, shape)
+        print("  {:<24} {:8.1f} ms cold, {:6.1f} ms cached".format("vectorised " + shape, cold, warm))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:3]])
@@ -0,0 +1,51 @@
+# Time the headless planner of a site serially and in process pools of 2, 4, ... up to
+# one worker per CPU, and check that every pool writes the log of the serial run.
+#
+#     python benchmarks/parallel.py [panels] [distinct panel lengths]
+import filecmp
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'lib'))
+
+from dwall.geometry import DEFAULT_PANEL
+from dwall.planner import plan_site, save_site
+from dwall.spec import default_spec
+
+
+def worker_counts():
+    counts, workers = [1], 2
+    while workers <= (os.cpu_count() or 1):
+        counts.append(workers)
+        workers *= 2
+    return counts
+
+
+def main(panels=1000, lengths=1000):
+    folder = tempfile.mkdtemp(prefix='dwall-parallel-')
+    try:
+        site = os.path.join(folder, 'site.json')
+        save_site(site, default_spec(), [(100000 + i, DEFAULT_PANEL._replace(length=DEFAULT_PANEL.length + 10 * (i % lengths)))
+                                         for i in range(panels)])
+        print("{} panels ({} distinct), {} CPUs".format(panels, min(panels, lengths), os.cpu_count()))
+        serial = None
+        for workers in worker_counts():
+            log = os.path.join(folder, 'site-{}.dwop'.format(workers))
+            start = time.perf_counter()
+            count = plan_site(site, log, workers=workers)
+            seconds = time.perf_counter() - start
+            if serial is None:
+                serial = (seconds, log)
+            same = filecmp.cmp(log, serial[1], shallow=False)
+            print("  {:>3} workers {:8.2f} s  {:5.2f}x  {} operations, {}".format(
+                workers, seconds, serial[0] / seconds, count, "same log" if same else "DIFFERENT LOG"))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:3]])
@@ -0,0 +1,70 @@
+# Compare the original per-type unit weight loop of the Data mapping script with the
+# bulk parameter sync on a fake model with many bar types.
+#
+#     python benchmarks/params.py [bar types]
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'lib'))
+
+from dwall import fakeapi
+
+fakeapi.install()
+
+from Autodesk.Revit.DB import FilteredElementCollector, ElementType, Transaction, UnitUtils, UnitTypeId
+from Autodesk.Revit.DB.Structure import RebarBarType
+
+from dwall.params import sync_parameter
+from dwall.takeoff import UNIT_WEIGHTS, bar_type_unit_weights, unit_weight
+
+
+def original(doc, mapping):
+    # The loop of the original script: every element type, one string lookup, one unit
+    # conversion and one write per match
+    t = Transaction(doc, 'Update Rebar Unit Weights')
+    t.Start()
+    for element_type in FilteredElementCollector(doc).OfClass(ElementType):
+        if element_type.Name in mapping:
+            value = UnitUtils.ConvertToInternalUnits(mapping[element_type.Name], UnitTypeId.KilogramsPerMeter)
+            param = element_type.LookupParameter('Unit weight')
+            if param is not None:
+                param.Set(value)
+    t.Commit()
+
+
+def bulk(doc):
+    bar_types = list(FilteredElementCollector(doc).OfClass(RebarBarType))
+    sync_parameter(doc, bar_types, 'Unit weight', bar_type_unit_weights(bar_types), UnitTypeId.KilogramsPerMeter)
+
+
+def run(label, function, doc, *args):
+    doc.counters.clear()
+    UnitUtils.conversions = 0
+    start = time.perf_counter()
+    function(doc, *args)
+    elapsed = time.perf_counter() - start
+    counters = doc.counters
+    print("  {:<24} {:>7.1f} ms  lookups {:>5}  writes {:>5}  conversions {:>5}  transactions {}".format(
+        label, elapsed * 1000, counters['Element.LookupParameter'], counters['Parameter.Set'],
+        UnitUtils.conversions, counters['transactions']))
+
+
+def main(count=1000):
+    bar_types = [(name, diameter) for name, diameter in
+                 [('H40', 40), ('H32', 32), ('H25', 25), ('H20', 20), ('H16', 16), ('H13', 13)]]
+    bar_types += [('T{}'.format(i), 6 + i % 45) for i in range(count - len(bar_types))]
+    # The original script needs every type in its table
+    mapping = dict(UNIT_WEIGHTS)
+    mapping.update((name, float(unit_weight(diameter))) for name, diameter in bar_types if name not in mapping)
+
+    print("{} bar types".format(len(bar_types)))
+    run("original", original, fakeapi.new_document(panels=0, bar_types=bar_types), mapping)
+    doc = fakeapi.new_document(panels=0, bar_types=bar_types)
+    run("bulk sync, first run", bulk, doc)
+    run("bulk sync, second run", bulk, doc)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
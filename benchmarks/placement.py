@@ -0,0 +1,60 @@
+# Compare the per-bar transactions of the original layer scripts with the layer
+# scripts of today, on the fake Revit API.
+#
+#     python benchmarks/placement.py
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'lib'))
+
+from dwall import fakeapi
+
+fakeapi.install()
+
+from Autodesk.Revit.DB import FilteredElementCollector, Transaction, XYZ
+from Autodesk.Revit.DB.Structure import RebarBarType
+from dwall.geometry import DEFAULT_PANEL, MM_TO_FEET, layer_chain
+from layer_engine import build_curves, copy_layer, create_bars, to_bar_defs
+
+LAYER_SCRIPTS = ['A', 'B', 'D', 'E']
+
+
+def per_bar_transactions(doc, letter):
+    # Replay the bars of a layer the way the original scripts did: one transaction
+    # per bar and one more for the copy loop
+    bars = to_bar_defs(layer_chain(DEFAULT_PANEL, letter))
+    host = FilteredElementCollector(doc).OfClass(fakeapi.Wall).FirstElement()
+    bar_types = dict((t.Name, t) for t in FilteredElementCollector(doc).OfClass(RebarBarType))
+    rebar_ids = []
+    for bar in bars:
+        t = Transaction(doc, "Create Rebar")
+        t.Start()
+        rebar_ids.extend(r.Id for r in create_bars(doc, host, bar_types, [bar], build_curves([bar]), XYZ.BasisY))
+        t.Commit()
+    t_copy = Transaction(doc, "Copy Rebar Layer")
+    t_copy.Start()
+    copy_layer(doc, rebar_ids, DEFAULT_PANEL.bar_count - 1, DEFAULT_PANEL.bar_spacing * MM_TO_FEET)
+    t_copy.Commit()
+
+
+def main():
+    print("{:<8} {:>14} {:>14} {:>14} {:>14}".format(
+        "Layer", "per-bar trans", "per-bar regen", "batch trans", "batch regen"))
+    for letter in LAYER_SCRIPTS:
+        path = os.path.join(ROOT, "Creation of main rebar layer {}".format(letter), "main.py")
+
+        legacy_doc = fakeapi.new_document()
+        per_bar_transactions(legacy_doc, letter)
+
+        batch_doc = fakeapi.new_document()
+        fakeapi.run_script(path, batch_doc)
+
+        print("{:<8} {:>14} {:>14} {:>14} {:>14}".format(
+            letter,
+            legacy_doc.counters['transactions'], legacy_doc.counters['regenerations'],
+            batch_doc.counters['transactions'], batch_doc.counters['regenerations']))
+
+
+if __name__ == '__main__':
+    main()
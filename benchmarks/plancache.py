@@ -0,0 +1,51 @@
+# Time the placement plans of a site with and without the plan cache.
+#
+#     python benchmarks/plancache.py [panels] [distinct panel lengths]
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'lib'))
+
+from dwall.geometry import DEFAULT_PANEL
+from dwall.plancache import PlanCache
+from dwall.spec import compile_spec, default_spec, with_panel
+
+
+def site_specs(panels, lengths):
+    spec = default_spec()
+    return [with_panel(spec, DEFAULT_PANEL._replace(length=DEFAULT_PANEL.length + 500 * (i % lengths)))
+            for i in range(panels)]
+
+
+def timed(function, specs):
+    start = time.perf_counter()
+    plans = [function(spec) for spec in specs]
+    return plans, time.perf_counter() - start
+
+
+def main(panels=200, lengths=4):
+    specs = site_specs(panels, lengths)
+    directory = tempfile.mkdtemp(prefix='dwall-plan-cache-')
+    try:
+        plans, compiled = timed(compile_spec, specs)
+        cache = PlanCache(directory)
+        cold, first_run = timed(lambda spec: cache.get_or_compile(spec)[0], specs)
+        # A new cache on the same folder, as in the next run of the script
+        cache = PlanCache(directory)
+        warm, next_run = timed(lambda spec: cache.get_or_compile(spec)[0], specs)
+        assert warm == plans and cold == plans
+        print("{} panels, {} distinct, cache {:.1f} kB".format(panels, lengths, cache.size() / 1024))
+        print("  compile every panel : {:8.1f} ms".format(compiled * 1000))
+        print("  first run, cached   : {:8.1f} ms".format(first_run * 1000))
+        print("  next run, cached    : {:8.1f} ms ({} hits, {} misses)".format(
+            next_run * 1000, cache.hits, cache.misses))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,75 @@
+# Find the H20 bars of a large model: Python-side type comparison over every rebar
+# versus native collector filters that only hand back matching ids.
+#
+#     python benchmarks/query.py [rebars]
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'lib'))
+
+from dwall import fakeapi
+
+fakeapi.install()
+
+from Autodesk.Revit.DB import FilteredElementCollector, Line, XYZ
+from Autodesk.Revit.DB.Structure import Rebar
+from dwall.lookup import get_lookup
+from dwall.query import iter_rebar_ids
+
+# Rough cost of wrapping one managed element / one id for Python
+MARSHAL_COST = 5e-6
+MARSHAL_ID_COST = 0.5e-6
+
+
+def build_model(rebars, panels=10):
+    doc = fakeapi.new_document(panels=panels)
+    walls = list(FilteredElementCollector(doc).OfClass(fakeapi.Wall))
+    bar_types = [get_lookup(doc).bar_type(name) for name in ("H40", "H32", "H25", "H20")]
+    for i in range(rebars):
+        wall = walls[i % panels]
+        x = wall.Location.Curve.GetEndPoint(0).X + 1
+        line = Line.CreateBound(XYZ(x, 0, 0), XYZ(x, 0, -10))
+        bar_type = bar_types[(i // panels) % len(bar_types)]
+        doc.add_element(Rebar(doc, bar_type, wall, [line], XYZ.BasisY))
+    doc.counters.clear()
+    doc.costs.update({'marshal': MARSHAL_COST, 'marshal id': MARSHAL_ID_COST})
+    return doc, walls
+
+
+def comprehension(doc, type_id):
+    return [rebar for rebar in FilteredElementCollector(doc).OfClass(Rebar).ToElements()
+            if rebar.GetTypeId() == type_id]
+
+
+def measure(name, doc, run):
+    doc.counters.clear()
+    doc.simulated_time = 0.0
+    start = time.perf_counter()
+    found = sum(1 for _ in run())
+    elapsed = time.perf_counter() - start
+    print("{:<34} {:>8} {:>10} {:>8} {:>10.1f} {:>12.1f}".format(
+        name, found, doc.counters['elements marshalled'], doc.counters['ids marshalled'],
+        elapsed * 1000, doc.simulated_time * 1000))
+    return doc.simulated_time
+
+
+def main(rebars=100000):
+    doc, walls = build_model(rebars)
+    type_id = get_lookup(doc).bar_type("H20").Id
+    print("{} rebars, simulated marshalling {:.1f} us/element, {:.1f} us/id".format(
+        rebars, MARSHAL_COST * 1e6, MARSHAL_ID_COST * 1e6))
+    # 'python ms' also contains the fake's own filtering, which Revit does natively;
+    # 'boundary ms' is the simulated cost of handing elements and ids to Python
+    print("{:<34} {:>8} {:>10} {:>8} {:>10} {:>12}".format(
+        "Query", "found", "elements", "ids", "python ms", "boundary ms"))
+    before = measure("list comprehension, whole model", doc, lambda: comprehension(doc, type_id))
+    after = measure("native type filter, whole model", doc, lambda: iter_rebar_ids(doc, type_id))
+    measure("native type + host filter", doc, lambda: iter_rebar_ids(doc, type_id, host=walls[0]))
+    measure("native type + panel outline", doc, lambda: iter_rebar_ids(doc, type_id, panel=walls[0]))
+    print("Boundary time of the type filter: {:.1f}x less".format(before / after))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
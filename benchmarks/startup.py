@@ -0,0 +1,63 @@
+# Launch cost of every script on the fake Revit API: the first launch of a session
+# (cold: nothing imported, no assembly referenced) and the next one (warm: pyRevit keeps
+# the engine, so sys.modules and dwall.bootstrap are kept).
+#
+#     python benchmarks/startup.py [script folder ...]
+#
+# Each script runs twice in a fresh process against an empty model, so the time is the
+# imports, the bootstrap and the document lookup, not the work on the panels.
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'lib'))
+
+from dwall import fakeapi
+
+
+def launch(folder, doc):
+    # Milliseconds, new modules and assembly references of one run of the script
+    modules = len(sys.modules)
+    references = sum(fakeapi.assembly_references.values())
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fakeapi.run_script(os.path.join(ROOT, folder, 'main.py'), doc)
+    return ((time.perf_counter() - start) * 1000, len(sys.modules) - modules,
+            sum(fakeapi.assembly_references.values()) - references)
+
+
+def measure(folder):
+    fakeapi.install()
+    doc = fakeapi.new_document(panels=0)
+    cold = launch(folder, doc)
+    warm = launch(folder, doc)
+    return {'cold': cold, 'warm': warm, 'numpy': 'numpy' in sys.modules}
+
+
+def main(folders):
+    folders = folders or sorted(name for name in os.listdir(ROOT)
+                                if os.path.isfile(os.path.join(ROOT, name, 'main.py')))
+    print("{:<38} {:>9} {:>8} {:>5} {:>9} {:>8} {:>5}  {}".format(
+        "Script", "cold ms", "modules", "refs", "warm ms", "modules", "refs", "numpy"))
+    for folder in folders:
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), '--measure', folder],
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        if out.returncode != 0:
+            print("{:<38} failed: {}".format(folder, out.stderr.strip().splitlines()[-1]))
+            continue
+        result = json.loads(out.stdout)
+        print("{:<38} {:>9.1f} {:>8} {:>5} {:>9.1f} {:>8} {:>5}  {}".format(
+            folder, result['cold'][0], result['cold'][1], result['cold'][2],
+            result['warm'][0], result['warm'][1], result['warm'][2], "yes" if result['numpy'] else "no"))
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--measure']:
+        print(json.dumps(measure(sys.argv[2])))
+    else:
+        main(sys.argv[1:])
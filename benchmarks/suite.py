@@ -0,0 +1,289 @@
+# Benchmark suite: every script and engine on fake models of 1, 10, 100 and 1000
+# panels, with the API calls, wall time, simulated Revit time and peak memory of each.
+#
+#     python benchmarks/suite.py [--sizes 1,10,100,1000] [--cases NAME,...] [--json FILE]
+#                                [--baseline FILE] [--tolerance 0.5] [--profile FOLDER]
+#
+# Every case runs in its own process, with a fresh temp folder (plan cache, CSV output),
+# so caches and memory do not leak from one case to the next. Only the case itself is
+# measured; the model and what the case needs in it (e.g. the EX-links before they are
+# mirrored) are built first, and all the dwall modules are imported. The simulated time
+# charges the REVIT_COSTS of dwall.fakeapi.
+#
+# With --baseline (the --json output of an earlier run) the exit status is 1 when a case
+# makes more API calls, transactions or regenerations than before, or takes more than
+# (1 + tolerance) times its wall time; the counts are exact, so they are the reliable
+# guard on a shared CI box.
+#
+# With --profile every case also writes the dwall.instrument report of its API calls
+# (JSON and folded stacks) to the folder; the profiled wall times are not comparable.
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import pkgutil
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'lib'))
+
+from dwall import fakeapi
+from dwall.instrument import ENVIRONMENT_VARIABLE, profile_run
+
+SIZES = (1, 10, 100, 1000)
+
+# Wall time below which a slower run is never a regression (seconds)
+TIME_SLACK = 0.05
+
+COUNTED = ('api calls', 'transactions', 'regenerations')
+
+
+def script(folder):
+    path = os.path.join(ROOT, folder, 'main.py')
+    return lambda doc, panels: fakeapi.run_script(path, doc)
+
+
+def scripts(*folders):
+    def run(doc, panels):
+        for folder in folders:
+            script(folder)(doc, panels)
+    return run
+
+
+def nothing(doc, panels):
+    pass
+
+
+def _site_plans(panels):
+    # One plan per panel, of 20 panel lengths
+    from dwall.geometry import DEFAULT_PANEL
+    from dwall.spec import compile_spec, default_spec, with_panel
+    spec = default_spec()
+    return [compile_spec(with_panel(spec, DEFAULT_PANEL._replace(length=DEFAULT_PANEL.length + 10 * (i % 20))))
+            for i in range(panels)]
+
+
+def compile_plans(doc, panels):
+    _site_plans(panels)
+
+
+def clash_check(doc, panels):
+    # Every distinct plan once, as the specification script does
+    from dwall.clash import check_plan
+    checked = set()
+    for plan in _site_plans(panels):
+        key = tuple(sorted(plan["panel"].items()))
+        if key not in checked:
+            checked.add(key)
+            check_plan(plan)
+
+
+def link_shapes(doc, panels):
+    from dwall.geometry import DEFAULT_PANEL
+    from dwall.linkshapes import link_vertices
+    link_vertices([DEFAULT_PANEL._replace(length=DEFAULT_PANEL.length + 10 * (i % 20)) for i in range(panels)])
+
+
+def plan_takeoff(doc, panels):
+    from dwall.takeoff import bending_schedule, concat_rows, plan_rows, takeoff
+    rows = concat_rows(plan_rows(plan, panel) for panel, plan in enumerate(_site_plans(panels)))
+    takeoff(rows)
+    bending_schedule(rows)
+
+
+def copy_chunks(doc, panels):
+    # The EX-links of the first panel copied level by level in chunked transactions
+    from dwall.exlink import array_ex_links, find_rebars_by_type
+    array_ex_links(doc, find_rebars_by_type(doc, "H20"), 243, 150, use_layout=False)
+
+
+def _log_path():
+    return os.path.join(tempfile.gettempdir(), 'site.dwop')
+
+
+def plan_log(doc, panels):
+    # Site of the model planned headlessly into a binary operation log
+    from dwall.adapter import panel_parameters
+    from dwall.lookup import get_lookup
+    from dwall.oplog import write_log
+    from dwall.planner import site_operations
+    from dwall.spec import default_spec
+    spec = default_spec()
+    walls = get_lookup(doc).walls(spec["host"])
+    write_log(_log_path(), site_operations(spec, [(wall.Id.IntegerValue, panel_parameters(wall)) for wall in walls]))
+
+
+def replay_log(doc, panels):
+    from dwall.oplog import read_log
+    from dwall.replay import replay_log
+    replay_log(doc, read_log(_log_path()))
+
+
+SPEC = 'Creation of cage from specification'
+BATCH = 'Batch creation of D-wall cages'
+
+# Name -> (setup, case); both get the document and the number of panels
+CASES = OrderedDict([
+    ('layer A', (nothing, script('Creation of main rebar layer A'))),
+    ('layer B', (nothing, script('Creation of main rebar layer B'))),
+    ('layer D', (nothing, script('Creation of main rebar layer D'))),
+    ('layer E', (nothing, script('Creation of main rebar layer E'))),
+    ('EX-link', (nothing, script('Creation of EX-link'))),
+    ('mirror EX-link', (script('Creation of EX-link'), script('Mirroring the EX-link'))),
+    ('copy EX-links', (scripts('Creation of EX-link', 'Mirroring the EX-link'), script('Copying EX-links'))),
+    ('data mapping', (nothing, script('Data mapping'))),
+    ('batch', (nothing, script(BATCH))),
+    ('pipeline', (nothing, script('Cage pipeline'))),
+    ('replay log', (plan_log, replay_log)),
+    ('specification', (nothing, script(SPEC))),
+    ('specification rerun', (script(SPEC), script(SPEC))),
+    ('steel takeoff', (script(BATCH), script('Steel takeoff'))),
+    ('engine: compile plans', (nothing, compile_plans)),
+    ('engine: clash check', (nothing, clash_check)),
+    ('engine: link shapes', (nothing, link_shapes)),
+    ('engine: plan takeoff', (nothing, plan_takeoff)),
+    ('engine: chunked copies', (scripts('Creation of EX-link', 'Mirroring the EX-link'), copy_chunks)),
+])
+
+
+def peak_rss_mb():
+    # Linux reports kB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def measure(name, panels):
+    # Run one case in this process and return its measurements
+    fakeapi.install()
+    # Import every module up front: the import time is not part of a case
+    import dwall
+    for module in pkgutil.iter_modules(dwall.__path__):
+        importlib.import_module('dwall.' + module.name)
+    setup, case = CASES[name]
+    doc = fakeapi.new_document(panels=panels, costs=fakeapi.REVIT_COSTS)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        setup(doc, panels)
+        doc.counters.clear()
+        fakeapi.static_calls.clear()
+        doc.simulated_time = 0.0
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        with profile_run("{} {}".format(name.replace(':', ''), panels)):
+            case(doc, panels)
+        elapsed = time.perf_counter() - start
+    calls = dict(doc.counters)
+    calls.update(fakeapi.static_calls)
+    return OrderedDict([
+        ('case', name),
+        ('panels', panels),
+        ('wall', elapsed),
+        ('simulated', doc.simulated_time),
+        ('api calls', doc.counters['api calls'] + sum(fakeapi.static_calls.values())),
+        ('transactions', doc.counters['transactions']),
+        ('regenerations', doc.counters['regenerations']),
+        ('peak rss', peak_rss_mb()),
+        ('rss growth', peak_rss_mb() - rss_before),
+        ('calls', calls),
+    ])
+
+
+def run_case(name, panels):
+    # Run one case in a child process with its own temp folder
+    temp = tempfile.mkdtemp(prefix='dwall-bench-')
+    env = dict(os.environ, TMPDIR=temp, TEMP=temp, TMP=temp)
+    try:
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), '--measure', name, str(panels)],
+                             env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+    if out.returncode != 0:
+        return OrderedDict([('case', name), ('panels', panels), ('error', out.stderr.strip().splitlines()[-1])])
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def print_result(result):
+    if 'error' in result:
+        print("{:<24} {:>6}  failed: {}".format(result['case'], result['panels'], result['error']))
+        return
+    print("{:<24} {:>6} {:>10.1f} {:>11.2f} {:>10} {:>8} {:>8} {:>9.1f} {:>8.1f}".format(
+        result['case'], result['panels'], result['wall'] * 1000, result['simulated'], result['api calls'],
+        result['transactions'], result['regenerations'], result['peak rss'], result['rss growth']))
+
+
+def regressions(results, baseline, tolerance):
+    # Cases worse than in the baseline, as printable lines
+    before = dict(((r['case'], r['panels']), r) for r in baseline)
+    found = []
+    for result in results:
+        old = before.get((result['case'], result['panels']))
+        if old is None or 'error' in old:
+            continue
+        where = "{} ({} panels)".format(result['case'], result['panels'])
+        if 'error' in result:
+            found.append("{}: failed: {}".format(where, result['error']))
+            continue
+        for counter in COUNTED:
+            if result[counter] > old[counter]:
+                found.append("{}: {} {} -> {}".format(where, counter, old[counter], result[counter]))
+        if result['wall'] > old['wall'] * (1 + tolerance) + TIME_SLACK:
+            found.append("{}: wall time {:.3f} s -> {:.3f} s".format(where, old['wall'], result['wall']))
+    return found
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the D-wall scripts and engines on the fake Revit API.")
+    parser.add_argument('--sizes', default=",".join(str(size) for size in SIZES))
+    parser.add_argument('--cases', default=None, help="comma separated case names (default: all)")
+    parser.add_argument('--json', default=None, help="write the results to this file")
+    parser.add_argument('--baseline', default=None, help="results of an earlier run to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="allowed relative wall time increase")
+    parser.add_argument('--profile', default=None, help="write the API call profile of every case to this folder")
+    parser.add_argument('--measure', nargs=2, metavar=('CASE', 'PANELS'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        print(json.dumps(measure(args.measure[0], int(args.measure[1]))))
+        return 0
+
+    names = args.cases.split(',') if args.cases else list(CASES)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        print("Unknown case(s): {}. Cases: {}".format(", ".join(unknown), ", ".join(CASES)))
+        return 2
+    sizes = [int(size) for size in args.sizes.split(',')]
+    if args.profile:
+        os.environ[ENVIRONMENT_VARIABLE] = os.path.abspath(args.profile)
+
+    print("{:<24} {:>6} {:>10} {:>11} {:>10} {:>8} {:>8} {:>9} {:>8}".format(
+        "Case", "panels", "wall ms", "simulated s", "API calls", "trans", "regen", "peak MB", "grew MB"))
+    results = []
+    for panels in sizes:
+        for name in names:
+            result = run_case(name, panels)
+            print_result(result)
+            results.append(result)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print("REGRESSION " + line)
+        if found:
+            return 1
+        print("No regressions against {}.".format(args.baseline))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
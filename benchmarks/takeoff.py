@@ -0,0 +1,37 @@
+# Time the steel takeoff of a site from its placement plans.
+#
+#     python benchmarks/takeoff.py [panels]
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'lib'))
+
+from dwall.geometry import DEFAULT_PANEL
+from dwall.spec import compile_spec, default_spec, with_panel
+from dwall.takeoff import bending_schedule, concat_rows, plan_rows, print_totals, takeoff
+
+
+def main(panels=200):
+    spec = default_spec()
+    plans = [compile_spec(with_panel(spec, DEFAULT_PANEL._replace(length=DEFAULT_PANEL.length + 10 * i)))
+             for i in range(panels)]
+
+    start = time.perf_counter()
+    rows = concat_rows(plan_rows(plan, panel) for panel, plan in enumerate(plans))
+    rows_time = time.perf_counter() - start
+    start = time.perf_counter()
+    table = takeoff(rows)
+    schedule = bending_schedule(rows)
+    sums_time = time.perf_counter() - start
+
+    print("{} panels, {} bar sets, {} bars, {} schedule lines".format(
+        panels, len(rows['panel']), int(rows['count'].sum()), len(schedule['panel'])))
+    print("  rows from plans : {:8.1f} ms".format(rows_time * 1000))
+    print("  takeoff + BBS   : {:8.1f} ms ({} takeoff lines)".format(sums_time * 1000, len(table['panel'])))
+    print_totals(rows)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
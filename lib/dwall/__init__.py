@@ -0,0 +1,4 @@
+# Shared helpers for the D-wall rebar scripts.
+#
+# The scripts add the 'lib' folder to sys.path and import from here, e.g.
+#     from dwall.pipeline import run_pipeline
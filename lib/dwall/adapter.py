@@ -0,0 +1,31 @@
+# Conversion of dwall.geometry results into Revit objects.
+from Autodesk.Revit.DB import XYZ, Line, Curve
+from System.Collections.Generic import List
+
+from dwall.geometry import DEFAULT_PANEL, IDENTITY_FRAME, MM_TO_FEET, PanelFrame, to_world
+
+
+def to_xyz(point, frame=IDENTITY_FRAME):
+    return XYZ(*to_world(frame, point))
+
+
+def to_curve_list(points, frame=IDENTITY_FRAME):
+    # Polyline through the points as a List[Curve] of lines
+    xyzs = [to_xyz(point, frame) for point in points]
+    curves = List[Curve]()
+    for start, end in zip(xyzs, xyzs[1:]):
+        curves.Add(Line.CreateBound(start, end))
+    return curves
+
+
+def panel_frame(wall):
+    # Origin at the start of the location curve, X along the wall and Y to its left
+    curve = wall.Location.Curve
+    start, end = curve.GetEndPoint(0), curve.GetEndPoint(1)
+    x_axis = (end - start).Normalize()
+    y_axis = XYZ.BasisZ.CrossProduct(x_axis)
+    return PanelFrame((start.X, start.Y, start.Z), (x_axis.X, x_axis.Y, x_axis.Z), (y_axis.X, y_axis.Y, y_axis.Z))
+
+
+def panel_parameters(wall, base=DEFAULT_PANEL):
+    return base._replace(length=wall.Location.Curve.Length / MM_TO_FEET, thickness=wall.Width / MM_TO_FEET)
@@ -0,0 +1,82 @@
+# Batch mode: build the cage of every D-wall panel of the model in one run.
+#
+# The stages of dwall.pipeline run panel by panel instead of stage by stage: all the
+# stages of a panel run inside one transaction group that is assimilated into a single
+# undo step, so every panel is finished, or rolled back, before the next one starts.
+# The layers are synced to their placement plans and the EX-links already in the
+# ledger are not created, mirrored or arrayed again, so running the batch again only
+# adds what is missing. A panel whose stage fails is rolled back, its ledger entries
+# put back as they were, and reported as failed. The context of the run (lookup cache,
+# plan cache, ledger) is shared by all panels; the ledger is saved once at the end.
+import time
+from collections import OrderedDict
+
+from Autodesk.Revit.DB import TransactionGroup
+
+from dwall import pipeline
+from dwall.replay import plan_bar_types
+from dwall.spec import compile_spec, select
+
+STAGES = ('layers', 'ex-link', 'mirror', 'copy')
+
+
+def run_panel(context, wall, stages=STAGES):
+    # All stages of one panel in one transaction group; returns the time of every stage.
+    # Raises RuntimeError when a stage fails, after rolling the group back.
+    panel_context = context.with_panels([wall])
+    timings = OrderedDict()
+
+    group = TransactionGroup(context.doc, "Create D-wall cage {}".format(wall.Id.IntegerValue))
+    group.Start()
+    try:
+        for stage, function in pipeline.STAGES.items():
+            if stage in stages:
+                start = time.perf_counter()
+                function(panel_context)
+                timings[stage] = time.perf_counter() - start
+        group.Assimilate()
+    except Exception:
+        group.RollBack()
+        raise
+    return timings
+
+
+def run_batch(doc, stages=STAGES, spec=None, **options):
+    # Run the stages for every panel, reporting progress and the time spent per panel.
+    # options go to pipeline.CageContext (use_layout, chunk_size).
+    context = pipeline.CageContext(doc, spec, **options)
+    panels = context.panels
+    type_names = set([context.link_type]) if context.link is not None else set()
+    if context.layers:
+        type_names.update(plan_bar_types(compile_spec(select(context.spec, sorted(context.layers)))))
+    missing = [name for name, bar_type in context.lookup.bar_types(sorted(type_names)).items() if bar_type is None]
+    if not panels:
+        print("No '{}' walls found.".format(context.host))
+        return []
+    if missing:
+        print("Rebar type(s) not found: {}".format(", ".join(missing)))
+        return []
+
+    ledger = context.ledger
+    report = []
+    run_start = time.perf_counter()
+    for number, wall in enumerate(panels, 1):
+        panel_start = time.perf_counter()
+        entries = ledger.snapshot(wall)
+        try:
+            timings = run_panel(context, wall, stages)
+            status = "done"
+        except Exception as e:
+            # What was recorded for the panel points at rolled back elements
+            ledger.restore(wall, entries)
+            timings = OrderedDict()
+            status = "failed: {}".format(str(e))
+        elapsed = time.perf_counter() - panel_start
+        report.append((wall.Id.IntegerValue, status, elapsed, timings))
+        print("[{}/{}] Panel {} {} in {:.2f} s ({})".format(
+            number, len(panels), wall.Id.IntegerValue, status, elapsed,
+            ", ".join("{} {:.2f} s".format(stage, t) for stage, t in timings.items())))
+
+    ledger.save()
+    print("{} panels processed in {:.1f} s.".format(len(panels), time.perf_counter() - run_start))
+    return report
@@ -0,0 +1,36 @@
+# Startup of the scripts: imported first by every script, before any other dwall module.
+#
+# pyRevit keeps the Python engine (and so sys.modules) between runs of the scripts in a
+# session, so the Revit assemblies of ASSEMBLIES are referenced on the first launch
+# only; a script that needs another one calls load_assemblies() with its name. The API
+# types are imported where they are used, at module level (where dwall.instrument
+# patches them), once the assemblies are referenced here.
+#
+# get_document() returns the document of the active view and starts a new run: what a
+# script run caches about the model (dwall.lookup) is dropped when the next run starts.
+import clr
+
+ASSEMBLIES = ('RevitAPI',)
+
+_references = set()
+
+# Number of the current script run, counted by get_document()
+run = 0
+
+
+def load_assemblies(*names):
+    # Reference the assemblies not referenced yet in this session
+    for name in names or ASSEMBLIES:
+        if name not in _references:
+            clr.AddReference(name)
+            _references.add(name)
+
+
+def get_document(revit):
+    # Document of the active UI document of 'revit' (the __revit__ of the script)
+    global run
+    run += 1
+    return revit.ActiveUIDocument.Document
+
+
+load_assemblies()
@@ -0,0 +1,189 @@
+# Clash and clear spacing check of the cage geometry, before anything reaches Revit.
+#
+# Every bar set of a placement plan is expanded into its straight segments (one per
+# leg of every bar of the set). The segments go into a uniform grid; only pairs that
+# share a cell are measured, all at once with a vectorised segment-to-segment distance.
+# Three kinds of violation are reported, per pair of plan records:
+#   clash   - two bars overlap (negative clear distance)
+#   spacing - two parallel main bars, other than the two bars of a lap, are closer
+#             than the minimum clear spacing
+#   cover   - a bar leaves the cover envelope of the panel
+# Links are tied to the main bars, so against links only clashes count.
+from collections import namedtuple
+
+import numpy as np
+
+from dwall.geometry import BAR_DIAMETERS
+
+# Minimum clear spacing: the larger of min_clear and diameter_factor times the larger
+# bar diameter (mm); distances within 'tolerance' mm of a limit pass
+ClearanceRule = namedtuple('ClearanceRule', ['min_clear', 'diameter_factor', 'tolerance'])
+
+DEFAULT_RULE = ClearanceRule(min_clear=25, diameter_factor=1.0, tolerance=1.0)
+
+# Grid cell size in mm
+CELL_SIZE = 250.0
+
+# Segments of a cage: end points (n, 3), bar radius, the plan record and set position
+# they belong to, and whether the record is a straight main bar
+Segments = namedtuple('Segments', ['start', 'end', 'radius', 'record', 'position', 'main'])
+
+# One reported problem, for a pair of records (second is None for cover): the worst
+# clear distance in mm (for cover, minus the depth into the cover), the limit, the
+# number of cases and the location of the worst one in the panel frame
+Violation = namedtuple('Violation', ['kind', 'first', 'second', 'clear', 'required', 'count', 'point'])
+
+
+def plan_segments(plan):
+    # Every leg of every bar of every set of the plan
+    starts, ends, radius, record, position = [], [], [], [], []
+    for r, rec in enumerate(plan["records"]):
+        points = np.asarray(rec["points"], dtype=float)
+        offsets = np.arange(rec["count"])[:, None, None] * np.asarray(rec["spacing"], dtype=float)
+        legs = len(points) - 1
+        starts.append((points[None, :-1] + offsets).reshape(-1, 3))
+        ends.append((points[None, 1:] + offsets).reshape(-1, 3))
+        radius.append(np.full(rec["count"] * legs, BAR_DIAMETERS[rec["type"]] / 2.0))
+        record.append(np.full(rec["count"] * legs, r))
+        position.append(np.repeat(np.arange(rec["count"]), legs))
+    main = np.array([len(rec["points"]) == 2 and rec["layer"] != "EX" for rec in plan["records"]])
+    record = np.concatenate(record)
+    return Segments(np.concatenate(starts), np.concatenate(ends), np.concatenate(radius), record,
+                    np.concatenate(position), main[record])
+
+
+def candidate_pairs(segments, reach, cell_size=CELL_SIZE):
+    # Pairs (i < j) of segments whose boxes, grown by 'reach', share a grid cell
+    low = np.floor((np.minimum(segments.start, segments.end) - reach[:, None]) / cell_size).astype(np.int64)
+    high = np.floor((np.maximum(segments.start, segments.end) + reach[:, None]) / cell_size).astype(np.int64)
+    extent = high - low + 1
+    cells = extent.prod(axis=1)
+    owner = np.repeat(np.arange(len(cells)), cells)
+    local = np.arange(cells.sum()) - np.repeat(np.cumsum(cells) - cells, cells)
+    nx, ny = extent[owner, 0], extent[owner, 1]
+    cx = low[owner, 0] + local % nx
+    cy = low[owner, 1] + (local // nx) % ny
+    cz = low[owner, 2] + local // (nx * ny)
+    span = np.array([cx.max() - cx.min() + 1, cy.max() - cy.min() + 1])
+    key = ((cz - cz.min()) * span[1] + (cy - cy.min())) * span[0] + (cx - cx.min())
+
+    order = np.argsort(key, kind='stable')
+    key, owner = key[order], owner[order]
+    group_start = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    group_size = np.diff(np.r_[group_start, len(key)])
+    # Every entry pairs with the entries after it in its cell
+    index = np.arange(len(key))
+    after = np.repeat(group_start + group_size, group_size) - index - 1
+    first = np.repeat(index, after)
+    second = first + 1 + np.arange(after.sum()) - np.repeat(np.cumsum(after) - after, after)
+    i, j = owner[first], owner[second]
+    pairs = np.unique(np.minimum(i, j) * len(cells) + np.maximum(i, j))
+    return pairs // len(cells), pairs % len(cells)
+
+
+def segment_distances(p1, q1, p2, q2):
+    # Closest distance between segments p1-q1 and p2-q2, row by row, and the middle of
+    # the two closest points. A segment of zero length (a leg of no length) is a point.
+    d1, d2, r = q1 - p1, q2 - p2, p1 - p2
+    a = np.einsum('ij,ij->i', d1, d1)
+    e = np.einsum('ij,ij->i', d2, d2)
+    b = np.einsum('ij,ij->i', d1, d2)
+    c = np.einsum('ij,ij->i', d1, r)
+    f = np.einsum('ij,ij->i', d2, r)
+    denominator = a * e - b * b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = np.where(denominator > 1e-9 * a * e, np.clip((b * f - c * e) / denominator, 0, 1), 0.0)
+        t = (b * s + f) / e
+        s = np.where(t < 0, np.clip(-c / a, 0, 1), np.where(t > 1, np.clip((b - c) / a, 0, 1), s))
+        t = np.clip(t, 0, 1)
+        point1, point2 = a <= 1e-12, e <= 1e-12
+        s = np.where(point1, 0.0, np.where(point2, np.clip(-c / a, 0, 1), s))
+        t = np.where(point2, 0.0, np.where(point1, np.clip(f / e, 0, 1), t))
+    c1 = p1 + d1 * s[:, None]
+    c2 = p2 + d2 * t[:, None]
+    return np.linalg.norm(c1 - c2, axis=1), (c1 + c2) / 2
+
+
+def _report(kind, records, first, second, clear, required, points):
+    # One Violation per pair of records, with the worst case of the pair
+    violations = []
+    if not len(clear):
+        return violations
+    pair = first * len(records) + (second if second is not None else 0)
+    order = np.lexsort((clear - required, pair))
+    pair, first_r = pair[order], first[order]
+    starts = np.flatnonzero(np.r_[True, pair[1:] != pair[:-1]])
+    counts = np.diff(np.r_[starts, len(pair)])
+    for start, count in zip(starts, counts):
+        worst = order[start]
+        violations.append(Violation(
+            kind, records[first_r[start]], None if second is None else records[second[worst]],
+            float(clear[worst]), float(required[worst]), int(count), tuple(float(c) for c in points[worst])))
+    return violations
+
+
+def _label(record):
+    return "{}/{} {}".format(record["layer"], record["index"], record["type"])
+
+
+def check_cover(plan, segments, tolerance):
+    # Bars outside the cover envelope: within the cover from both faces and within the
+    # end cover from both ends of the panel
+    panel = plan["panel"]
+    points = np.concatenate([segments.start, segments.end])
+    radius = np.tile(segments.radius, 2)
+    excess = np.max([
+        np.abs(points[:, 1]) + radius - (panel["thickness"] / 2 - panel["cover"]),
+        panel["end_cover"] - (points[:, 0] - radius),
+        points[:, 0] + radius - (panel["length"] - panel["end_cover"]),
+    ], axis=0)
+    bad = np.flatnonzero(excess > tolerance)
+    labels = [_label(record) for record in plan["records"]]
+    records = np.tile(segments.record, 2)[bad]
+    return _report('cover', labels, records, None, -excess[bad], np.zeros(len(bad)), points[bad])
+
+
+def check_plan(plan, rule=DEFAULT_RULE, cell_size=CELL_SIZE):
+    # All violations of one placement plan, in the panel frame
+    segments = plan_segments(plan)
+    required_max = max(rule.min_clear, rule.diameter_factor * 2 * segments.radius.max())
+    i, j = candidate_pairs(segments, segments.radius + required_max / 2, cell_size)
+    # Legs of the same bar do not count against each other
+    keep = (segments.record[i] != segments.record[j]) | (segments.position[i] != segments.position[j])
+    i, j = i[keep], j[keep]
+    distance, points = segment_distances(segments.start[i], segments.end[i], segments.start[j], segments.end[j])
+    clear = distance - segments.radius[i] - segments.radius[j]
+
+    records = plan["records"]
+    layer = np.array([record["layer"] for record in records])
+    index = np.array([record["index"] for record in records])
+    ri, rj = segments.record[i], segments.record[j]
+    lap = ((layer[ri] == layer[rj]) & (np.abs(index[ri] - index[rj]) == 1) &
+           (segments.position[i] == segments.position[j]))
+    required = np.maximum(rule.min_clear, rule.diameter_factor * 2 * np.maximum(segments.radius[i],
+                                                                                 segments.radius[j]))
+    clash = clear < -rule.tolerance
+    spacing = ~clash & segments.main[i] & segments.main[j] & ~lap & (clear < required - rule.tolerance)
+
+    labels = [_label(record) for record in records]
+    first, second = np.minimum(ri, rj), np.maximum(ri, rj)
+    violations = _report('clash', labels, first[clash], second[clash], clear[clash],
+                         np.zeros(clash.sum()), points[clash])
+    violations += _report('spacing', labels, first[spacing], second[spacing], clear[spacing],
+                          required[spacing], points[spacing])
+    violations += check_cover(plan, segments, rule.tolerance)
+    return violations
+
+
+def print_violations(violations, panel=None):
+    where = "" if panel is None else "Panel {}: ".format(panel)
+    if not violations:
+        print("{}no clashes, spacing or cover problems.".format(where))
+        return
+    for v in violations:
+        if v.kind == 'cover':
+            print("{}cover   {:<12} {:>4} points up to {:.1f} mm into the cover at ({:.0f}, {:.0f}, {:.0f})".format(
+                where, v.first, v.count, -v.clear, *v.point))
+        else:
+            print("{}{:<7} {:<12} {:<12} {:>4} pairs, clear {:.1f} mm (min {:.0f}) at ({:.0f}, {:.0f}, {:.0f})".format(
+                where, v.kind, v.first, v.second, v.count, v.clear, v.required, *v.point))
@@ -0,0 +1,162 @@
+# Creation, mirroring and copying of the EX-links.
+from Autodesk.Revit.DB import Transaction, XYZ, Plane, ElementTransformUtils, ElementId
+from Autodesk.Revit.DB.Structure import Rebar, RebarStyle, RebarHookOrientation
+from System.Collections.Generic import List
+
+from dwall.adapter import panel_frame
+from dwall.lookup import get_lookup
+from dwall.query import iter_rebar_ids
+from dwall.transactions import TransactionScheduler
+
+# Number of copy levels per transaction when EX-links are copied rather than laid out
+COPY_CHUNK_SIZE = 50
+
+
+def find_rebars_by_type(doc, type_name, host=None):
+    # The type (and host) filtering runs in Revit; only the matching bars are fetched
+    rebar_type = get_lookup(doc).bar_type(type_name)
+    if rebar_type is None:
+        print(f"No rebar type found with the name '{type_name}'.")
+        return []
+    return [doc.GetElement(rebar_id) for rebar_id in iter_rebar_ids(doc, rebar_type.Id, host)]
+
+
+def create_ex_link_rebar(doc, wall, rebar_type, curve_list):
+    t = Transaction(doc, 'Create EX-Link Rebar')
+    t.Start()
+    try:
+        rebar = Rebar.CreateFromCurves(doc, RebarStyle.Standard, rebar_type, None, None, wall, XYZ.BasisZ, curve_list, RebarHookOrientation.Left, RebarHookOrientation.Right, True, True)
+        t.Commit()
+        print("The EX-link rebar is created.")  # Confirmation message
+        return rebar
+    except Exception as e:
+        t.RollBack()
+        print("Failed to create EX-Link Rebar: {}".format(str(e)))
+        return None
+
+
+def panel_mirror_plane(wall):
+    # Centre plane of a panel: through its location line, normal to the wall faces
+    frame = panel_frame(wall)
+    return Plane.CreateByNormalAndOrigin(XYZ(*frame.y_axis), XYZ(*frame.origin))
+
+
+def mirror_copies(doc, rebars, plane):
+    # Mirrored copies of the rebars with a single MirrorElements call; the caller owns the
+    # open transaction
+    ids = List[ElementId]()
+    for rebar in rebars:
+        ids.Add(rebar.Id)
+    return list(ElementTransformUtils.MirrorElements(doc, ids, plane, True))
+
+
+def mirror_ex_links(doc, rebars, plane):
+    # Mirror copies of all the EX-links of a panel about one plane in one transaction.
+    # Returns the ids of the mirrored copies.
+    if not rebars:
+        return []
+    with Transaction(doc, "Mirror EX-links") as trans:
+        trans.Start()
+        try:
+            mirrored_ids = mirror_copies(doc, rebars, plane)
+            trans.Commit()
+        except Exception as e:
+            print(f"Failed to mirror the EX-links: {str(e)}")
+            trans.RollBack()
+            return []
+    print(f"{len(mirrored_ids)} EX-links mirrored successfully.")
+    return mirrored_ids
+
+
+def mirror_ex_links_by_panel(doc, rebars):
+    # Mirror the EX-links of every panel about that panel's centre plane, all in one
+    # transaction with one MirrorElements call per panel. Returns the new ids per host id.
+    by_host = {}
+    for rebar in rebars:
+        by_host.setdefault(rebar.GetHostId(), []).append(rebar)
+    mirrored = {}
+    with Transaction(doc, "Mirror EX-links") as trans:
+        trans.Start()
+        try:
+            for host_id, host_rebars in by_host.items():
+                mirrored[host_id] = mirror_copies(doc, host_rebars, panel_mirror_plane(doc.GetElement(host_id)))
+            trans.Commit()
+        except Exception as e:
+            print(f"Failed to mirror the EX-links: {str(e)}")
+            trans.RollBack()
+            return {}
+    print(f"{sum(len(ids) for ids in mirrored.values())} EX-links of {len(mirrored)} panels mirrored successfully.")
+    return mirrored
+
+
+def layout_ex_links(doc, rebars, num_copies, spacing):
+    # Turn each EX-link into a set of num_copies bars spaced down the wall. The links are
+    # drawn in a horizontal plane with +Z as normal, so the set goes to the other side (-Z).
+    # The caller owns the open transaction.
+    for rebar in rebars:
+        rebar.GetShapeDrivenAccessor().SetLayoutAsNumberWithSpacing(num_copies, spacing / 304.8, False, True, True)
+
+
+def copy_offsets(num_copies, spacing):
+    # Translation of every copy from the original, down the wall at 'spacing' mm
+    return [XYZ(0, 0, -i * spacing / 304.8) for i in range(1, num_copies)]
+
+
+def copy_ex_links(doc, rebars, offsets):
+    # Copy the EX-links to each of the offsets, always from the originals so no copy
+    # depends on the previous one. CopyElements does not return the copies in the order
+    # of its input, so each link is copied on its own call: the ids come back one per
+    # link per offset, in the order of 'rebars'. The caller owns the open transaction.
+    copied_ids = []
+    for offset in offsets:
+        for rebar in rebars:
+            ids = List[ElementId]()
+            ids.Add(rebar.Id)
+            copied_ids.append(list(ElementTransformUtils.CopyElements(doc, ids, offset))[0])
+    return copied_ids
+
+
+def copy_in_chunks(doc, rebars, num_copies, spacing, chunk_size=COPY_CHUNK_SIZE, name="Copy Rebar"):
+    # All offsets are computed up front, then copied chunk_size levels per transaction so a
+    # long wall does not build one huge undo record; the chunks are assimilated into one
+    # undo step. A failing chunk is rolled back alone. Returns the ids of the copies, one
+    # per rebar per level (level by level), with None for the levels rolled back.
+    scheduler = TransactionScheduler(doc, name, chunk_size)
+    levels = scheduler.run(copy_offsets(num_copies, spacing),
+                           lambda chunk: [copy_ex_links(doc, rebars, [offset]) for offset in chunk])
+    scheduler.print_timings()
+    copied_ids = []
+    for ids in levels:
+        copied_ids.extend(ids if ids is not None else [None] * len(rebars))
+    return copied_ids
+
+
+def array_ex_links(doc, rebars, num_copies, spacing, use_layout=True, chunk_size=COPY_CHUNK_SIZE):
+    # Array the EX-links num_copies times at 'spacing' mm down the wall, either as rebar sets
+    # with a layout rule or as batched copies. Links that already are sets are left alone.
+    rebars = [rebar for rebar in rebars if rebar.NumberOfBarPositions == 1]
+    if not rebars:
+        print("No single EX-links to array.")
+        return []
+
+    if use_layout:
+        with Transaction(doc, "Array EX-links") as trans:
+            trans.Start()
+            try:
+                layout_ex_links(doc, rebars, num_copies, spacing)
+                trans.Commit()
+            except Exception as e:
+                print(f"Failed to array the EX-links: {str(e)}")
+                trans.RollBack()
+                return []
+        copied_ids = []
+    else:
+        copied_ids = copy_in_chunks(doc, rebars, num_copies, spacing, chunk_size, "Array EX-links")
+        if num_copies > 1 and all(i is None for i in copied_ids):
+            return []
+
+    copies_elements = len(rebars) * num_copies
+    elements = len(rebars) if use_layout else copies_elements
+    print(f"{len(rebars)} EX-links arrayed {num_copies} times: {elements} elements "
+          f"instead of {copies_elements} ({copies_elements - elements} fewer).")
+    return copied_ids
@@ -0,0 +1,1181 @@
+# Local stand-in for the part of the Revit API used by the D-wall scripts.
+#
+# install() registers fake 'clr', 'Autodesk.Revit.DB', 'Autodesk.Revit.DB.Structure'
+# and 'System.Collections.Generic' modules so the scripts and the dwall engines can
+# be imported and run on a machine without Revit. Every document keeps a counter of
+# transactions, regenerations and API calls so different strategies can be compared.
+#
+# A document can also charge a simulated cost in seconds for what is expensive in Revit
+# (see REVIT_COSTS): every API call, every element created, copied or deleted, every
+# element or id handed to Python, every transaction and every regeneration, which
+# grows with the size of the model. The costs add up in doc.simulated_time; nothing
+# sleeps. API calls without a document (Line.CreateBound) are counted in static_calls,
+# and the assemblies referenced with clr.AddReference in assembly_references.
+import math
+import sys
+import types
+from collections import Counter
+
+# Calls of the API that do not go through a document
+static_calls = Counter()
+
+# Assemblies referenced with clr.AddReference, and how many times
+assembly_references = Counter()
+
+# Simulated costs in seconds; all zero unless a document is given other costs
+NO_COSTS = {
+    'call': 0.0,                  # Every API call, unless the call has its own entry
+    'element': 0.0,               # Every element created, copied or deleted
+    'marshal': 0.0,               # Every element handed to Python
+    'marshal id': 0.0,            # Every id handed to Python
+    'transaction': 0.0,           # Every transaction started
+    'regenerate': 0.0,            # Every regeneration
+    'regenerate element': 0.0,    # Every element of the model, per regeneration
+}
+
+# Rough orders of magnitude of a desktop Revit session, to compare strategies with
+# each other; not a prediction of the time in any real model
+REVIT_COSTS = dict(NO_COSTS, **{
+    'call': 20e-6,
+    'element': 150e-6,
+    'marshal': 5e-6,
+    'marshal id': 0.5e-6,
+    'transaction': 2e-3,
+    'regenerate': 5e-3,
+    'regenerate element': 2e-6,
+    'Rebar.CreateFromCurves': 1e-3,
+    'RebarShapeDrivenAccessor.SetLayout': 0.5e-3,
+    'FilteredElementCollector': 0.2e-3,
+})
+
+
+# ---------------------------------------------------------------------------
+# Geometry
+# ---------------------------------------------------------------------------
+
+class XYZ(object):
+    __slots__ = ('X', 'Y', 'Z')
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.X = float(x)
+        self.Y = float(y)
+        self.Z = float(z)
+
+    def __add__(self, other):
+        return XYZ(self.X + other.X, self.Y + other.Y, self.Z + other.Z)
+
+    def __sub__(self, other):
+        return XYZ(self.X - other.X, self.Y - other.Y, self.Z - other.Z)
+
+    def __mul__(self, factor):
+        return XYZ(self.X * factor, self.Y * factor, self.Z * factor)
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return XYZ(-self.X, -self.Y, -self.Z)
+
+    def __repr__(self):
+        return 'XYZ({:.6f}, {:.6f}, {:.6f})'.format(self.X, self.Y, self.Z)
+
+    def Add(self, other):
+        return self + other
+
+    def Subtract(self, other):
+        return self - other
+
+    def Multiply(self, factor):
+        return self * factor
+
+    def DotProduct(self, other):
+        return self.X * other.X + self.Y * other.Y + self.Z * other.Z
+
+    def CrossProduct(self, other):
+        return XYZ(self.Y * other.Z - self.Z * other.Y,
+                   self.Z * other.X - self.X * other.Z,
+                   self.X * other.Y - self.Y * other.X)
+
+    def GetLength(self):
+        return math.sqrt(self.DotProduct(self))
+
+    def Normalize(self):
+        length = self.GetLength()
+        return XYZ(self.X / length, self.Y / length, self.Z / length)
+
+    def DistanceTo(self, other):
+        return (self - other).GetLength()
+
+    def IsAlmostEqualTo(self, other, tolerance=1e-9):
+        return self.DistanceTo(other) <= tolerance
+
+
+XYZ.Zero = XYZ(0, 0, 0)
+XYZ.BasisX = XYZ(1, 0, 0)
+XYZ.BasisY = XYZ(0, 1, 0)
+XYZ.BasisZ = XYZ(0, 0, 1)
+
+
+class Curve(object):
+    pass
+
+
+class Line(Curve):
+    def __init__(self, start, end):
+        self._start = start
+        self._end = end
+
+    @staticmethod
+    def CreateBound(start, end):
+        static_calls['Line.CreateBound'] += 1
+        if start.DistanceTo(end) < 1e-6:
+            raise ArgumentsInconsistentException('Curve length is too small for Revit\'s tolerance')
+        return Line(start, end)
+
+    def GetEndPoint(self, index):
+        return self._start if index == 0 else self._end
+
+    @property
+    def Length(self):
+        return self._start.DistanceTo(self._end)
+
+    @property
+    def Direction(self):
+        return (self._end - self._start).Normalize()
+
+    def CreateTransformed(self, transform):
+        return Line(transform.OfPoint(self._start), transform.OfPoint(self._end))
+
+
+class Transform(object):
+    def __init__(self, origin=None, basis_x=None, basis_y=None, basis_z=None):
+        self.Origin = origin or XYZ.Zero
+        self.BasisX = basis_x or XYZ.BasisX
+        self.BasisY = basis_y or XYZ.BasisY
+        self.BasisZ = basis_z or XYZ.BasisZ
+
+    @staticmethod
+    def CreateTranslation(vector):
+        return Transform(origin=vector)
+
+    def OfPoint(self, point):
+        return (self.Origin + self.BasisX * point.X + self.BasisY * point.Y
+                + self.BasisZ * point.Z)
+
+    def OfVector(self, vector):
+        return self.BasisX * vector.X + self.BasisY * vector.Y + self.BasisZ * vector.Z
+
+    @staticmethod
+    def CreateReflection(plane):
+        # p' = p - 2 ((p - o) . n) n
+        n = plane.Normal
+        reflect = lambda v: v - n * (2 * v.DotProduct(n))
+        return Transform(n * (2 * plane.Origin.DotProduct(n)), reflect(XYZ.BasisX), reflect(XYZ.BasisY),
+                         reflect(XYZ.BasisZ))
+
+
+class Plane(object):
+    def __init__(self, normal, origin):
+        self.Normal = normal.Normalize()
+        self.Origin = origin
+
+    @staticmethod
+    def CreateByNormalAndOrigin(normal, origin):
+        return Plane(normal, origin)
+
+
+class LocationCurve(object):
+    def __init__(self, curve):
+        self.Curve = curve
+
+
+class BoundingBoxXYZ(object):
+    def __init__(self, minimum, maximum):
+        self.Min = minimum
+        self.Max = maximum
+
+
+def _bounding_box(points):
+    return BoundingBoxXYZ(XYZ(min(p.X for p in points), min(p.Y for p in points), min(p.Z for p in points)),
+                          XYZ(max(p.X for p in points), max(p.Y for p in points), max(p.Z for p in points)))
+
+
+# ---------------------------------------------------------------------------
+# Exceptions
+# ---------------------------------------------------------------------------
+
+class InvalidOperationException(Exception):
+    pass
+
+
+class ArgumentsInconsistentException(Exception):
+    pass
+
+
+class ModificationOutsideTransactionException(InvalidOperationException):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Units
+# ---------------------------------------------------------------------------
+
+class ForgeTypeId(object):
+    def __init__(self, type_id):
+        self.TypeId = type_id
+
+    def __eq__(self, other):
+        return isinstance(other, ForgeTypeId) and self.TypeId == other.TypeId
+
+    def __hash__(self):
+        return hash(self.TypeId)
+
+
+class UnitTypeId(object):
+    Feet = ForgeTypeId('autodesk.unit.unit:feet-1.0.1')
+    Meters = ForgeTypeId('autodesk.unit.unit:meters-1.0.1')
+    Millimeters = ForgeTypeId('autodesk.unit.unit:millimeters-1.0.1')
+    KilogramsPerMeter = ForgeTypeId('autodesk.unit.unit:kilogramsPerMeter-1.0.1')
+
+
+# Internal units (feet, kg) per unit
+_UNIT_FACTORS = {
+    UnitTypeId.Feet: 1.0,
+    UnitTypeId.Meters: 1 / 0.3048,
+    UnitTypeId.Millimeters: 1 / 304.8,
+    UnitTypeId.KilogramsPerMeter: 0.3048,
+}
+
+
+class UnitUtils(object):
+    # Not tied to a document, so the calls are counted here
+    conversions = 0
+
+    @staticmethod
+    def ConvertToInternalUnits(value, unit_type_id):
+        UnitUtils.conversions += 1
+        return value * _UNIT_FACTORS[unit_type_id]
+
+    @staticmethod
+    def ConvertFromInternalUnits(value, unit_type_id):
+        UnitUtils.conversions += 1
+        return value / _UNIT_FACTORS[unit_type_id]
+
+
+# ---------------------------------------------------------------------------
+# Elements
+# ---------------------------------------------------------------------------
+
+class ElementId(object):
+    __slots__ = ('IntegerValue',)
+
+    def __init__(self, value):
+        self.IntegerValue = int(value)
+
+    @property
+    def Value(self):
+        return self.IntegerValue
+
+    def __eq__(self, other):
+        return isinstance(other, ElementId) and other.IntegerValue == self.IntegerValue
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.IntegerValue)
+
+    def __repr__(self):
+        return 'ElementId({})'.format(self.IntegerValue)
+
+
+ElementId.InvalidElementId = ElementId(-1)
+
+
+class BuiltInCategory(object):
+    INVALID = -1
+    OST_Walls = -2000011
+    OST_Rebar = -2009000
+
+
+class Category(object):
+    def __init__(self, built_in):
+        self.Id = ElementId(built_in)
+
+
+class Element(object):
+    category = BuiltInCategory.INVALID
+    is_type = False
+
+    def __init__(self, doc, name=''):
+        self.Document = doc
+        self.Name = name
+        self.Id = ElementId.InvalidElementId
+        self.IsValidObject = True
+        self.Category = Category(self.category)
+        self.type_id = ElementId.InvalidElementId
+        self._parameters = {}
+        if not self.is_type:
+            for name in _BUILT_IN_NAMES.values():
+                self._parameters[name] = Parameter(self, name, StorageType.String, None)
+
+    def Equals(self, other):
+        return self is other
+
+    def LookupParameter(self, name):
+        self.Document._call('Element.LookupParameter')
+        return self._parameters.get(name)
+
+    def get_Parameter(self, parameter):
+        # By BuiltInParameter or by Definition
+        self.Document._call('Element.get_Parameter')
+        name = parameter.Name if isinstance(parameter, Definition) else _BUILT_IN_NAMES.get(parameter)
+        return self._parameters.get(name)
+
+    @property
+    def Parameters(self):
+        return list(self._parameters.values())
+
+    def _copy_parameters(self, source):
+        self._parameters = dict((name, parameter._copy(self)) for name, parameter in source._parameters.items())
+
+    def _move(self, transform):
+        pass
+
+    def GetTypeId(self):
+        return self.type_id
+
+    def ChangeTypeId(self, type_id):
+        self.Document._require_transaction('ChangeTypeId')
+        self.type_id = type_id
+        # Instances are named after their type
+        self.Name = self.Document._elements[type_id.IntegerValue].Name
+        self.Document._modified(self)
+        return self.Id
+
+    def get_BoundingBox(self, view):
+        return None
+
+
+class ElementType(Element):
+    is_type = True
+
+
+class HostObject(Element):
+    pass
+
+
+class Wall(HostObject):
+    category = BuiltInCategory.OST_Walls
+
+    def __init__(self, doc, name='', location=None, width=0.0, bottom=0.0, top=0.0):
+        HostObject.__init__(self, doc, name)
+        self.Location = location
+        self.Width = width
+        self.bottom = bottom
+        self.top = top
+
+    def get_BoundingBox(self, view):
+        if self.Location is None:
+            return None
+        curve = self.Location.Curve
+        start, end = curve.GetEndPoint(0), curve.GetEndPoint(1)
+        side = XYZ.BasisZ.CrossProduct(curve.Direction) * (self.Width / 2)
+        points = [point + side * sign + XYZ(0, 0, level)
+                  for point in (start, end) for sign in (-1, 1) for level in (self.bottom, self.top)]
+        return _bounding_box(points)
+
+
+class RebarBarType(ElementType):
+    category = BuiltInCategory.OST_Rebar
+
+    def __init__(self, doc, name='', diameter=0.0):
+        ElementType.__init__(self, doc, name)
+        self.BarNominalDiameter = diameter
+        self.BarModelDiameter = diameter
+
+
+class RebarStyle(object):
+    Standard = 0
+    StirrupTie = 1
+
+
+class RebarHookOrientation(object):
+    Right = -1
+    Left = 1
+
+
+class Rebar(Element):
+    category = BuiltInCategory.OST_Rebar
+
+    def __init__(self, doc, bar_type, host, curves, normal):
+        Element.__init__(self, doc, bar_type.Name)
+        self.type_id = bar_type.Id
+        self.host_id = host.Id
+        self.curves = list(curves)
+        self.normal = normal
+        self.positions = 1
+        self.spacing = 0.0
+        self.on_normal_side = True
+
+    @staticmethod
+    def CreateFromCurves(doc, style, bar_type, start_hook, end_hook, host, norm, curves,
+                         start_hook_orient, end_hook_orient, use_existing_shape, create_new_shape):
+        doc._call('Rebar.CreateFromCurves')
+        doc._require_transaction('Rebar.CreateFromCurves')
+        if bar_type is None or host is None:
+            raise ArgumentsInconsistentException('Bar type and host are required')
+        return doc._add(Rebar(doc, bar_type, host, curves, norm))
+
+    def GetHostId(self):
+        return self.host_id
+
+    @property
+    def NumberOfBarPositions(self):
+        return self.positions
+
+    @property
+    def Quantity(self):
+        return self.positions
+
+    def GetShapeDrivenAccessor(self):
+        return RebarShapeDrivenAccessor(self)
+
+    def _position_offset(self, index):
+        step = self.spacing if self.on_normal_side else -self.spacing
+        return self.normal * (index * step)
+
+    def GetCenterlineCurves(self, adjust_for_self_intersection, suppress_hooks, suppress_bend_radius,
+                            multiplanar_option=None, bar_position_index=0):
+        if bar_position_index == 0:
+            return list(self.curves)
+        translation = Transform.CreateTranslation(self._position_offset(bar_position_index))
+        return [curve.CreateTransformed(translation) for curve in self.curves]
+
+    @property
+    def MaxSpacing(self):
+        return self.spacing
+
+    @property
+    def TotalLength(self):
+        return sum(curve.Length for curve in self.curves) * self.positions
+
+    def get_BoundingBox(self, view):
+        points = []
+        for index in (0, self.positions - 1):
+            for curve in self.GetCenterlineCurves(False, True, True, None, index):
+                points.append(curve.GetEndPoint(0))
+                points.append(curve.GetEndPoint(1))
+        return _bounding_box(points)
+
+    def _transformed(self, transform):
+        copy = Rebar.__new__(Rebar)
+        Element.__init__(copy, self.Document, self.Name)
+        copy.type_id = self.type_id
+        copy.host_id = self.host_id
+        copy.curves = [curve.CreateTransformed(transform) for curve in self.curves]
+        copy.normal = transform.OfVector(self.normal)
+        copy.positions = self.positions
+        copy.spacing = self.spacing
+        copy.on_normal_side = self.on_normal_side
+        copy._copy_parameters(self)
+        return copy
+
+    def _move(self, transform):
+        self.curves = [curve.CreateTransformed(transform) for curve in self.curves]
+
+
+class RebarHostData(object):
+    def __init__(self, host):
+        self._host = host
+
+    @staticmethod
+    def GetRebarHostData(host):
+        host.Document._call('RebarHostData.GetRebarHostData')
+        return RebarHostData(host)
+
+    def IsValidHost(self):
+        return isinstance(self._host, HostObject)
+
+    def GetRebarsInHost(self):
+        # Revit keeps this per host, so only the hosted bars are visited
+        doc = self._host.Document
+        rebars = [doc._elements[i] for i in doc._hosted.get(self._host.Id.IntegerValue, ())]
+        doc._marshal(len(rebars))
+        return rebars
+
+
+class MultiplanarOption(object):
+    IncludeOnlyPlanarCurves = 0
+    IncludeAllMultiplanarCurves = 1
+
+
+class RebarShapeDrivenAccessor(object):
+    def __init__(self, rebar):
+        self._rebar = rebar
+
+    @property
+    def Normal(self):
+        return self._rebar.normal
+
+    def _set_layout(self, positions, spacing, bars_on_normal_side):
+        doc = self._rebar.Document
+        doc._call('RebarShapeDrivenAccessor.SetLayout')
+        doc._require_transaction('SetLayout')
+        if positions < 1:
+            raise ArgumentsInconsistentException('The number of bar positions must be at least 1')
+        self._rebar.positions = positions
+        self._rebar.spacing = spacing
+        self._rebar.on_normal_side = bars_on_normal_side
+
+    def SetLayoutAsSingle(self):
+        self._set_layout(1, 0.0, True)
+
+    def SetLayoutAsFixedNumber(self, number_of_bar_positions, array_length, bars_on_normal_side,
+                               include_first_bar, include_last_bar):
+        spacing = array_length / (number_of_bar_positions - 1) if number_of_bar_positions > 1 else 0.0
+        self._set_layout(number_of_bar_positions, spacing, bars_on_normal_side)
+
+    def SetLayoutAsNumberWithSpacing(self, number_of_bar_positions, spacing, bars_on_normal_side,
+                                     include_first_bar, include_last_bar):
+        self._set_layout(number_of_bar_positions, spacing, bars_on_normal_side)
+
+
+# ---------------------------------------------------------------------------
+# Collectors
+# ---------------------------------------------------------------------------
+
+class BuiltInParameter(object):
+    INVALID = -1
+    ELEM_TYPE_PARAM = -1002052
+    ALL_MODEL_MARK = -1001203
+    ALL_MODEL_INSTANCE_COMMENTS = -1010106
+
+
+# Built-in parameters every instance carries, by name
+_BUILT_IN_NAMES = {
+    BuiltInParameter.ALL_MODEL_MARK: 'Mark',
+    BuiltInParameter.ALL_MODEL_INSTANCE_COMMENTS: 'Comments',
+}
+
+
+class StorageType(object):
+    Integer = 1
+    Double = 2
+    String = 3
+    ElementId = 4
+
+
+class Definition(object):
+    def __init__(self, name):
+        self.Name = name
+
+
+class Parameter(object):
+    def __init__(self, element, name, storage_type, value, read_only=False):
+        self.Element = element
+        self.Definition = Definition(name)
+        self.StorageType = storage_type
+        self.IsReadOnly = read_only
+        self._value = value
+
+    @property
+    def HasValue(self):
+        return self._value is not None
+
+    def AsString(self):
+        return self._value if self.StorageType == StorageType.String else None
+
+    def AsDouble(self):
+        return float(self._value or 0.0) if self.StorageType == StorageType.Double else 0.0
+
+    def AsInteger(self):
+        return int(self._value or 0) if self.StorageType == StorageType.Integer else 0
+
+    def AsElementId(self):
+        return self._value if self.StorageType == StorageType.ElementId else ElementId.InvalidElementId
+
+    def Set(self, value):
+        doc = self.Element.Document
+        doc._call('Parameter.Set')
+        doc._require_transaction('Parameter.Set')
+        if self.IsReadOnly:
+            raise InvalidOperationException("The parameter '{}' is read-only".format(self.Definition.Name))
+        self._value = value
+        doc._modified(self.Element)
+        return True
+
+    def _copy(self, element):
+        return Parameter(element, self.Definition.Name, self.StorageType, self._value, self.IsReadOnly)
+
+
+def _parameter_value(element, parameter_id):
+    if parameter_id == BuiltInParameter.ELEM_TYPE_PARAM:
+        return element.GetTypeId()
+    parameter = element._parameters.get(_BUILT_IN_NAMES.get(parameter_id))
+    return parameter._value if parameter is not None else None
+
+
+class Outline(object):
+    def __init__(self, minimum, maximum):
+        self.MinimumPoint = minimum
+        self.MaximumPoint = maximum
+
+    def Intersects(self, other, tolerance=0.0):
+        a_min, a_max, b_min, b_max = self.MinimumPoint, self.MaximumPoint, other.MinimumPoint, other.MaximumPoint
+        return (a_min.X <= b_max.X + tolerance and b_min.X <= a_max.X + tolerance and
+                a_min.Y <= b_max.Y + tolerance and b_min.Y <= a_max.Y + tolerance and
+                a_min.Z <= b_max.Z + tolerance and b_min.Z <= a_max.Z + tolerance)
+
+
+class ElementFilter(object):
+    def PassesFilter(self, element):
+        raise NotImplementedError
+
+
+class ElementClassFilter(ElementFilter):
+    def __init__(self, cls):
+        self._cls = cls
+
+    def PassesFilter(self, element):
+        return isinstance(element, self._cls)
+
+
+class BoundingBoxIntersectsFilter(ElementFilter):
+    def __init__(self, outline, tolerance=0.0):
+        self._outline = outline
+        self._tolerance = tolerance
+
+    def PassesFilter(self, element):
+        bbox = element.get_BoundingBox(None)
+        return bbox is not None and self._outline.Intersects(Outline(bbox.Min, bbox.Max), self._tolerance)
+
+
+class FilterRule(object):
+    def __init__(self, parameter_id, value):
+        self.parameter_id = parameter_id
+        self.value = value
+
+    def ElementPasses(self, element):
+        return _parameter_value(element, self.parameter_id.IntegerValue) == self.value
+
+
+class ParameterFilterRuleFactory(object):
+    @staticmethod
+    def CreateEqualsRule(parameter_id, value, *args):
+        return FilterRule(parameter_id, value)
+
+
+class ElementParameterFilter(ElementFilter):
+    def __init__(self, rule, inverted=False):
+        self._rules = rule if isinstance(rule, list) else [rule]
+        self._inverted = inverted
+
+    def PassesFilter(self, element):
+        return all(rule.ElementPasses(element) for rule in self._rules) != self._inverted
+
+
+class FilteredElementIdIterator(object):
+    def __init__(self, ids):
+        self._ids = ids
+        self._iterator = None
+        self.Current = None
+
+    def Reset(self):
+        self._iterator = iter(self._ids)
+
+    def MoveNext(self):
+        if self._iterator is None:
+            self.Reset()
+        self.Current = next(self._iterator, None)
+        return self.Current is not None
+
+
+class FilteredElementCollector(object):
+    # Filtering happens on the native side; only what is handed back to Python (elements
+    # or ids) is counted as crossing the managed boundary.
+    def __init__(self, doc, element_ids=None):
+        doc._call('FilteredElementCollector')
+        self._doc = doc
+        self._scope = None if element_ids is None else set(i.IntegerValue for i in element_ids)
+        self._predicates = []
+
+    def _filter(self, predicate):
+        self._predicates.append(predicate)
+        return self
+
+    def OfClass(self, cls):
+        return self._filter(lambda e: isinstance(e, cls))
+
+    def OfCategory(self, category):
+        return self._filter(lambda e: e.category == category)
+
+    def WhereElementIsNotElementType(self):
+        return self._filter(lambda e: not e.is_type)
+
+    def WhereElementIsElementType(self):
+        return self._filter(lambda e: e.is_type)
+
+    def WherePasses(self, element_filter):
+        return self._filter(element_filter.PassesFilter)
+
+    def _matches(self):
+        elements = self._doc._elements
+        if self._scope is None:
+            candidates = list(elements.values())
+        else:
+            candidates = [elements[i] for i in self._scope if i in elements]
+        for element in candidates:
+            if all(predicate(element) for predicate in self._predicates):
+                yield element
+
+    def __iter__(self):
+        for element in self._matches():
+            self._doc._marshal(1)
+            yield element
+
+    def ToElements(self):
+        elements = list(self._matches())
+        self._doc._marshal(len(elements))
+        return elements
+
+    def ToElementIds(self):
+        ids = [element.Id for element in self._matches()]
+        self._doc._marshal_ids(len(ids))
+        return ids
+
+    def GetElementIdIterator(self):
+        doc = self._doc
+
+        def ids():
+            for element in self._matches():
+                doc._marshal_ids(1)
+                yield element.Id
+        return FilteredElementIdIterator(ids())
+
+    def FirstElement(self):
+        for element in self._matches():
+            self._doc._marshal(1)
+            return element
+        return None
+
+    def GetElementCount(self):
+        return sum(1 for _ in self._matches())
+
+
+# ---------------------------------------------------------------------------
+# Transactions
+# ---------------------------------------------------------------------------
+
+class TransactionStatus(object):
+    Uninitialized = 0
+    Started = 1
+    RolledBack = 2
+    Committed = 3
+
+
+class Transaction(object):
+    def __init__(self, doc, name=''):
+        self._doc = doc
+        self.name = name
+        self._status = TransactionStatus.Uninitialized
+        self._snapshot = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._status == TransactionStatus.Started:
+            self.RollBack()
+        return False
+
+    def GetName(self):
+        return self.name
+
+    def GetStatus(self):
+        return self._status
+
+    def HasStarted(self):
+        return self._status == TransactionStatus.Started
+
+    def Start(self):
+        if self._doc._transaction is not None:
+            raise InvalidOperationException('Another transaction is already open')
+        self._doc._transaction = self
+        self._snapshot = self._doc._snapshot()
+        self._status = TransactionStatus.Started
+        self._doc.counters['transactions'] += 1
+        self._doc.simulated_time += self._doc.costs['transaction']
+        return self._status
+
+    def Commit(self):
+        if self._status != TransactionStatus.Started:
+            raise InvalidOperationException('Transaction has not been started')
+        self._doc._transaction = None
+        self._doc._release(self._snapshot)
+        self._doc._regenerate()
+        self._status = TransactionStatus.Committed
+        return self._status
+
+    def RollBack(self):
+        if self._status != TransactionStatus.Started:
+            raise InvalidOperationException('Transaction has not been started')
+        self._doc._transaction = None
+        self._doc._restore(self._snapshot)
+        self._doc.counters['rollbacks'] += 1
+        self._status = TransactionStatus.RolledBack
+        return self._status
+
+
+class TransactionGroup(object):
+    def __init__(self, doc, name=''):
+        self._doc = doc
+        self.name = name
+        self._status = TransactionStatus.Uninitialized
+        self._snapshot = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._status == TransactionStatus.Started:
+            self.RollBack()
+        return False
+
+    def GetStatus(self):
+        return self._status
+
+    def HasStarted(self):
+        return self._status == TransactionStatus.Started
+
+    def Start(self):
+        self._snapshot = self._doc._snapshot()
+        self._status = TransactionStatus.Started
+        self._doc.counters['transaction groups'] += 1
+        return self._status
+
+    def Assimilate(self):
+        self._doc._release(self._snapshot)
+        self._status = TransactionStatus.Committed
+        return self._status
+
+    def Commit(self):
+        self._doc._release(self._snapshot)
+        self._status = TransactionStatus.Committed
+        return self._status
+
+    def RollBack(self):
+        self._doc._restore(self._snapshot)
+        self._status = TransactionStatus.RolledBack
+        return self._status
+
+
+# ---------------------------------------------------------------------------
+# Element transforms
+# ---------------------------------------------------------------------------
+
+class ElementTransformUtils(object):
+    @staticmethod
+    def MirrorElement(doc, element_id, plane):
+        # Like the real method this returns nothing
+        doc._call('ElementTransformUtils.MirrorElement')
+        doc._copy([element_id], Transform.CreateReflection(plane))
+
+    @staticmethod
+    def MirrorElements(doc, element_ids, plane, mirror_copies):
+        doc._call('ElementTransformUtils.MirrorElements')
+        return doc._copy(list(element_ids), Transform.CreateReflection(plane))
+
+    @staticmethod
+    def MoveElement(doc, element_id, translation):
+        doc._call('ElementTransformUtils.MoveElement')
+        doc._move([element_id], Transform.CreateTranslation(translation))
+
+    @staticmethod
+    def MoveElements(doc, element_ids, translation):
+        doc._call('ElementTransformUtils.MoveElements')
+        doc._move(list(element_ids), Transform.CreateTranslation(translation))
+
+    @staticmethod
+    def CopyElement(doc, element_id, translation):
+        doc._call('ElementTransformUtils.CopyElement')
+        return doc._copy([element_id], Transform.CreateTranslation(translation))
+
+    @staticmethod
+    def CopyElements(doc, element_ids, *args):
+        # Both the (doc, ids, XYZ) and the (doc, ids, doc, Transform, options) overloads
+        doc._call('ElementTransformUtils.CopyElements')
+        if isinstance(args[0], XYZ):
+            transform = Transform.CreateTranslation(args[0])
+        else:
+            transform = args[1]
+        return doc._copy(list(element_ids), transform)
+
+
+# ---------------------------------------------------------------------------
+# Document
+# ---------------------------------------------------------------------------
+
+class FakeDocument(object):
+    def __init__(self, title='Fake model', costs=None):
+        self.Title = title
+        self.PathName = ''
+        self.IsValidObject = True
+        self.counters = Counter()
+        # Simulated costs in seconds, see NO_COSTS
+        self.costs = dict(NO_COSTS, **(costs or {}))
+        self.simulated_time = 0.0
+        self._elements = {}
+        # Ids of the rebars of every host id, in creation order
+        self._hosted = {}
+        # Open transactions and groups: the elements added and removed since they started
+        self._journals = []
+        self._next_id = 100000
+        self._transaction = None
+
+    def Equals(self, other):
+        return self is other
+
+    # Instrumentation -------------------------------------------------------
+
+    def _call(self, name):
+        self.counters['api calls'] += 1
+        self.counters[name] += 1
+        self.simulated_time += self.costs.get(name, self.costs['call'])
+
+    def _marshal(self, count):
+        self.counters['elements marshalled'] += count
+        self.simulated_time += count * self.costs['marshal']
+
+    def _marshal_ids(self, count):
+        self.counters['ids marshalled'] += count
+        self.simulated_time += count * self.costs['marshal id']
+
+    def _regenerate(self):
+        self.counters['regenerations'] += 1
+        self.simulated_time += self.costs['regenerate'] + self.costs['regenerate element'] * len(self._elements)
+
+    def Regenerate(self):
+        self._call('Document.Regenerate')
+        self._regenerate()
+
+    # Element storage -------------------------------------------------------
+
+    def _require_transaction(self, operation):
+        if self._transaction is None:
+            raise ModificationOutsideTransactionException(
+                'Attempt to modify the model outside of transaction ({})'.format(operation))
+
+    def _add(self, element):
+        element.Id = ElementId(self._next_id)
+        self._next_id += 1
+        self._elements[element.Id.IntegerValue] = element
+        self._index(element)
+        for added, _, _ in self._journals:
+            added.append(element.Id.IntegerValue)
+        self.simulated_time += self.costs['element']
+        return element
+
+    def _index(self, element):
+        if isinstance(element, Rebar):
+            self._hosted.setdefault(element.host_id.IntegerValue, {})[element.Id.IntegerValue] = None
+
+    def _unindex(self, element):
+        if isinstance(element, Rebar):
+            self._hosted[element.host_id.IntegerValue].pop(element.Id.IntegerValue, None)
+
+    def _modified(self, element):
+        pass
+
+    def _copy(self, element_ids, transform):
+        self._require_transaction('copy')
+        new_ids = []
+        for element_id in element_ids:
+            element = self._elements[element_id.IntegerValue]
+            new_ids.append(self._add(element._transformed(transform)).Id)
+        return new_ids
+
+    def _move(self, element_ids, transform):
+        self._require_transaction('move')
+        for element_id in element_ids:
+            element = self._elements[element_id.IntegerValue]
+            element._move(transform)
+            self._modified(element)
+
+    def _snapshot(self):
+        # Start a journal of the elements added and removed, so a rollback costs what
+        # changed rather than the size of the model
+        journal = ([], {}, self._next_id)
+        self._journals.append(journal)
+        return journal
+
+    def _release(self, journal):
+        self._journals = [j for j in self._journals if j is not journal]
+
+    def _restore(self, journal):
+        added, removed, self._next_id = journal
+        for key in added:
+            element = self._elements.pop(key, None)
+            if element is not None:
+                self._unindex(element)
+                element.IsValidObject = False
+        added = set(added)
+        for key, element in removed.items():
+            if key not in added and key not in self._elements:
+                self._elements[key] = element
+                self._index(element)
+                element.IsValidObject = True
+        self._release(journal)
+
+    def GetElement(self, element_id):
+        self._call('Document.GetElement')
+        return self._elements.get(element_id.IntegerValue)
+
+    def Delete(self, element_ids):
+        # One id or a collection of ids; returns the ids deleted
+        self._call('Document.Delete')
+        self._require_transaction('Delete')
+        deleted = []
+        for element_id in ([element_ids] if isinstance(element_ids, ElementId) else list(element_ids)):
+            element = self._elements.pop(element_id.IntegerValue, None)
+            if element is not None:
+                self._unindex(element)
+                for _, removed, _ in self._journals:
+                    removed.setdefault(element_id.IntegerValue, element)
+                element.IsValidObject = False
+                deleted.append(element_id)
+        self.simulated_time += len(deleted) * self.costs['element']
+        return deleted
+
+    # Model building helpers (used by benchmarks, not part of the Revit API) ---
+
+    def add_wall(self, name='D-wall panel', start=(0, 0, 0), length=6000, thickness=1000, bottom=-40000, top=7000):
+        # Straight wall from 'start' (feet) along X; length, thickness and the bottom and top
+        # levels relative to the location line are in mm
+        origin = XYZ(*start)
+        curve = Line(origin, origin + XYZ(length / 304.8, 0, 0))
+        return self._add(Wall(self, name, LocationCurve(curve), thickness / 304.8, bottom / 304.8, top / 304.8))
+
+    def add_bar_type(self, name, diameter_mm):
+        bar_type = self._add(RebarBarType(self, name, diameter_mm / 304.8))
+        # Shared type parameter of the project, written by the Data mapping script
+        self.add_parameter(bar_type, 'Unit weight', StorageType.Double, None)
+        return bar_type
+
+    def add_element(self, element):
+        return self._add(element)
+
+    def add_parameter(self, element, name, storage_type=StorageType.Double, value=None):
+        element._parameters[name] = Parameter(element, name, storage_type, value)
+        return element._parameters[name]
+
+
+def new_document(panels=1, bar_types=(('H40', 40), ('H32', 32), ('H25', 25), ('H20', 20), ('H16', 16), ('H13', 13)),
+                 costs=None):
+    # Building the model is free: the counters and the simulated time start at zero
+    doc = FakeDocument(costs=costs)
+    for name, diameter in bar_types:
+        doc.add_bar_type(name, diameter)
+    for i in range(panels):
+        doc.add_wall('D-wall panel', start=(i * 6000 / 304.8, 0, 0))
+    doc.counters.clear()
+    doc.simulated_time = 0.0
+    return doc
+
+
+class _UIDocument(object):
+    def __init__(self, doc):
+        self.Document = doc
+
+
+class _UIApplication(object):
+    def __init__(self, doc):
+        self.ActiveUIDocument = _UIDocument(doc)
+
+
+def revit_host(doc):
+    # Object to expose as '__revit__' when running a script against a fake document
+    return _UIApplication(doc)
+
+
+# ---------------------------------------------------------------------------
+# .NET interop
+# ---------------------------------------------------------------------------
+
+class _TypedList(list):
+    def Add(self, item):
+        self.append(item)
+
+    @property
+    def Count(self):
+        return len(self)
+
+
+class List(object):
+    _cache = {}
+
+    def __class_getitem__(cls, item_type):
+        if item_type not in cls._cache:
+            cls._cache[item_type] = type('List[{}]'.format(item_type.__name__), (_TypedList,), {})
+        return cls._cache[item_type]
+
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    return module
+
+
+def _public(names):
+    return dict((name, globals()[name]) for name in names)
+
+
+_DB_NAMES = ['XYZ', 'Curve', 'Line', 'Transform', 'Plane', 'LocationCurve', 'BoundingBoxXYZ', 'ElementId',
+             'BuiltInCategory', 'Category', 'Element', 'ElementType', 'HostObject', 'Wall', 'BuiltInParameter', 'Outline',
+             'ElementFilter', 'ElementClassFilter', 'BoundingBoxIntersectsFilter', 'ParameterFilterRuleFactory',
+             'ElementParameterFilter', 'FilteredElementIdIterator', 'FilteredElementCollector',
+             'TransactionStatus', 'Transaction', 'TransactionGroup', 'ElementTransformUtils',
+             'InvalidOperationException', 'ArgumentsInconsistentException', 'StorageType', 'Definition',
+             'Parameter', 'ForgeTypeId', 'UnitTypeId', 'UnitUtils']
+_STRUCTURE_NAMES = ['Rebar', 'RebarShapeDrivenAccessor', 'RebarHostData', 'RebarBarType', 'RebarStyle',
+                    'RebarHookOrientation', 'MultiplanarOption']
+
+
+def install():
+    # Register the fake modules; the real ones win if they are already loaded
+    if 'Autodesk.Revit.DB' in sys.modules and not getattr(sys.modules['Autodesk.Revit.DB'], 'is_fake', False):
+        return False
+    structure = _module('Autodesk.Revit.DB.Structure', **_public(_STRUCTURE_NAMES))
+    db = _module('Autodesk.Revit.DB', is_fake=True, Structure=structure, **_public(_DB_NAMES))
+    revit = _module('Autodesk.Revit', DB=db)
+    autodesk = _module('Autodesk', Revit=revit)
+    generic = _module('System.Collections.Generic', List=List)
+    collections = _module('System.Collections', Generic=generic)
+    system = _module('System', Collections=collections)
+    persistence = _module('RevitServices.Persistence', DocumentManager=object)
+    transactions = _module('RevitServices.Transactions', TransactionManager=object)
+    services = _module('RevitServices', Persistence=persistence, Transactions=transactions)
+    clr = _module('clr', AddReference=lambda name: assembly_references.update([name]))
+    sys.modules.update({
+        'clr': clr,
+        'Autodesk': autodesk,
+        'Autodesk.Revit': revit,
+        'Autodesk.Revit.DB': db,
+        'Autodesk.Revit.DB.Structure': structure,
+        'System': system,
+        'System.Collections': collections,
+        'System.Collections.Generic': generic,
+        'RevitServices': services,
+        'RevitServices.Persistence': persistence,
+        'RevitServices.Transactions': transactions,
+    })
+    return True
+
+
+def run_script(path, doc):
+    # Execute one of the pyRevit scripts against a fake document
+    install()
+    with open(path) as f:
+        code = compile(f.read(), path, 'exec')
+    namespace = {'__name__': '__main__', '__file__': path, '__revit__': revit_host(doc)}
+    exec(code, namespace)
+    return namespace
@@ -0,0 +1,149 @@
+# Parametric geometry of the D-wall cage, in plain Python (no Revit).
+#
+# All values are in mm, in the local frame of a panel: X along the wall from the panel
+# end, Y across the thickness (0 at the centre line, +Y is the face of layers A and B)
+# and Z up from the panel origin. Points are (x, y, z) tuples; dwall.adapter turns them
+# into XYZ/Line inside Revit.
+from collections import namedtuple
+
+MM_TO_FEET = 1 / 304.8
+
+# Nominal diameter in mm of the bar types used in the cage
+BAR_DIAMETERS = {
+    'H40': 40,
+    'H32': 32,
+    'H25': 25,
+    'H20': 20,
+    'H16': 16,
+    'H13': 13,
+}
+
+# Panel parameters, all in mm
+Panel = namedtuple('Panel', [
+    'length',       # Length of the panel along the wall
+    'thickness',    # Thickness of the D-wall
+    'cover',        # Cover to the links on both faces
+    'end_cover',    # Cover from the panel end to the first link
+    'd_main',       # Diameter of the main bars (also the lap offset between bars)
+    'd_link',       # Diameter of the links
+    'row_gap',      # Clear gap between the outer and inner row of main bars
+    'top',          # Level of the top of the main bars above the panel origin
+    'bar_spacing',  # Spacing of the main bars along the wall
+    'bar_count',    # Number of main bar positions along the wall
+])
+
+DEFAULT_PANEL = Panel(length=6000, thickness=1000, cover=75, end_cover=100, d_main=40, d_link=20,
+                      row_gap=40, top=6400, bar_spacing=119, bar_count=20)
+
+# A main layer: the face it sits on (+1/-1), its row (1 outer, 2 inner) and the lap chain
+# from top to bottom, with one lap length between each pair of bars
+LayerSpec = namedtuple('LayerSpec', ['face', 'row', 'bar_types', 'lengths', 'laps'])
+
+LAYERS = {
+    'A': LayerSpec(+1, 1, ('H40', 'H40', 'H32', 'H32'), (9600, 9600, 10600, 10600), (1140, 995, 985)),
+    'B': LayerSpec(+1, 2, ('H40', 'H40'), (9300, 9300), (1165,)),
+    'D': LayerSpec(-1, 1, ('H40', 'H40', 'H40', 'H32', 'H32'), (8200, 8200, 8200, 8600, 8600),
+                   (1227, 1227, 1081, 985)),
+    'E': LayerSpec(-1, 2, ('H40', 'H40'), (9300, 9300), (1165,)),
+}
+
+# One straight main bar of the cage
+Bar = namedtuple('Bar', ['layer', 'position', 'index', 'type_name', 'start', 'end'])
+
+# EX-link parameters, all in mm except the bend angle in degrees
+ExLinkSpec = namedtuple('ExLinkSpec', [
+    'level',        # Level of the link above the panel origin
+    'hook',         # Length of the straight legs at both ends (P1'-P1 and P4-P5)
+    'inner_cover',  # Distance from the middle of the panel to the inner leg (P3)
+    'bend_angle',   # Angle of the sloped leg P3-P4
+    'bend_offset',  # Perpendicular distance between P3 and P4
+    'count',        # Number of links down the panel, including the first one
+    'spacing',      # Vertical spacing of the links
+])
+
+DEFAULT_EX_LINK = ExLinkSpec(level=5500, hook=290, inner_cover=450, bend_angle=20, bend_offset=840,
+                             count=243, spacing=150)
+
+# Local frame of a panel in project coordinates (feet): origin and the unit X and Y axes
+PanelFrame = namedtuple('PanelFrame', ['origin', 'x_axis', 'y_axis'])
+
+IDENTITY_FRAME = PanelFrame((0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0))
+
+
+def first_bar_x(panel):
+    # Centre of the first main bar, inside the end cover and the link
+    return panel.end_cover + panel.d_link + panel.d_main / 2
+
+
+def row_y(panel, face, row):
+    # Centre of the main bars of a row, measured in from the given face
+    y = panel.thickness / 2 - panel.cover - panel.d_link - panel.d_main / 2
+    if row == 2:
+        y -= panel.d_main + panel.row_gap
+    return face * y
+
+
+def chain_levels(top, lengths, laps):
+    # Start and end level of every bar of a lap chain; each bar starts one lap above
+    # the end of the previous one
+    levels = []
+    z_start = top
+    for i, length in enumerate(lengths):
+        z_end = z_start - length
+        levels.append((z_start, z_end))
+        if i < len(laps):
+            z_start = z_end + laps[i]
+    return levels
+
+
+def layer_chain(panel, layer, spec=None, position=0):
+    # The lap chain of one bar position of a layer; consecutive bars are offset by one
+    # bar diameter towards the centre of the wall and back
+    spec = spec or LAYERS[layer]
+    x = first_bar_x(panel) + position * panel.bar_spacing
+    y = row_y(panel, spec.face, spec.row)
+    bars = []
+    for i, (z_start, z_end) in enumerate(chain_levels(panel.top, spec.lengths, spec.laps)):
+        y_bar = y - spec.face * panel.d_main * (i % 2)
+        bars.append(Bar(layer, position, i, spec.bar_types[i], (x, y_bar, z_start), (x, y_bar, z_end)))
+    return bars
+
+
+def layer_bars(panel, layer, spec=None):
+    # Every bar of every position of a layer
+    bars = []
+    for position in range(panel.bar_count):
+        bars.extend(layer_chain(panel, layer, spec, position))
+    return bars
+
+
+def cage_bars(panel, layers=None):
+    bars = []
+    for layer in sorted(layers or LAYERS):
+        bars.extend(layer_bars(panel, layer))
+    return bars
+
+
+def to_feet(point):
+    return (point[0] * MM_TO_FEET, point[1] * MM_TO_FEET, point[2] * MM_TO_FEET)
+
+
+def to_world(frame, point):
+    # Local point in mm -> project point in feet
+    x, y, z = to_feet(point)
+    ox, oy, oz = frame.origin
+    (xx, xy, xz), (yx, yy, yz) = frame.x_axis, frame.y_axis
+    return (ox + x * xx + y * yx,
+            oy + x * xy + y * yy,
+            oz + x * xz + y * yz + z)
+
+
+def to_local(frame, point):
+    # Project point in feet -> local point in mm; the inverse of to_world
+    ox, oy, oz = frame.origin
+    dx, dy, dz = point[0] - ox, point[1] - oy, point[2] - oz
+    (xx, xy, xz), (yx, yy, yz) = frame.x_axis, frame.y_axis
+    x = dx * xx + dy * xy + dz * xz
+    y = dx * yx + dy * yy + dz * yz
+    z = dz - x * xz - y * yz
+    return (x / MM_TO_FEET, y / MM_TO_FEET, z / MM_TO_FEET)
@@ -0,0 +1,208 @@
+# Incremental regeneration: bring the rebar of a panel in line with a placement plan.
+#
+# The bars hosted by the panel are read back into the panel frame and matched to the
+# plan records by their layer/index key (see dwall.replay). An untagged bar that lies
+# exactly where a record wants one, e.g. a bar from the older scripts, is adopted.
+# Only the differences are applied, in one transaction:
+#   create  - a record with no bar
+#   delete  - a tagged bar of a synced layer with no record, or a duplicate
+#   retype  - a bar of another type
+#   move    - a bar of the right shape in the wrong place
+#   layout  - a set with another number of bars or spacing
+#   replace - a bar of another shape, deleted and created again
+#   tag     - an adopted bar
+# The bars of the panel are then recorded in the ledger (dwall.ledger); the caller saves
+# it once at the end of its run.
+from collections import Counter, namedtuple
+
+from Autodesk.Revit.DB import Transaction, XYZ, ElementId, ElementTransformUtils
+from Autodesk.Revit.DB.Structure import RebarHostData, MultiplanarOption
+from System.Collections.Generic import List
+
+from dwall.adapter import panel_frame
+from dwall.geometry import MM_TO_FEET, to_local
+from dwall.ledger import get_ledger
+from dwall.lookup import get_lookup
+from dwall.replay import layout_normal, plan_bar_types, record_key, rebar_key, replay_record, tag_rebar
+
+# Distance in mm below which two points are the same
+TOLERANCE = 0.5
+
+ACTIONS = ('delete', 'replace', 'create', 'tag', 'retype', 'move', 'layout')
+
+# A bar of the model in plan terms: points in mm in the panel frame, spacing in mm
+ExistingBar = namedtuple('ExistingBar', ['key', 'rebar_id', 'type', 'points', 'count', 'spacing'])
+
+# One step of the diff; 'offset' is the move in mm in the panel frame
+Change = namedtuple('Change', ['action', 'key', 'record', 'rebar_id', 'offset'])
+
+
+def read_existing(doc, host, frame):
+    # Every bar hosted by the panel as an ExistingBar
+    type_names = {}
+    bars = []
+    for rebar in RebarHostData.GetRebarHostData(host).GetRebarsInHost():
+        type_id = rebar.GetTypeId()
+        if type_id not in type_names:
+            type_names[type_id] = doc.GetElement(type_id).Name
+        curves = rebar.GetCenterlineCurves(False, True, True, MultiplanarOption.IncludeOnlyPlanarCurves, 0)
+        points = [curves[0].GetEndPoint(0)] + [curve.GetEndPoint(1) for curve in curves]
+        count = rebar.NumberOfBarPositions
+        bars.append(ExistingBar(rebar_key(rebar), rebar.Id, type_names[type_id],
+                                [to_local(frame, (p.X, p.Y, p.Z)) for p in points], count,
+                                rebar.MaxSpacing / MM_TO_FEET if count > 1 else 0.0))
+    return bars
+
+
+def _length(vector):
+    return sum(c * c for c in vector) ** 0.5
+
+
+def _offset(desired, existing, tolerance):
+    # Translation that takes the existing points onto the desired ones, or None when
+    # the shapes differ
+    if len(desired) != len(existing):
+        return None
+    offset = [d - e for d, e in zip(desired[0], existing[0])]
+    for d_point, e_point in zip(desired, existing):
+        if any(abs(d - e - o) > tolerance for d, e, o in zip(d_point, e_point, offset)):
+            return None
+    return offset
+
+
+def _signature(points):
+    # Points rounded to the mm, to find untagged bars that match a record
+    return tuple(int(round(c)) for point in points for c in point)
+
+
+def diff_plan(records, existing, layers, tolerance=TOLERANCE):
+    # Minimal list of changes that turns the existing bars into the records. Tagged bars
+    # of other layers and untagged bars that match no record are left alone.
+    desired = dict((record_key(record), record) for record in records)
+    changes = []
+    tagged = {}
+    untagged = {}
+    for bar in existing:
+        if bar.key is None:
+            untagged.setdefault(_signature(bar.points), bar)
+        elif bar.key.split('/')[0] in layers:
+            if bar.key in desired and bar.key not in tagged:
+                tagged[bar.key] = bar
+            else:
+                changes.append(Change('delete', bar.key, None, bar.rebar_id, None))
+
+    for record in records:
+        key = record_key(record)
+        bar = tagged.get(key)
+        if bar is None:
+            bar = untagged.pop(_signature(record["points"]), None)
+            if bar is None:
+                changes.append(Change('create', key, record, None, None))
+                continue
+            changes.append(Change('tag', key, record, bar.rebar_id, None))
+        offset = _offset(record["points"], bar.points, tolerance)
+        if offset is None:
+            changes.append(Change('replace', key, record, bar.rebar_id, None))
+            continue
+        if bar.type != record["type"]:
+            changes.append(Change('retype', key, record, bar.rebar_id, None))
+        if _length(offset) > tolerance:
+            changes.append(Change('move', key, record, bar.rebar_id, offset))
+        spacing = _length(record["spacing"]) if record["count"] > 1 else 0.0
+        if bar.count != record["count"] or abs(bar.spacing - spacing) > tolerance:
+            changes.append(Change('layout', key, record, bar.rebar_id, None))
+    return changes
+
+
+def _world_vector(frame, offset):
+    (xx, xy, xz), (yx, yy, yz) = frame.x_axis, frame.y_axis
+    x, y, z = [c * MM_TO_FEET for c in offset]
+    return XYZ(x * xx + y * yx, x * xy + y * yy, x * xz + y * yz + z)
+
+
+def apply_changes(doc, host, bar_types, changes, frame):
+    # Apply a diff; all deletions go in one call. Returns the ids of the bars created or
+    # adopted by record key. The caller owns the open transaction.
+    ids = {}
+    deleted = List[ElementId]()
+    for change in changes:
+        if change.action in ('delete', 'replace'):
+            deleted.Add(change.rebar_id)
+    if deleted.Count:
+        doc.Delete(deleted)
+
+    for change in changes:
+        if change.action in ('create', 'replace'):
+            ids[change.key] = replay_record(doc, host, bar_types, change.record, frame).Id
+        elif change.action == 'tag':
+            tag_rebar(doc.GetElement(change.rebar_id), change.key)
+            ids[change.key] = change.rebar_id
+        elif change.action == 'retype':
+            doc.GetElement(change.rebar_id).ChangeTypeId(bar_types[change.record["type"]].Id)
+        elif change.action == 'move':
+            ElementTransformUtils.MoveElement(doc, change.rebar_id, _world_vector(frame, change.offset))
+        elif change.action == 'layout':
+            accessor = doc.GetElement(change.rebar_id).GetShapeDrivenAccessor()
+            normal, spacing = layout_normal(change.record, frame)
+            if change.record["count"] > 1 and normal is not None:
+                accessor.SetLayoutAsNumberWithSpacing(change.record["count"], spacing, True, True, True)
+            else:
+                accessor.SetLayoutAsSingle()
+    return ids
+
+
+def update_ledger(ledger, host, records, existing, changes, created):
+    # Record the bar of every record of the panel and forget the deleted ones
+    ids = {}
+    for bar in existing:
+        if bar.key is not None:
+            ids.setdefault(bar.key, bar.rebar_id)
+    ids.update(created)
+    keys = set(record_key(record) for record in records)
+    for change in changes:
+        if change.action == 'delete' and change.key not in keys:
+            layer, index = change.key.rsplit('/', 1)
+            ledger.forget(host, layer, int(index))
+    for record in records:
+        key = record_key(record)
+        if key in ids:
+            ledger.record(host, record["layer"], record["index"], 0, ids[key])
+
+
+def sync_plan(doc, plan, host, bar_types=None, layers=None, name="Update D-wall cage", ledger=None):
+    # Bring the given layers of the panel (all layers of the plan by default) in line
+    # with the plan. Returns the changes applied, [] when the panel is up to date, or None
+    # when it could not be updated.
+    layers = set(layers or [record["layer"] for record in plan["records"]])
+    records = [record for record in plan["records"] if record["layer"] in layers]
+    if bar_types is None:
+        bar_types = get_lookup(doc).bar_types(plan_bar_types(plan))
+    missing = [type_name for type_name in plan_bar_types(plan) if bar_types.get(type_name) is None]
+    if missing:
+        print("Rebar type(s) not found: {}".format(", ".join(missing)))
+        return None
+
+    ledger = ledger or get_ledger(doc)
+    frame = panel_frame(host)
+    existing = read_existing(doc, host, frame)
+    changes = diff_plan(records, existing, layers)
+    if not changes:
+        update_ledger(ledger, host, records, existing, changes, {})
+        print("Panel {} is up to date.".format(host.Id.IntegerValue))
+        return []
+
+    t = Transaction(doc, name)
+    t.Start()
+    try:
+        created = apply_changes(doc, host, bar_types, changes, frame)
+        t.Commit()
+    except Exception as e:
+        t.RollBack()
+        print("Failed to update panel {}: {}".format(host.Id.IntegerValue, str(e)))
+        return None
+    update_ledger(ledger, host, records, existing, changes, created)
+
+    counts = Counter(change.action for change in changes)
+    print("Panel {} updated: {}.".format(host.Id.IntegerValue, ", ".join(
+        "{} {}".format(counts[action], action) for action in ACTIONS if counts[action])))
+    return changes
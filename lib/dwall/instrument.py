@@ -0,0 +1,304 @@
+# Timing of the Revit API calls of a run, per stage.
+#
+# enable() swaps the API names imported by the dwall modules (and by a script, when its
+# globals are given) for thin proxies that time every call and hand it on unchanged:
+#   lookup    FilteredElementCollector (the scan, when the collector is read or its id
+#             iterator is stepped)
+#   geometry  Line.CreateBound
+#   create    Rebar.CreateFromCurves
+#   copy      ElementTransformUtils.CopyElement(s), MoveElement(s)
+#   mirror    ElementTransformUtils.MirrorElement(s)
+#   commit    Transaction.Commit, TransactionGroup.Assimilate
+# disable() puts the original names back, so nothing is wrapped and nothing costs
+# anything while profiling is off. Modules imported after enable() are not wrapped.
+#
+# The report has the count, cumulative time and slowest calls of every stage and API
+# call, as JSON, and the time of every Python call stack leading to an API call in the
+# folded format of flamegraph.pl and speedscope ("frame;frame;... microseconds").
+#
+# Scripts wrap their work in profile_run(), which only profiles when the DWALL_PROFILE
+# environment variable names a folder for the reports.
+import heapq
+import json
+import os
+import sys
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+STAGES = ('lookup', 'geometry', 'create', 'copy', 'mirror', 'commit')
+
+# Static methods timed on API classes: class name -> {method: stage}
+STATIC_CALLS = {
+    'Line': {'CreateBound': 'geometry'},
+    'Rebar': {'CreateFromCurves': 'create'},
+    'ElementTransformUtils': {
+        'CopyElement': 'copy',
+        'CopyElements': 'copy',
+        'MoveElement': 'copy',
+        'MoveElements': 'copy',
+        'MirrorElement': 'mirror',
+        'MirrorElements': 'mirror',
+    },
+}
+
+# Methods of a collector that read it (and so run the scan)
+COLLECTOR_READS = ('ToElements', 'ToElementIds', 'FirstElement', 'FirstElementId', 'GetElementCount',
+                   'GetElementIdIterator')
+
+# Number of slowest calls kept per stage
+SLOWEST = 10
+
+ENVIRONMENT_VARIABLE = 'DWALL_PROFILE'
+
+# Modules whose names are never wrapped and whose frames are left out of the stacks
+_OWN_MODULES = ('dwall.instrument', 'dwall.fakeapi')
+
+_recorder = None
+_patched = []
+
+
+def _unwrap(value):
+    return getattr(value, '_target', value)
+
+
+def _caller_stack():
+    # Python frames of the dwall modules and the script leading to the current call,
+    # outermost first
+    frames = []
+    frame = sys._getframe(3)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if (module.startswith('dwall.') or module == '__main__') and module not in _OWN_MODULES:
+            if module == '__main__':
+                module = os.path.basename(os.path.dirname(frame.f_code.co_filename)) or module
+            frames.append("{}.{}".format(module, frame.f_code.co_name))
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+class Recorder(object):
+    def __init__(self, slowest=SLOWEST):
+        self.slowest = slowest
+        self.start = time.perf_counter()
+        self.calls = OrderedDict()
+        self.stacks = Counter()
+        self._slowest = dict((stage, []) for stage in STAGES)
+
+    def call(self, stage, name, function, args):
+        args = [_unwrap(arg) for arg in args]
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.record(stage, name, time.perf_counter() - start)
+
+    def record(self, stage, name, seconds):
+        stack = _caller_stack()
+        entry = self.calls.setdefault((stage, name), [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        self.stacks[";".join(stack + [stage, name])] += seconds
+        slowest = self._slowest[stage]
+        item = (seconds, name, stack[-1] if stack else "")
+        if len(slowest) < self.slowest:
+            heapq.heappush(slowest, item)
+        elif item > slowest[0]:
+            heapq.heapreplace(slowest, item)
+
+    def report(self, name=""):
+        elapsed = time.perf_counter() - self.start
+        stages = OrderedDict()
+        for stage in STAGES:
+            calls = OrderedDict((api, {"calls": count, "seconds": seconds})
+                                for (s, api), (count, seconds) in self.calls.items() if s == stage)
+            stages[stage] = {
+                "calls": sum(c["calls"] for c in calls.values()),
+                "seconds": sum(c["seconds"] for c in calls.values()),
+                "api": calls,
+                "slowest": [{"call": api, "caller": caller, "seconds": seconds}
+                            for seconds, api, caller in sorted(self._slowest[stage], reverse=True)],
+            }
+        api_seconds = sum(stage["seconds"] for stage in stages.values())
+        return OrderedDict([("run", name), ("seconds", elapsed), ("api seconds", api_seconds),
+                            ("other seconds", elapsed - api_seconds), ("stages", stages)])
+
+    def folded(self):
+        # One "stack microseconds" line per call stack
+        return ["{} {}".format(stack, int(round(seconds * 1e6))) for stack, seconds in sorted(self.stacks.items())]
+
+    def save(self, path, name=""):
+        # path.json and path.folded; returns the JSON path
+        with open(path + '.json', 'w') as f:
+            json.dump(self.report(name), f, indent=1)
+        with open(path + '.folded', 'w') as f:
+            f.write("\n".join(self.folded()) + "\n")
+        return path + '.json'
+
+    def print_summary(self):
+        report = self.report()
+        print("{:.2f} s, {:.2f} s in API calls:".format(report["seconds"], report["api seconds"]))
+        for stage, data in report["stages"].items():
+            if data["calls"]:
+                print("  {:<9} {:>7} calls {:>9.3f} s".format(stage, data["calls"], data["seconds"]))
+
+
+class _Static(object):
+    # An API class with some static methods timed
+    def __init__(self, recorder, target, methods):
+        self._recorder = recorder
+        self._target = target
+        self._methods = methods
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        stage = self._methods.get(name)
+        if stage is None:
+            return value
+        label = "{}.{}".format(getattr(self._target, '__name__', ''), name)
+        return lambda *args: self._recorder.call(stage, label, value, args)
+
+
+class _Collector(object):
+    # A FilteredElementCollector whose reads are timed
+    def __init__(self, recorder, target):
+        self._recorder = recorder
+        self._target = target
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if not callable(value):
+            return value
+        recorder, target = self._recorder, self._target
+
+        def method(*args):
+            if name == 'GetElementIdIterator':
+                return _Iterator(recorder, recorder.call('lookup', "FilteredElementCollector." + name, value, args))
+            if name in COLLECTOR_READS:
+                return recorder.call('lookup', "FilteredElementCollector." + name, value, args)
+            result = value(*[_unwrap(arg) for arg in args])
+            return self if result is target else result
+        return method
+
+    def __iter__(self):
+        # The scan runs while the collector is read; read it at once to time it
+        return iter(self._recorder.call('lookup', "FilteredElementCollector", list, [self._target]))
+
+
+class _Iterator(object):
+    # The id iterator of a collector; the scan runs as it is stepped, so MoveNext is timed
+    def __init__(self, recorder, target):
+        self._recorder = recorder
+        self._target = target
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if name == 'MoveNext':
+            return lambda *args: self._recorder.call('lookup', "FilteredElementIdIterator.MoveNext", value, args)
+        return value
+
+
+class _CollectorClass(object):
+    def __init__(self, recorder, target):
+        self._recorder = recorder
+        self._target = target
+
+    def __call__(self, *args):
+        return _Collector(self._recorder, self._target(*[_unwrap(arg) for arg in args]))
+
+
+class _Transaction(object):
+    # A Transaction or TransactionGroup whose Commit / Assimilate is timed
+    def __init__(self, recorder, target, label):
+        self._recorder = recorder
+        self._target = target
+        self._label = label
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if name in ('Commit', 'Assimilate'):
+            return lambda *args: self._recorder.call('commit', "{}.{}".format(self._label, name), value, args)
+        return value
+
+    def __enter__(self):
+        self._target.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._target.__exit__(exc_type, exc_value, traceback)
+
+
+class _TransactionClass(object):
+    def __init__(self, recorder, target):
+        self._recorder = recorder
+        self._target = target
+
+    def __call__(self, *args):
+        return _Transaction(self._recorder, self._target(*[_unwrap(arg) for arg in args]), self._target.__name__)
+
+
+def _proxy(recorder, name, value):
+    if name in STATIC_CALLS:
+        return _Static(recorder, value, STATIC_CALLS[name])
+    if name == 'FilteredElementCollector':
+        return _CollectorClass(recorder, value)
+    if name in ('Transaction', 'TransactionGroup'):
+        return _TransactionClass(recorder, value)
+    return None
+
+
+def _is_api(value):
+    return getattr(value, '__module__', '').startswith(('Autodesk', 'dwall.fakeapi'))
+
+
+def enable(namespaces=(), slowest=SLOWEST):
+    # Start recording; wraps the API names of the loaded dwall modules and of the given
+    # namespaces (script globals). Returns the Recorder.
+    global _recorder
+    if _recorder is not None:
+        return _recorder
+    _recorder = Recorder(slowest)
+    modules = [module.__dict__ for name, module in list(sys.modules.items())
+               if module is not None and name.startswith('dwall.') and name not in _OWN_MODULES]
+    for namespace in modules + list(namespaces):
+        for name in list(STATIC_CALLS) + ['FilteredElementCollector', 'Transaction', 'TransactionGroup']:
+            value = namespace.get(name)
+            if value is not None and _is_api(value):
+                namespace[name] = _proxy(_recorder, name, value)
+                _patched.append((namespace, name, value))
+    return _recorder
+
+
+def disable():
+    # Stop recording and put the original names back; returns the Recorder
+    global _recorder
+    while _patched:
+        namespace, name, value = _patched.pop()
+        namespace[name] = value
+    recorder, _recorder = _recorder, None
+    return recorder
+
+
+def is_enabled():
+    return _recorder is not None
+
+
+@contextmanager
+def profile_run(name, namespace=None, folder=None):
+    # Profile the block when 'folder' (or the DWALL_PROFILE environment variable) names a
+    # folder, and write '<name> <time>.json' and '.folded' there at the end
+    folder = folder or os.environ.get(ENVIRONMENT_VARIABLE)
+    if not folder or is_enabled():
+        yield None
+        return
+    recorder = enable([namespace] if namespace is not None else [])
+    try:
+        yield recorder
+    finally:
+        disable()
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        path = os.path.join(folder, "{} {}".format(name, time.strftime("%Y%m%d-%H%M%S")))
+        print("Profile written to " + recorder.save(path, name))
+        recorder.print_summary()
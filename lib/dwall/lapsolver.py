@@ -0,0 +1,197 @@
+# Lap-splice chain solver for main bars of any depth.
+#
+# A chain runs from the top level of the cage down to the bottom level. Each bar
+# starts one lap above the end of the bar before it, the bar type comes from the
+# diameter zone the bar starts in and the lap length from the lap rule of the two
+# bars that meet. All levels are in mm, in the panel frame of dwall.geometry.
+import itertools
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from dwall.geometry import BAR_DIAMETERS, LayerSpec, first_bar_x, row_y
+
+# Lap length between an upper and a lower bar: taken from 'table' when the pair of
+# bar types is listed, otherwise 'factor' times the smaller diameter, rounded up to
+# a multiple of 'rounding'
+LapRule = namedtuple('LapRule', ['factor', 'table', 'rounding'])
+
+# Laps used by the layer scripts so far
+DEFAULT_LAP_RULE = LapRule(factor=30, table={
+    ('H40', 'H40'): 1140,
+    ('H40', 'H32'): 995,
+    ('H32', 'H32'): 985,
+}, rounding=5)
+
+# Bar types of a chain by depth below the top level: ((0, 'H40'), (17000, 'H32'))
+# means H40 for bars starting less than 17 m below the top and H32 below that
+DEFAULT_ZONES = ((0, 'H40'), (17000, 'H32'))
+
+# A solved chain: bar types, bar lengths, the laps between consecutive bars, the
+# start/end level of every bar (shape (n, 2)) and the offcut left on the stock bars
+ChainSolution = namedtuple('ChainSolution', ['bar_types', 'lengths', 'laps', 'levels', 'waste'])
+
+MODES = ('min_bars', 'min_waste')
+
+
+def lap_length(rule, upper_type, lower_type):
+    lap = rule.table.get((upper_type, lower_type))
+    if lap is not None:
+        return lap
+    diameter = min(BAR_DIAMETERS[upper_type], BAR_DIAMETERS[lower_type])
+    return math.ceil(rule.factor * diameter / rule.rounding) * rule.rounding
+
+
+def zone_type(zones, depth):
+    bar_type = zones[0][1]
+    for zone_depth, zone_bar_type in zones:
+        if depth >= zone_depth:
+            bar_type = zone_bar_type
+    return bar_type
+
+
+def _stock_for(stock_lengths, needed):
+    # Shortest stock bar the last bar can be cut from
+    for stock in stock_lengths:
+        if stock >= needed:
+            return stock
+    return None
+
+
+def _walk(top, bottom, lengths, zones, rule):
+    # Lay bars of the given lengths down from the top; returns the chain so far and the
+    # start level and type of the bar that has to close it (None when it overshot)
+    bar_types, levels, laps = [], [], []
+    z_start = top
+    bar_type = zone_type(zones, 0)
+    for length in lengths:
+        z_end = z_start - length
+        if z_end <= bottom:
+            return None
+        bar_types.append(bar_type)
+        levels.append((z_start, z_end))
+        next_type = zone_type(zones, top - z_end)
+        lap = lap_length(rule, bar_type, next_type)
+        if lap >= length:
+            raise ValueError("Lap of {} mm is not shorter than the {} mm bar".format(lap, length))
+        laps.append(lap)
+        z_start = z_end + lap
+        bar_type = next_type
+    return bar_types, levels, laps, z_start, bar_type
+
+
+def _close(walk, bottom, stock_lengths):
+    bar_types, levels, laps, z_start, bar_type = walk
+    needed = z_start - bottom
+    stock = _stock_for(stock_lengths, needed)
+    if stock is None:
+        return None
+    levels = levels + [(z_start, bottom)]
+    lengths = np.array([start - end for start, end in levels], dtype=float)
+    waste = stock - needed
+    return ChainSolution(tuple(bar_types + [bar_type]), lengths, np.array(laps, dtype=float),
+                         np.array(levels, dtype=float), float(waste))
+
+
+def solve_chain(top, bottom, stock_lengths, zones=DEFAULT_ZONES, rule=DEFAULT_LAP_RULE, mode='min_bars',
+                max_combinations=50000):
+    # Chain of bars from 'top' down to 'bottom' cut from the given stock lengths.
+    #   min_bars  - full-length bars of the longest stock, the last one cut to fit
+    #   min_waste - try every combination of uncut stock bars with the fewest bars and one
+    #               more, and keep the one whose closing bar leaves the shortest offcut
+    if mode not in MODES:
+        raise ValueError("Unknown mode '{}'".format(mode))
+    if top <= bottom:
+        raise ValueError("The top level must be above the bottom level")
+    stock_lengths = sorted(stock_lengths)
+    longest = stock_lengths[-1]
+
+    best = None
+    lengths = []
+    while best is None:
+        walk = _walk(top, bottom, lengths, zones, rule)
+        if walk is None:
+            raise ValueError("No chain of stock bars reaches the bottom level")
+        best = _close(walk, bottom, stock_lengths)
+        lengths.append(longest)
+    if mode == 'min_bars':
+        return best
+
+    fewest = len(best.lengths)
+    for count in (fewest, fewest + 1):
+        if len(stock_lengths) ** (count - 1) > max_combinations:
+            break
+        for combination in itertools.product(stock_lengths, repeat=count - 1):
+            walk = _walk(top, bottom, combination, zones, rule)
+            solution = walk and _close(walk, bottom, stock_lengths)
+            if solution and (solution.waste, len(solution.lengths)) < (best.waste, len(best.lengths)):
+                best = solution
+    return best
+
+
+def solve_chains(tops, bottoms, stock_length, zones=DEFAULT_ZONES, rule=DEFAULT_LAP_RULE):
+    # min_bars chains for many panels at once. Returns (levels, type_index, counts):
+    # levels has shape (panels, max_bars, 2) and is NaN past the end of each chain,
+    # type_index indexes into the zone types and counts is the number of bars per panel.
+    tops = np.asarray(tops, dtype=float)
+    bottoms = np.asarray(bottoms, dtype=float)
+    zone_depths = np.array([depth for depth, _ in zones], dtype=float)
+    zone_types = [bar_type for _, bar_type in zones]
+    lap_table = np.array([[lap_length(rule, upper, lower) for lower in zone_types] for upper in zone_types],
+                         dtype=float)
+    if np.any(lap_table >= stock_length):
+        raise ValueError("Laps must be shorter than the {} mm stock bar".format(stock_length))
+
+    def zone_index(depth):
+        return np.searchsorted(zone_depths, depth, side='right') - 1
+
+    count = tops.shape[0]
+    z_start = tops.copy()
+    current = zone_index(np.zeros(count))
+    active = np.ones(count, dtype=bool)
+    levels, types = [], []
+    while active.any():
+        z_end = np.maximum(z_start - stock_length, bottoms)
+        levels.append(np.where(active[:, None], np.stack([z_start, z_end], axis=1), np.nan))
+        types.append(np.where(active, current, -1))
+        finished = z_end <= bottoms
+        following = zone_index(tops - z_end)
+        z_start = np.where(active & ~finished, z_end + lap_table[current, following], z_start)
+        current = np.where(active & ~finished, following, current)
+        active &= ~finished
+    counts = np.sum(~np.isnan(np.stack(levels, axis=1)[:, :, 0]), axis=1)
+    return np.stack(levels, axis=1), np.stack(types, axis=1), counts
+
+
+def chain_solutions(tops, bottoms, stock_length, zones=DEFAULT_ZONES, rule=DEFAULT_LAP_RULE):
+    # The chains of solve_chains as one ChainSolution per panel
+    levels, types, counts = solve_chains(tops, bottoms, stock_length, zones, rule)
+    solutions = []
+    for panel_levels, panel_types, count in zip(levels, types, counts):
+        panel_levels = panel_levels[:count]
+        lengths = panel_levels[:, 0] - panel_levels[:, 1]
+        solutions.append(ChainSolution(tuple(zones[i][1] for i in panel_types[:count]), lengths,
+                                       panel_levels[1:, 0] - panel_levels[:-1, 1], panel_levels,
+                                       float(stock_length - lengths[-1])))
+    return solutions
+
+
+def chain_array(panel, face, row, solution):
+    # Start and end point of every bar of every position of a layer, as one array of
+    # shape (positions, bars, 2, 3); consecutive bars alternate by one bar diameter
+    # towards the centre of the wall like the hand-built layers
+    bars = len(solution.lengths)
+    x = first_bar_x(panel) + np.arange(panel.bar_count) * panel.bar_spacing
+    y = row_y(panel, face, row) - face * panel.d_main * (np.arange(bars) % 2)
+    points = np.empty((panel.bar_count, bars, 2, 3))
+    points[..., 0] = x[:, None, None]
+    points[..., 1] = y[None, :, None]
+    points[..., 2] = solution.levels[None, :, :]
+    return points
+
+
+def to_layer_spec(solution, face, row):
+    # Layer definition for dwall.geometry built from a solved chain
+    return LayerSpec(face, row, solution.bar_types, tuple(float(length) for length in solution.lengths),
+                     tuple(float(lap) for lap in solution.laps))
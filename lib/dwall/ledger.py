@@ -0,0 +1,161 @@
+# Ledger of the elements generated for each panel, kept in a JSON file next to the model
+# (for a model that was never saved, in memory for the session).
+#
+# Every generated bar is recorded under (panel id, layer, bar index, copy index), so a
+# later stage or a later run fetches exactly its own elements by id instead of scanning
+# the model by type name. Entries whose element has been deleted or undone since, or
+# whose id now belongs to another element (Revit reuses the ids of undone elements),
+# are dropped as they are read. The EX-link of a panel is layer "EX", index 0, and its
+# mirrored copy index 1, like in the placement plan; copy 0 is the original bar.
+import json
+import os
+from collections import namedtuple
+
+from Autodesk.Revit.DB import ElementId
+
+LEDGER_VERSION = 1
+
+LedgerKey = namedtuple('LedgerKey', ['panel', 'layer', 'index', 'copy'])
+
+
+def ledger_path(doc):
+    # Sidecar file of the model, or None for a model that was never saved
+    if doc.PathName:
+        return doc.PathName + '.dwall-ledger.json'
+    return None
+
+
+def _id_value(element_or_id):
+    if isinstance(element_or_id, int):
+        return element_or_id
+    if hasattr(element_or_id, 'IntegerValue'):
+        return element_or_id.IntegerValue
+    return element_or_id.Id.IntegerValue
+
+
+def _is_bar_of(element, panel):
+    # The element still exists, is a hosted bar and is hosted by the panel
+    if element is None or not element.IsValidObject or not hasattr(element, 'GetHostId'):
+        return False
+    return element.GetHostId().IntegerValue == panel
+
+
+class Ledger(object):
+    def __init__(self, doc, path=None):
+        self.doc = doc
+        self.path = path or ledger_path(doc)
+        self._ids = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        # (Re)read the file, dropping what was recorded since it was saved
+        self._ids = {}
+        self.dirty = False
+        if self.path is None or not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            data = json.load(f)
+        if data.get("version") != LEDGER_VERSION:
+            print("Ignoring the ledger {}: unsupported version.".format(self.path))
+            return
+        for panel, layer, index, copy, element_id in data["entries"]:
+            self._ids[LedgerKey(panel, layer, index, copy)] = element_id
+
+    def save(self):
+        if not self.dirty or self.path is None:
+            return
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({"version": LEDGER_VERSION,
+                       "entries": [list(key) + [element_id] for key, element_id in sorted(self._ids.items())]}, f)
+        os.replace(temp_path, self.path)
+        self.dirty = False
+
+    def __len__(self):
+        return len(self._ids)
+
+    def record(self, panel, layer, index, copy, element_id):
+        # Only a new or changed entry makes the ledger dirty, so an up-to-date run does not
+        # rewrite the file
+        key, element_id = LedgerKey(_id_value(panel), layer, index, copy), _id_value(element_id)
+        if self._ids.get(key) != element_id:
+            self._ids[key] = element_id
+            self.dirty = True
+
+    def record_copies(self, keys, copied_ids):
+        # Copies of the bars with the given keys, one id per bar per copy level, level by
+        # level and in the order of keys (as dwall.exlink.copy_in_chunks returns them);
+        # None marks a copy that was rolled back
+        for i, element_id in enumerate(copied_ids):
+            if element_id is not None:
+                key = keys[i % len(keys)]
+                self.record(key.panel, key.layer, key.index, i // len(keys) + 1, element_id)
+
+    def snapshot(self, panel):
+        # The entries of a panel as they are now, for restore()
+        panel = _id_value(panel)
+        return dict((key, element_id) for key, element_id in self._ids.items() if key.panel == panel)
+
+    def restore(self, panel, entries):
+        # Put back the entries of a panel taken by snapshot(), e.g. after the changes made
+        # to the panel since were rolled back
+        if self.snapshot(panel) != entries:
+            panel = _id_value(panel)
+            self._ids = dict((key, element_id) for key, element_id in self._ids.items() if key.panel != panel)
+            self._ids.update(entries)
+            self.dirty = True
+
+    def forget(self, panel, layer, index, copy=None):
+        # Drop a bar, with all its copies unless one copy is given
+        for key in [key for key in self._ids if key[:3] == (_id_value(panel), layer, index)]:
+            if copy is None or key.copy == copy:
+                del self._ids[key]
+                self.dirty = True
+
+    def entries(self, panel=None, layer=None, index=None, copy=None):
+        # (key, element) of the matching entries whose element still exists
+        result = []
+        stale = []
+        panel = None if panel is None else _id_value(panel)
+        for key, element_id in sorted(self._ids.items()):
+            if ((panel is not None and key.panel != panel) or (layer is not None and key.layer != layer) or
+                    (index is not None and key.index != index) or (copy is not None and key.copy != copy)):
+                continue
+            element = self.doc.GetElement(ElementId(element_id))
+            if not _is_bar_of(element, key.panel):
+                stale.append(key)
+            else:
+                result.append((key, element))
+        for key in stale:
+            del self._ids[key]
+            self.dirty = True
+        return result
+
+    def elements(self, panel=None, layer=None, index=None, copy=None):
+        return [element for _, element in self.entries(panel, layer, index, copy)]
+
+    def get(self, panel, layer, index, copy=0):
+        # The element of one entry, or None (and the entry dropped) if it is no longer
+        # a bar of the panel
+        key = LedgerKey(_id_value(panel), layer, index, copy)
+        element_id = self._ids.get(key)
+        if element_id is None:
+            return None
+        element = self.doc.GetElement(ElementId(element_id))
+        if not _is_bar_of(element, key.panel):
+            del self._ids[key]
+            self.dirty = True
+            return None
+        return element
+
+
+_ledger = None
+
+
+def get_ledger(doc):
+    # The ledger of the active document; it is read again when the document changes
+    global _ledger
+    if _ledger is None or not _ledger.doc.IsValidObject or not _ledger.doc.Equals(doc):
+        _ledger = Ledger(doc)
+    return _ledger
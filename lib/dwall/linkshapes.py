@@ -0,0 +1,150 @@
+# EX-link shapes, computed with NumPy for many panels at once.
+#
+# A shape is a function of the panel parameters (one array of n values per Panel field)
+# and the link parameters (an ExLinkSpec); it returns the (n, k, 2) plan vertices of one
+# link per panel, in mm in the panel frame. Every link of a panel is the same polyline
+# moved down by the link spacing, so the vertices of all the links of all the panels
+# are one broadcast of the per-panel polyline over the link levels.
+#
+# The polyline of every (shape, panel, link) is cached: panels with the same
+# parameters, and the 243 links of a panel, never compute a shape twice.
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from dwall.geometry import DEFAULT_EX_LINK, Panel
+
+DEFAULT_SHAPE = 'trapezoid'
+
+# Number of cached polylines kept; the least recently used go first
+CACHE_ENTRIES = 4096
+
+LINK_SHAPES = OrderedDict()
+
+_cache = OrderedDict()
+
+
+def register_shape(name):
+    # Decorator adding a shape function to LINK_SHAPES
+    def register(function):
+        LINK_SHAPES[name] = function
+        return function
+    return register
+
+
+def _centre_y(p):
+    # Centre line of a link leg along a face
+    return p['thickness'] / 2 - p['cover'] - p['d_link'] / 2
+
+
+def _start_x(p):
+    # Centre line of a link leg across the panel at its start end
+    return p['end_cover'] + p['d_link'] / 2
+
+
+def _polyline(xs, ys):
+    # (n, k, 2) vertices from k x and k y values, each a scalar or an array of n values
+    return np.stack([np.stack(np.broadcast_arrays(*xs), axis=1), np.stack(np.broadcast_arrays(*ys), axis=1)], axis=2)
+
+
+@register_shape('trapezoid')
+def trapezoid(p, link):
+    # The original EX-link P1', P1, P2, P3, P4, P5: across the start of the panel, along
+    # the -Y face, then sloped back to the +Y face by bend_offset at bend_angle
+    half = p['thickness'] / 2
+    x1 = _start_x(p)
+    y1 = half - p['cover']
+    y2 = -half + p['cover'] + p['d_link'] / 2
+    x3 = p['length'] / 2 - link.inner_cover - p['d_link'] / 2
+    x4 = x3 - link.bend_offset * math.tan(math.radians(link.bend_angle))
+    y4 = _centre_y(p)
+    xs = [x1 + link.hook, x1, x1, x3, x4, x4 - link.hook]
+    ys = [y1, y1, y2, y2, y4, y4]
+    return _polyline(xs, ys)
+
+
+@register_shape('u')
+def u_bar(p, link):
+    # U-bar across the start of the panel, with a hook-long leg along both faces
+    x1 = _start_x(p)
+    y = _centre_y(p)
+    xs = [x1 + link.hook, x1, x1, x1 + link.hook]
+    ys = [y, y, -y, -y]
+    return _polyline(xs, ys)
+
+
+@register_shape('hoop')
+def hoop(p, link):
+    # Closed perimeter link around the whole cage, inside the end covers; the hooks
+    # come from the Revit hook types
+    x1 = _start_x(p)
+    x2 = p['length'] - x1
+    y = _centre_y(p)
+    xs = [x1, x1, x2, x2, x1]
+    ys = [y, -y, -y, y, y]
+    return _polyline(xs, ys)
+
+
+@register_shape('z')
+def z_tie(p, link):
+    # Cross-tie at the middle of the panel with hook-long legs bent in opposite
+    # directions along the two faces
+    x = p['length'] / 2
+    y = _centre_y(p)
+    xs = [x - link.hook, x, x, x + link.hook]
+    ys = [y, y, -y, -y]
+    return _polyline(xs, ys)
+
+
+def _panel_table(panels):
+    # (n, fields) float array of Panel namedtuples, or the array itself
+    if isinstance(panels, Panel):
+        panels = [panels]
+    return np.asarray(panels, dtype=float).reshape(-1, len(Panel._fields))
+
+
+def shape_polylines(panels, link=DEFAULT_EX_LINK, shape=DEFAULT_SHAPE):
+    # (n, k, 3) vertices of the first link of every panel, at the link level; only the
+    # panels not in the cache are computed, in one call of the shape function
+    if shape not in LINK_SHAPES:
+        raise ValueError("Unknown EX-link shape {!r}; expected one of {}".format(shape, ", ".join(LINK_SHAPES)))
+    table = _panel_table(panels)
+    unique, inverse = np.unique(table, axis=0, return_inverse=True)
+    keys = [(shape, tuple(row), tuple(link)) for row in unique.tolist()]
+    missing = [i for i, key in enumerate(keys) if key not in _cache]
+    if missing:
+        columns = dict((name, unique[missing, i]) for i, name in enumerate(Panel._fields))
+        xy = LINK_SHAPES[shape](columns, link)
+        polylines = np.concatenate([xy, np.full(xy.shape[:2] + (1,), float(link.level))], axis=2)
+        for i, polyline in zip(missing, polylines):
+            polyline.flags.writeable = False
+            _cache[keys[i]] = polyline
+    for key in keys:
+        _cache.move_to_end(key)
+    polylines = np.stack([_cache[key] for key in keys])
+    while len(_cache) > CACHE_ENTRIES:
+        _cache.popitem(last=False)
+    return polylines[inverse.reshape(-1)]
+
+
+def link_shape(panel, link=DEFAULT_EX_LINK, shape=DEFAULT_SHAPE):
+    # Vertices of the first link of one panel, as a list of (x, y, z) tuples
+    return [tuple(point) for point in shape_polylines(panel, link, shape)[0].tolist()]
+
+
+def link_levels(link=DEFAULT_EX_LINK):
+    # Level of every link of a panel, from the first one down
+    return link.level - link.spacing * np.arange(link.count)
+
+
+def link_vertices(panels, link=DEFAULT_EX_LINK, shape=DEFAULT_SHAPE):
+    # (n, count, k, 3) vertices of every link of every panel
+    polylines = shape_polylines(panels, link, shape)
+    vertices = np.repeat(polylines[:, None], link.count, axis=1)
+    vertices[..., 2] = link_levels(link)[None, :, None]
+    return vertices
+
+
+def clear_cache():
+    _cache.clear()
@@ -0,0 +1,102 @@
+# Name lookups for walls and rebar bar types, shared by all the modules of a script run.
+#
+# Each kind of element is collected once per run into a name -> elements dictionary.
+# The cache is started afresh by every script run (see dwall.bootstrap.get_document),
+# so walls and bar types added to the model between runs are always seen. A cached hit
+# is checked to still be valid and still carry the name (so deleted or renamed
+# elements are never returned) and rebuilds the index if not; a miss is a miss, since
+# the scripts do not add walls or bar types during a run.
+from Autodesk.Revit.DB import FilteredElementCollector, BuiltInCategory
+from Autodesk.Revit.DB.Structure import RebarBarType
+
+from dwall import bootstrap
+
+
+def _collect_walls(doc):
+    return FilteredElementCollector(doc).OfCategory(BuiltInCategory.OST_Walls).WhereElementIsNotElementType()
+
+
+def _collect_bar_types(doc):
+    return FilteredElementCollector(doc).OfClass(RebarBarType)
+
+
+class LookupCache(object):
+    collectors = {
+        'wall': _collect_walls,
+        'bar type': _collect_bar_types,
+    }
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.run = bootstrap.run
+        self._indexes = {}
+        self.builds = 0
+
+    def _build(self, kind):
+        index = {}
+        for element in self.collectors[kind](self.doc):
+            index.setdefault(element.Name, []).append(element)
+        self._indexes[kind] = index
+        self.builds += 1
+        return index
+
+    def _valid(self, elements, name):
+        return all(element.IsValidObject and element.Name == name for element in elements)
+
+    def find_all(self, kind, name):
+        index = self._indexes.get(kind)
+        if index is None:
+            index = self._build(kind)
+        elements = index.get(name)
+        if elements is not None and not self._valid(elements, name):
+            # Stale entry: an element was deleted or renamed since the index was built
+            index = self._build(kind)
+            elements = index.get(name)
+        return list(elements or [])
+
+    def find(self, kind, name):
+        elements = self.find_all(kind, name)
+        return elements[0] if elements else None
+
+    def wall(self, name):
+        return self.find('wall', name)
+
+    def walls(self, name):
+        return self.find_all('wall', name)
+
+    def bar_type(self, name):
+        return self.find('bar type', name)
+
+    def bar_types(self, names):
+        return dict((name, self.bar_type(name)) for name in names)
+
+    def elements(self, kind):
+        # Every element of the kind, from the index (rebuilt if an entry went stale)
+        index = self._indexes.get(kind)
+        if index is None or not all(self._valid(elements, name) for name, elements in index.items()):
+            index = self._build(kind)
+        return [element for elements in index.values() for element in elements]
+
+    def invalidate(self, kind=None):
+        if kind is None:
+            self._indexes.clear()
+        else:
+            self._indexes.pop(kind, None)
+
+
+_cache = None
+
+
+def get_lookup(doc):
+    # The lookup cache of the active document in this script run; a new one is started
+    # by every run and when the document changes
+    global _cache
+    if (_cache is None or _cache.run != bootstrap.run or not _cache.doc.IsValidObject or
+            not _cache.doc.Equals(doc)):
+        _cache = LookupCache(doc)
+    return _cache
+
+
+def invalidate_lookup(kind=None):
+    if _cache is not None:
+        _cache.invalidate(kind)
@@ -0,0 +1,191 @@
+# Operation log: what the cage stages do to a model, as a stream of operations that
+# dwall.planner writes without Revit and dwall.replay applies inside Revit.
+#
+# Every operation is a plain dict; points and spacings are in mm in the panel frame
+# (see dwall.geometry) and "panel" is the element id of the host wall:
+#
+#     {"op": "bar", "panel": 100006, "layer": "A", "index": 0, "type": "H40",
+#      "points": [[x, y, z], [x, y, z]], "count": 20, "spacing": [119, 0, 0]}
+#     {"op": "mirror", "panel": 100006, "layer": "EX", "index": 0, "to": 1}
+#     {"op": "copy", "panel": 100006, "layer": "EX", "index": 0, "count": 243, "spacing": [0, 0, -150]}
+#     {"op": "param", "type": "H40", "name": "Unit weight", "value": 9.864, "unit": "kg/m"}
+#
+# "bar" creates one bar (a set of "count" bars "spacing" apart), "mirror" mirrors a bar
+# of the panel about its centre plane into bar "to", "copy" lays a single bar out as a
+# set, and "param" sets a parameter of a bar type. The operations of a panel come one
+# after the other, so a reader can apply a panel as soon as the next one starts.
+#
+# Two encodings, both read and written one operation at a time:
+#   .jsonl  one JSON object per line, after a {"op": "log", "version": 2} header line
+#   other   binary: MAGIC and the version, then per operation a one-byte code and its
+#           fields packed little-endian (int64 ids, uint16 indices and point counts,
+#           uint32 counts, float64 coordinates and values, uint16-prefixed UTF-8 text)
+# Both keep every value exactly, so a log reads back equal to the operations written.
+import json
+import struct
+
+LOG_VERSION = 2
+
+MAGIC = b'DWOP'
+
+OPERATIONS = ('bar', 'mirror', 'copy', 'param')
+
+_CODES = dict((op, code) for code, op in enumerate(OPERATIONS, 1))
+
+
+def is_binary(path):
+    return not path.lower().endswith(('.jsonl', '.json'))
+
+
+def _pack_text(text):
+    data = text.encode('utf-8')
+    return struct.pack('<H', len(data)) + data
+
+
+def _pack_points(points):
+    return struct.pack('<H', len(points)) + b''.join(struct.pack('<3d', *point) for point in points)
+
+
+def encode(operation):
+    # One operation -> bytes of the binary encoding
+    op = operation["op"]
+    if op not in _CODES:
+        raise ValueError("Unknown operation {!r}; expected one of {}".format(op, ", ".join(OPERATIONS)))
+    data = [struct.pack('<B', _CODES[op])]
+    if op == 'param':
+        data += [_pack_text(operation["type"]), _pack_text(operation["name"]),
+                 struct.pack('<d', operation["value"]), _pack_text(operation["unit"])]
+        return b''.join(data)
+    data += [struct.pack('<q', operation["panel"]), _pack_text(operation["layer"]),
+             struct.pack('<H', operation["index"])]
+    if op == 'bar':
+        data += [_pack_text(operation["type"]), _pack_points(operation["points"]),
+                 struct.pack('<I3d', operation["count"], *operation["spacing"])]
+    elif op == 'mirror':
+        data.append(struct.pack('<H', operation["to"]))
+    else:
+        data.append(struct.pack('<I3d', operation["count"], *operation["spacing"]))
+    return b''.join(data)
+
+
+def _read(f, fmt):
+    size = struct.calcsize(fmt)
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated operation log")
+    return struct.unpack(fmt, data)
+
+
+def _read_text(f):
+    size, = _read(f, '<H')
+    return _read(f, '<{}s'.format(size))[0].decode('utf-8')
+
+
+def decode(f):
+    # Next operation of a binary log open for reading, or None at its end
+    code = f.read(1)
+    if not code:
+        return None
+    number, = struct.unpack('<B', code)
+    if not 0 < number <= len(OPERATIONS):
+        raise ValueError("Unknown operation code {}".format(number))
+    op = OPERATIONS[number - 1]
+    if op == 'param':
+        type_name, name = _read_text(f), _read_text(f)
+        value, = _read(f, '<d')
+        return {"op": op, "type": type_name, "name": name, "value": value, "unit": _read_text(f)}
+    panel, = _read(f, '<q')
+    layer = _read_text(f)
+    index, = _read(f, '<H')
+    operation = {"op": op, "panel": panel, "layer": layer, "index": index}
+    if op == 'bar':
+        operation["type"] = _read_text(f)
+        count, = _read(f, '<H')
+        operation["points"] = [list(_read(f, '<3d')) for _ in range(count)]
+    if op == 'mirror':
+        operation["to"], = _read(f, '<H')
+    else:
+        count, sx, sy, sz = _read(f, '<I3d')
+        operation["count"], operation["spacing"] = count, [sx, sy, sz]
+    return operation
+
+
+class LogWriter(object):
+    # Writes operations to a log one at a time; use as a context manager
+    def __init__(self, path, binary=None):
+        self.path = path
+        self.binary = is_binary(path) if binary is None else binary
+        self.count = 0
+        self._file = None
+
+    def __enter__(self):
+        if self.binary:
+            self._file = open(self.path, 'wb')
+            self._file.write(MAGIC + struct.pack('<H', LOG_VERSION))
+        else:
+            self._file = open(self.path, 'w')
+            self._file.write(json.dumps({"op": "log", "version": LOG_VERSION}) + "\n")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._file.close()
+        self._file = None
+        return False
+
+    def write(self, operation):
+        if self.binary:
+            self._file.write(encode(operation))
+        else:
+            if operation["op"] not in _CODES:
+                raise ValueError("Unknown operation {!r}; expected one of {}".format(
+                    operation["op"], ", ".join(OPERATIONS)))
+            self._file.write(json.dumps(operation, separators=(',', ':')) + "\n")
+        self.count += 1
+
+    def write_all(self, operations):
+        for operation in operations:
+            self.write(operation)
+        return self.count
+
+
+def write_log(path, operations, binary=None):
+    # Write the operations to path (binary unless it ends in .jsonl); returns how many
+    with LogWriter(path, binary) as writer:
+        return writer.write_all(operations)
+
+
+def read_log(path):
+    # The operations of a log, one at a time; the encoding is told by the first bytes
+    with open(path, 'rb') as f:
+        head = f.read(len(MAGIC))
+        if head == MAGIC:
+            version, = _read(f, '<H')
+            if version != LOG_VERSION:
+                raise ValueError("Unsupported operation log version {!r}".format(version))
+            while True:
+                operation = decode(f)
+                if operation is None:
+                    return
+                yield operation
+    with open(path) as f:
+        header = json.loads(f.readline() or 'null')
+        if not isinstance(header, dict) or header.get("op") != "log" or header.get("version") != LOG_VERSION:
+            raise ValueError("{} is not an operation log of version {}".format(path, LOG_VERSION))
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def panel_groups(operations):
+    # (panel, operations of the panel) for every run of consecutive operations of one
+    # panel, in log order; the parameter operations come as panel None
+    panel, group = None, []
+    for operation in operations:
+        key = operation.get("panel")
+        if group and key != panel:
+            yield panel, group
+            group = []
+        panel = key
+        group.append(operation)
+    if group:
+        yield panel, group
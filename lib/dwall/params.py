@@ -0,0 +1,70 @@
+# Bulk writes of one numeric parameter on many elements.
+#
+# The parameter is looked up by name once and then read and written through its
+# definition. All values are converted to internal units with one factor (the units
+# used here are linear), and values that already match within the tolerance are not
+# written again, so a second run changes nothing and opens no transaction.
+from collections import namedtuple
+
+import numpy as np
+
+from Autodesk.Revit.DB import Transaction, UnitUtils
+
+# Relative difference below which a stored value counts as up to date
+TOLERANCE = 1e-6
+
+# Number of elements written, already up to date and without a writable parameter
+ParameterSync = namedtuple('ParameterSync', ['written', 'unchanged', 'missing'])
+
+
+def unit_factor(unit_type_id):
+    # Internal units per unit
+    return UnitUtils.ConvertToInternalUnits(1.0, unit_type_id)
+
+
+def find_definition(elements, name):
+    # Definition of the named parameter, from the first element that has it
+    for element in elements:
+        parameter = element.LookupParameter(name)
+        if parameter is not None:
+            return parameter.Definition
+    return None
+
+
+def pending_writes(elements, name, values, unit_type_id=None, tolerance=TOLERANCE):
+    # The (parameter, internal value) pairs that differ from what is stored, and the
+    # ParameterSync counts
+    definition = find_definition(elements, name)
+    if definition is None:
+        return [], ParameterSync(0, 0, len(elements))
+    values = np.asarray(values, dtype=float)
+    if unit_type_id is not None:
+        values = values * unit_factor(unit_type_id)
+    parameters = [element.get_Parameter(definition) for element in elements]
+    writable = np.array([p is not None and not p.IsReadOnly for p in parameters], dtype=bool)
+    stored = np.array([p.AsDouble() if p is not None and p.HasValue else np.nan for p in parameters])
+    changed = writable & ~np.isclose(stored, values, rtol=tolerance, atol=0.0)
+    writes = [(parameters[i], float(values[i])) for i in np.flatnonzero(changed)]
+    missing = int((~writable).sum())
+    return writes, ParameterSync(len(writes), len(elements) - len(writes) - missing, missing)
+
+
+def sync_parameter(doc, elements, name, values, unit_type_id=None, transaction_name=None, tolerance=TOLERANCE):
+    # Set the parameter of every element to its value, in one transaction and only
+    # where it changed. Returns the ParameterSync counts.
+    elements = list(elements)
+    writes, counts = pending_writes(elements, name, values, unit_type_id, tolerance)
+    if writes:
+        t = Transaction(doc, transaction_name or "Update {}".format(name))
+        t.Start()
+        try:
+            for parameter, value in writes:
+                parameter.Set(value)
+            t.Commit()
+        except Exception as e:
+            t.RollBack()
+            print("Failed to update '{}': {}".format(name, str(e)))
+            return ParameterSync(0, counts.unchanged, counts.missing)
+    print("'{}': {} written, {} already up to date, {} without the parameter.".format(
+        name, counts.written, counts.unchanged, counts.missing))
+    return counts
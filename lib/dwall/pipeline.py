@@ -0,0 +1,206 @@
+# Single entry point: the stages of the cage for every panel of the model in one run.
+#
+# The stages run in this order, each for all the panels before the next one starts:
+#   layers        main layers A, B, D and E, synced to their placement plans
+#   ex-link       the EX-link of every panel that has none yet
+#   mirror        the mirrored EX-link of every panel that has none yet
+#   copy          the EX-links arrayed down the wall (rebar sets, or chunked copies)
+#   data mapping  the unit weight of every rebar bar type
+# All the stages share one CageContext (document, lookup cache, ledger, plan cache and
+# the parsed spec) and run inside one transaction group, assimilated into a single
+# undo step; if a stage raises, the whole run is rolled back. A stage raises
+# RuntimeError when it cannot do its work, e.g. a bar type is missing or Revit refuses
+# a bar, so a failure never leaves half a cage behind. The ledger is saved only
+# once the group is assimilated; after a rollback it is read back from its file, since
+# what was recorded during the run points at undone elements. Any subset of the stages
+# can be run; they still run in pipeline order.
+#
+# The stages find the EX-links of a panel in the ledger; in a model built before the
+# ledger, where none is recorded, mirror and copy find them by bar type. The mirror and
+# copy scripts run their stage through run_pipeline, and dwall.batch runs the stages
+# one panel at a time (CageContext.with_panels).
+import copy
+import time
+from collections import OrderedDict
+
+from Autodesk.Revit.DB import TransactionGroup, UnitTypeId
+
+from dwall.adapter import panel_parameters, to_curve_list, panel_frame
+from dwall.exlink import (COPY_CHUNK_SIZE, array_ex_links, create_ex_link_rebar, find_rebars_by_type,
+                          mirror_ex_links_by_panel)
+from dwall.incremental import sync_plan
+from dwall.ledger import LedgerKey, get_ledger
+from dwall.linkshapes import link_shape
+from dwall.lookup import get_lookup
+from dwall.params import sync_parameter
+from dwall.plancache import PlanCache
+from dwall.spec import default_spec, select, validate, with_panel
+from dwall.takeoff import bar_type_unit_weights
+
+DEFAULT_STAGES = ('layers', 'ex-link', 'mirror', 'copy', 'data mapping')
+
+
+class CageContext(object):
+    # What the stages of one run share
+    def __init__(self, doc, spec=None, use_layout=True, chunk_size=COPY_CHUNK_SIZE, derive_all_weights=False):
+        self.doc = doc
+        self.spec = spec or default_spec()
+        self.host, self.panel, self.layers, self.link, self.link_type, self.mirror, self.shape = validate(self.spec)
+        self.lookup = get_lookup(doc)
+        self.ledger = get_ledger(doc)
+        self.plans = PlanCache()
+        self.use_layout = use_layout
+        self.chunk_size = chunk_size
+        self.derive_all_weights = derive_all_weights
+        self._panels = None
+
+    @property
+    def panels(self):
+        if self._panels is None:
+            self._panels = self.lookup.walls(self.host)
+        return self._panels
+
+    def with_panels(self, walls):
+        # The same context for some of the panels only, e.g. the one panel of a
+        # dwall.batch step
+        context = copy.copy(self)
+        context._panels = list(walls)
+        return context
+
+    def panel_of(self, wall):
+        return panel_parameters(wall, self.panel)
+
+
+def layers_stage(context):
+    spec = select(context.spec, sorted(context.layers))
+    for wall in context.panels:
+        plan, _ = context.plans.get_or_compile(with_panel(spec, context.panel_of(wall)))
+        if sync_plan(context.doc, plan, wall, ledger=context.ledger,
+                     name="Create rebar layers {}".format(wall.Id.IntegerValue)) is None:
+            raise RuntimeError("the rebar layers of panel {} were not created".format(wall.Id.IntegerValue))
+
+
+def ex_link_stage(context):
+    if context.link is None:
+        print("The specification has no EX-link.")
+        return
+    rebar_type = context.lookup.bar_type(context.link_type)
+    if rebar_type is None:
+        raise RuntimeError("rebar type '{}' not found".format(context.link_type))
+    for wall in context.panels:
+        if context.ledger.get(wall, "EX", 0) is not None:
+            continue
+        points = link_shape(context.panel_of(wall), context.link, context.shape)
+        rebar = create_ex_link_rebar(context.doc, wall, rebar_type, to_curve_list(points, panel_frame(wall)))
+        if rebar is None:
+            raise RuntimeError("the EX-link of panel {} was not created".format(wall.Id.IntegerValue))
+        context.ledger.record(wall, "EX", 0, 0, rebar.Id)
+
+
+def unrecorded_links(context):
+    # EX-links of the panels of the run in a model built before the ledger, found by type
+    hosts = set(wall.Id.IntegerValue for wall in context.panels)
+    return [rebar for rebar in find_rebars_by_type(context.doc, context.link_type)
+            if rebar.GetHostId().IntegerValue in hosts]
+
+
+def mirror_stage(context):
+    if context.link is None or not context.mirror:
+        return
+    ledger = context.ledger
+    links = [(wall, ledger.get(wall, "EX", 0)) for wall in context.panels]
+    links = [(wall, rebar) for wall, rebar in links if rebar is not None]
+    if links:
+        rebars = [rebar for wall, rebar in links if ledger.get(wall, "EX", 1) is None]
+    else:
+        rebars = unrecorded_links(context)
+    if not rebars:
+        print("No EX-links to mirror.")
+        return
+    mirrored = mirror_ex_links_by_panel(context.doc, rebars)
+    if not mirrored:
+        raise RuntimeError("the EX-links were not mirrored")
+    if links:
+        for host_id, mirrored_ids in mirrored.items():
+            for mirrored_id in mirrored_ids:
+                ledger.record(host_id, "EX", 1, 0, mirrored_id)
+
+
+def copy_stage(context):
+    link = context.link
+    if link is None or link.count < 2:
+        return
+    ledger = context.ledger
+    links = []
+    for wall in context.panels:
+        for index in (0, 1):
+            rebar = ledger.get(wall, "EX", index)
+            if rebar is not None:
+                links.append((LedgerKey(wall.Id.IntegerValue, "EX", index, 0), rebar))
+    if links:
+        # Links already arrayed (sets, or links with recorded copies) are skipped
+        pending = [(key, rebar) for key, rebar in links
+                   if rebar.NumberOfBarPositions == 1 and ledger.get(key.panel, "EX", key.index, 1) is None]
+        rebars = [rebar for _, rebar in pending]
+    else:
+        pending = []
+        rebars = [rebar for rebar in unrecorded_links(context) if rebar.NumberOfBarPositions == 1]
+    if not rebars:
+        print("No EX-links to array.")
+        return
+    copied_ids = array_ex_links(context.doc, rebars, link.count, link.spacing, context.use_layout, context.chunk_size)
+    if context.use_layout:
+        failed = any(rebar.NumberOfBarPositions == 1 for rebar in rebars)
+    else:
+        # A None is a copy level whose chunk was rolled back
+        failed = not copied_ids or None in copied_ids
+    if failed:
+        raise RuntimeError("the EX-links were not arrayed")
+    if pending and copied_ids:
+        ledger.record_copies([key for key, _ in pending], copied_ids)
+
+
+def data_mapping_stage(context):
+    bar_types = context.lookup.elements('bar type')
+    sync_parameter(context.doc, bar_types, 'Unit weight', bar_type_unit_weights(bar_types, context.derive_all_weights),
+                   UnitTypeId.KilogramsPerMeter, 'Update Rebar Unit Weights')
+
+
+STAGES = OrderedDict([
+    ('layers', layers_stage),
+    ('ex-link', ex_link_stage),
+    ('mirror', mirror_stage),
+    ('copy', copy_stage),
+    ('data mapping', data_mapping_stage),
+])
+
+
+def run_pipeline(doc, stages=DEFAULT_STAGES, spec=None, name="Create D-wall cages", **options):
+    # Run the chosen stages in pipeline order; returns the time of every stage.
+    # options go to CageContext (use_layout, chunk_size, derive_all_weights).
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        raise ValueError("Unknown stage(s) {}; expected some of {}".format(", ".join(unknown), ", ".join(STAGES)))
+    context = CageContext(doc, spec, **options)
+    if not context.panels and any(stage in stages for stage in ('layers', 'ex-link')):
+        print("No '{}' walls found.".format(context.host))
+    timings = OrderedDict()
+
+    group = TransactionGroup(doc, name)
+    group.Start()
+    try:
+        for stage, function in STAGES.items():
+            if stage in stages:
+                start = time.perf_counter()
+                function(context)
+                timings[stage] = time.perf_counter() - start
+        group.Assimilate()
+    except Exception:
+        group.RollBack()
+        context.ledger.load()
+        raise
+    context.ledger.save()
+
+    print("{} panels, {} in {:.2f} s.".format(len(context.panels), ", ".join(
+        "{} {:.2f} s".format(stage, seconds) for stage, seconds in timings.items()), sum(timings.values())))
+    return timings
@@ -0,0 +1,187 @@
+# Content-addressed cache of compiled placement plans.
+#
+# The key is a hash of the spec (panel parameters, lap chains, EX-link and
+# host), so panels with the same parameters share one entry whatever order they come
+# in. The plan format version and the source of the modules that compile and pack
+# the plan are hashed in too, so the plans cached by an older version of the code
+# are never read back. Each plan is stored as one .npz file of three flat arrays; the files are
+# evicted least recently used first once the cache grows past its size cap. A small
+# in-memory LRU in front of the files saves the reads within a run.
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+from dwall.spec import PLAN_VERSION, compile_spec
+
+DEFAULT_DIRECTORY = os.path.join(tempfile.gettempdir(), 'dwall-plan-cache')
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MEMORY_ENTRIES = 32
+
+# Modules whose code shapes a cached plan
+PLAN_MODULES = ('spec.py', 'geometry.py', 'lapsolver.py', 'linkshapes.py', 'plancache.py')
+
+
+def code_version():
+    # Hash of the source of PLAN_MODULES
+    digest = hashlib.sha1()
+    for name in PLAN_MODULES:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+CODE_VERSION = code_version()
+
+
+def spec_key(spec):
+    # Hash of everything the plan depends on. Panel parameters are rounded so that a
+    # wall length read back from feet as 6000.0000000001 gives the same key as 6000.
+    # The spec is not validated here; that happens when a missing plan is compiled.
+    spec = dict(spec)
+    spec["panel"] = dict((name, round(float(value), 6)) for name, value in spec["panel"].items())
+    canonical = json.dumps([PLAN_VERSION, CODE_VERSION, spec], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+# Columns of the record table of a packed plan
+RECORD_COLUMNS = ('layer', 'index', 'type', 'count', 'spacing_x', 'spacing_y', 'spacing_z', 'offset')
+
+
+def pack_plan(plan):
+    # Plan -> three arrays: the names and panel parameters as JSON, one row of
+    # RECORD_COLUMNS per record, and the points of all records stacked, where the
+    # points of record i are points[offset[i]:offset[i + 1]]
+    records = plan["records"]
+    types = sorted(set(record["type"] for record in records))
+    layers = sorted(set(record["layer"] for record in records))
+    table = np.empty((len(records) + 1, len(RECORD_COLUMNS)))
+    offset = 0
+    for i, record in enumerate(records):
+        table[i, :7] = [layers.index(record["layer"]), record["index"], types.index(record["type"]),
+                        record["count"]] + list(record["spacing"])
+        table[i, 7] = offset
+        offset += len(record["points"])
+    table[-1] = 0
+    table[-1, 7] = offset
+    meta = {"host": plan["host"], "panel": list(plan["panel"].items()), "types": types, "layers": layers}
+    return {
+        "meta": np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8),
+        "records": table,
+        "points": np.array([point for record in records for point in record["points"]], dtype=float).reshape(-1, 3),
+    }
+
+
+def unpack_plan(arrays):
+    meta = json.loads(arrays["meta"].tobytes().decode('utf-8'))
+    types, layers, host = meta["types"], meta["layers"], meta["host"]
+    table, points = arrays["records"].tolist(), arrays["points"].tolist()
+    records = []
+    for row, next_row in zip(table, table[1:]):
+        records.append({
+            "layer": layers[int(row[0])],
+            "index": int(row[1]),
+            "type": types[int(row[2])],
+            "host": host,
+            "points": points[int(row[7]):int(next_row[7])],
+            "count": int(row[3]),
+            "spacing": row[4:7],
+        })
+    return {"version": PLAN_VERSION, "host": host, "panel": OrderedDict(meta["panel"]), "records": records}
+
+
+class PlanCache(object):
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=DEFAULT_MAX_BYTES,
+                 memory_entries=DEFAULT_MEMORY_ENTRIES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def _remember(self, key, plan):
+        self._memory[key] = plan
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def __contains__(self, key):
+        # A panel whose key is cached is unchanged since it was planned; this does not
+        # read the plan
+        return key in self._memory or os.path.exists(self._path(key))
+
+    def get(self, key):
+        # The cached plan for a key, or None
+        plan = self._memory.get(key)
+        if plan is not None:
+            self._memory.move_to_end(key)
+            return plan
+        path = self._path(key)
+        try:
+            with np.load(path) as arrays:
+                plan = unpack_plan(dict((name, arrays[name]) for name in arrays.files))
+        except (IOError, OSError, KeyError, ValueError):
+            return None
+        # The access time of a file is its position in the LRU order
+        os.utime(path, None)
+        self._remember(key, plan)
+        return plan
+
+    def put(self, key, plan):
+        path = self._path(key)
+        temp_path = path + '.tmp.npz'
+        np.savez(temp_path, **pack_plan(plan))
+        os.replace(temp_path, path)
+        self._remember(key, plan)
+        self.evict()
+
+    def get_or_compile(self, spec):
+        # Plan of the spec, compiled only when no panel with the same parameters was
+        # seen before. Returns (plan, hit).
+        key = spec_key(spec)
+        plan = self.get(key)
+        if plan is not None:
+            self.hits += 1
+            return plan, True
+        self.misses += 1
+        plan = compile_spec(spec)
+        self.put(key, plan)
+        return plan, False
+
+    def entries(self):
+        # (last used, size, path) of every file, least recently used first
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz') and not name.endswith('.tmp.npz'):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        # Drop the least recently used files until the cache fits in max_bytes
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            self._memory.pop(os.path.splitext(os.path.basename(path))[0], None)
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
+        self._memory.clear()
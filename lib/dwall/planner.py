@@ -0,0 +1,237 @@
+# Headless planning of a whole site: the stages of the cage for every panel, from the
+# specification and the panel parameters alone, written as an operation log (see
+# dwall.oplog) that dwall.replay applies inside Revit. Nothing here imports the Revit
+# API, so a site can be planned on any machine with Python and NumPy.
+#
+# The site file is written by the 'Export site for planning' script:
+#
+#     {"version": 1, "spec": {...cage specification...},
+#      "panels": [{"wall": 100006, "length": 6000.0, "thickness": 1000.0}, ...]}
+#
+# Each panel is the spec's panel with the listed parameters replaced. The stages are
+# those of dwall.pipeline and come out in the same order for each panel: the bars of
+# layers A/B/D/E, the EX-link, its mirror, the copies of both links down the wall;
+# the unit weights of the bar types used come last. Panels with the same parameters
+# are planned once.
+#
+# With workers > 1 the distinct panels are planned in a pool of processes, in chunks
+# taken in site order. A worker packs the operations of its chunk into two float64
+# arrays (see pack_operations) saved as .npy files in a temporary folder, and the
+# parent maps them back with mmap rather than receiving them pickled. The chunks come
+# back in the order they were sent and the log is written by the same loop as the
+# serial run, so it is byte for byte the log of workers=1.
+#
+#     python -m dwall.planner SITE LOG [--stages layers,ex-link,...] [--workers N]
+#     (with 'lib' on PYTHONPATH)
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from dwall.geometry import BAR_DIAMETERS, Panel
+from dwall.oplog import LogWriter
+from dwall.spec import SpecError, compile_spec, select, validate, with_panel
+from dwall.takeoff import unit_weights
+
+SITE_VERSION = 1
+
+# The stages of dwall.pipeline.DEFAULT_STAGES, which imports the Revit API
+STAGES = ('layers', 'ex-link', 'mirror', 'copy', 'data mapping')
+
+# Chunks per worker: enough to even out chunks of slow panels, few enough that the
+# spec sent with every chunk costs nothing
+CHUNKS_PER_WORKER = 4
+
+# Columns of the operation table of a packed chunk; "panel" is the position of the
+# panel in the chunk, names are indices into the name lists, -1 where a field is unused
+OPERATION_COLUMNS = ('panel', 'op', 'layer', 'index', 'type', 'to', 'count', 'spacing_x', 'spacing_y', 'spacing_z',
+                     'offset')
+
+
+def load_site(path):
+    # (spec, [(wall id, Panel)]) of a site file; raises SpecError for a bad spec
+    with open(path) as f:
+        site = json.load(f)
+    if site.get("version") != SITE_VERSION:
+        raise ValueError("Unsupported site version {!r}".format(site.get("version")))
+    spec = site["spec"]
+    panel = validate(spec)[1]
+    return spec, [(int(entry["wall"]), panel._replace(**dict((name, value) for name, value in entry.items()
+                                                           if name in Panel._fields)))
+                  for entry in site["panels"]]
+
+
+def save_site(path, spec, panels):
+    # Site file of the spec and the (wall id, Panel) of every panel
+    site = {"version": SITE_VERSION, "spec": spec,
+            "panels": [dict([("wall", wall)] + list(panel._asdict().items()))
+                       for wall, panel in panels]}
+    with open(path, 'w') as f:
+        json.dump(site, f, indent=1)
+
+
+def check_stages(stages):
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        raise ValueError("Unknown stage(s) {}; expected some of {}".format(", ".join(unknown), ", ".join(STAGES)))
+
+
+def panel_operations(spec, panel, stages=STAGES):
+    # Operations of one panel in the frame of the panel, with "panel" left out
+    host, _, layers, link, link_type, mirror, shape = validate(spec)
+    operations = []
+    if 'layers' in stages and layers:
+        for record in compile_spec(with_panel(select(spec, sorted(layers)), panel))["records"]:
+            operations.append({"op": "bar", "layer": record["layer"], "index": record["index"],
+                               "type": record["type"], "points": record["points"], "count": record["count"],
+                               "spacing": record["spacing"]})
+    if link is None:
+        return operations
+    indices = [0]
+    if 'ex-link' in stages:
+        from dwall.linkshapes import link_shape
+        points = [[float(c) for c in point] for point in link_shape(panel, link, shape)]
+        operations.append({"op": "bar", "layer": "EX", "index": 0, "type": link_type, "points": points,
+                           "count": 1, "spacing": [0.0, 0.0, 0.0]})
+    if mirror:
+        indices.append(1)
+        if 'mirror' in stages:
+            operations.append({"op": "mirror", "layer": "EX", "index": 0, "to": 1})
+    if 'copy' in stages:
+        for index in indices:
+            operations.append({"op": "copy", "layer": "EX", "index": index, "count": link.count,
+                               "spacing": [0.0, 0.0, -float(link.spacing)]})
+    return operations
+
+
+def parameter_operations(bar_types):
+    # Unit weight of every bar type, from the table of dwall.takeoff or its diameter
+    names = sorted(bar_types)
+    weights = unit_weights(np.array(names, dtype=str), np.array([BAR_DIAMETERS[name] for name in names], dtype=float))
+    return [{"op": "param", "type": name, "name": "Unit weight", "value": float(weight), "unit": "kg/m"}
+            for name, weight in zip(names, weights)]
+
+
+def pack_operations(plans):
+    # Operations of the panels of a chunk -> (names, table, points): the op, layer and
+    # type names, one row of OPERATION_COLUMNS per operation and the points of all the
+    # bars stacked, where the points of row i are points[offset[i]:offset[i + 1]]
+    names = {"op": [], "layer": [], "type": []}
+
+    def number(field, value):
+        if value not in names[field]:
+            names[field].append(value)
+        return names[field].index(value)
+
+    rows, points = [], []
+    for position, operations in enumerate(plans):
+        for operation in operations:
+            spacing = operation.get("spacing", (0.0, 0.0, 0.0))
+            rows.append([position, number("op", operation["op"]), number("layer", operation["layer"]),
+                         operation["index"], number("type", operation["type"]) if "type" in operation else -1,
+                         operation.get("to", -1), operation.get("count", -1)] + list(spacing) + [len(points)])
+            points.extend(operation.get("points", ()))
+    rows.append([-1] * (len(OPERATION_COLUMNS) - 1) + [len(points)])
+    return names, np.array(rows, dtype=float), np.array(points, dtype=float).reshape(-1, 3)
+
+
+def unpack_operations(names, table, points, size):
+    # The operations of the 'size' panels of a packed chunk, equal to those packed
+    plans = [[] for _ in range(size)]
+    table, points = table.tolist(), points.tolist()
+    for row, next_row in zip(table, table[1:]):
+        op = names["op"][int(row[1])]
+        operation = {"op": op, "layer": names["layer"][int(row[2])], "index": int(row[3])}
+        if op == "bar":
+            operation["type"] = names["type"][int(row[4])]
+            operation["points"] = points[int(row[10]):int(next_row[10])]
+        if op == "mirror":
+            operation["to"] = int(row[5])
+        else:
+            operation["count"] = int(row[6])
+            operation["spacing"] = row[7:10]
+        plans[int(row[0])].append(operation)
+    return plans
+
+
+def _plan_chunk(spec, stages, panels, folder, number):
+    # Worker: plan the panels of one chunk and save them packed; returns the names and
+    # the paths of the arrays
+    names, table, points = pack_operations([panel_operations(spec, panel, stages) for panel in panels])
+    paths = []
+    for suffix, array in (('table', table), ('points', points)):
+        paths.append(os.path.join(folder, "chunk-{}-{}.npy".format(number, suffix)))
+        np.save(paths[-1], array)
+    return names, paths
+
+
+def plan_panels(spec, panels, stages=STAGES, workers=1):
+    # {Panel: operations} of the distinct panels, planned in a pool of 'workers' processes
+    distinct = list(dict.fromkeys(panels))
+    if workers <= 1 or len(distinct) < 2:
+        return dict((panel, panel_operations(spec, panel, stages)) for panel in distinct)
+    size = max(1, -(-len(distinct) // (workers * CHUNKS_PER_WORKER)))
+    chunks = [distinct[first:first + size] for first in range(0, len(distinct), size)]
+    folder = tempfile.mkdtemp(prefix='dwall-planner-')
+    planned = {}
+    try:
+        with ProcessPoolExecutor(workers) as executor:
+            results = executor.map(_plan_chunk, [spec] * len(chunks), [stages] * len(chunks), chunks,
+                                   [folder] * len(chunks), range(len(chunks)))
+            for chunk, (names, paths) in zip(chunks, results):
+                table, points = [np.load(path, mmap_mode='r') for path in paths]
+                planned.update(zip(chunk, unpack_operations(names, table, points, len(chunk))))
+                del table, points
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return planned
+
+
+def site_operations(spec, panels, stages=STAGES, workers=1):
+    # Every operation of the site, panel by panel in site order
+    check_stages(stages)
+    planned = plan_panels(spec, [panel for _, panel in panels], stages, workers)
+    bar_types = set()
+    for wall, panel in panels:
+        for operation in planned[panel]:
+            if operation["op"] == "bar":
+                bar_types.add(operation["type"])
+            yield dict([("op", operation["op"]), ("panel", wall)] + list(operation.items())[1:])
+    if 'data mapping' in stages:
+        for operation in parameter_operations(bar_types):
+            yield operation
+
+
+def plan_site(site_path, log_path, stages=STAGES, binary=None, workers=1):
+    # Plan the site file into an operation log; returns the number of operations
+    spec, panels = load_site(site_path)
+    with LogWriter(log_path, binary) as writer:
+        return writer.write_all(site_operations(spec, panels, stages, workers))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="python -m dwall.planner",
+                                     description="Plan the cages of a site into an operation log.")
+    parser.add_argument('site', help="site file written by the 'Export site for planning' script")
+    parser.add_argument('log', help="operation log to write (.jsonl for JSON lines, anything else binary)")
+    parser.add_argument('--stages', default=",".join(STAGES), help="comma separated stages (default: all)")
+    parser.add_argument('--workers', type=int, default=1, help="planning processes (0: one per CPU)")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    try:
+        count = plan_site(args.site, args.log, args.stages.split(','), workers=args.workers or os.cpu_count())
+    except (SpecError, ValueError) as e:
+        print(str(e))
+        return 1
+    print("{} operations written to {} in {:.2f} s".format(count, args.log, time.perf_counter() - start))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
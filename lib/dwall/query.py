@@ -0,0 +1,53 @@
+# Rebar queries that leave the filtering to Revit.
+#
+# The type, host and panel filters are native collector filters, so only the ids of
+# the matching bars cross over to Python, one at a time as they are consumed.
+from Autodesk.Revit.DB import (FilteredElementCollector, ElementId, BuiltInParameter, ElementParameterFilter,
+                               ParameterFilterRuleFactory, BoundingBoxIntersectsFilter, Outline)
+from Autodesk.Revit.DB.Structure import Rebar, RebarHostData
+from System.Collections.Generic import List
+
+
+def type_filter(type_id):
+    rule = ParameterFilterRuleFactory.CreateEqualsRule(ElementId(BuiltInParameter.ELEM_TYPE_PARAM), type_id)
+    return ElementParameterFilter(rule)
+
+
+def outline_filter(element):
+    # Quick filter on the bounding box of an element, e.g. a D-wall panel
+    bbox = element.get_BoundingBox(None)
+    return BoundingBoxIntersectsFilter(Outline(bbox.Min, bbox.Max))
+
+
+def hosted_rebar_ids(host):
+    ids = List[ElementId]()
+    for rebar in RebarHostData.GetRebarHostData(host).GetRebarsInHost():
+        ids.Add(rebar.Id)
+    return ids
+
+
+def rebar_collector(doc, type_id=None, host=None, panel=None):
+    # Rebar collector narrowed by type id, host element and the outline of a panel
+    if host is not None:
+        ids = hosted_rebar_ids(host)
+        if ids.Count == 0:
+            return None
+        collector = FilteredElementCollector(doc, ids).OfClass(Rebar)
+    else:
+        collector = FilteredElementCollector(doc).OfClass(Rebar)
+    if panel is not None:
+        collector = collector.WherePasses(outline_filter(panel))
+    if type_id is not None:
+        collector = collector.WherePasses(type_filter(type_id))
+    return collector
+
+
+def iter_rebar_ids(doc, type_id=None, host=None, panel=None):
+    # Ids of the matching rebars, produced lazily
+    collector = rebar_collector(doc, type_id, host, panel)
+    if collector is None:
+        return
+    iterator = collector.GetElementIdIterator()
+    iterator.Reset()
+    while iterator.MoveNext():
+        yield iterator.Current
@@ -0,0 +1,186 @@
+# Replay of a placement plan (see dwall.spec) inside Revit.
+#
+# Every record becomes one rebar (replay_record, which dwall.incremental calls for the
+# records it has to create), laid out as a set of 'count' bars when the record has
+# more than one. Each bar carries "dwall:<layer>/<index>" in its Comments so a later
+# run (dwall.incremental) knows which record it was made from.
+#
+# replay_log applies an operation log of dwall.planner (see dwall.oplog) in bulk: the
+# panels are read from the log one at a time and applied REPLAY_CHUNK_SIZE panels per
+# transaction, all in one transaction group, so a site is one undo step and a failing
+# chunk is rolled back alone. The bars of a chunk are recorded in the ledger once the
+# chunk is committed, and the ledger is saved once the group is assimilated, so it
+# never points at rolled back elements. Operations whose bar is already in the ledger
+# are skipped, so a log can be replayed again after a failure. A panel that needs a bar
+# type missing from the model is reported and skipped.
+import math
+
+from Autodesk.Revit.DB import XYZ, BuiltInParameter, ElementId, UnitTypeId
+from Autodesk.Revit.DB.Structure import Rebar, RebarStyle, RebarHookOrientation
+
+from dwall.adapter import to_curve_list, panel_frame
+from dwall.exlink import layout_ex_links, mirror_copies, panel_mirror_plane
+from dwall.geometry import MM_TO_FEET
+from dwall.ledger import get_ledger
+from dwall.lookup import get_lookup
+from dwall.oplog import panel_groups
+from dwall.params import sync_parameter
+from dwall.transactions import TransactionScheduler
+
+
+TAG_PREFIX = "dwall:"
+
+# Panels of an operation log per transaction
+REPLAY_CHUNK_SIZE = 20
+
+# Units of the parameter operations
+UNITS = {
+    'kg/m': UnitTypeId.KilogramsPerMeter,
+}
+
+
+def record_key(record):
+    return "{}/{}".format(record["layer"], record["index"])
+
+
+def tag_rebar(rebar, key):
+    rebar.get_Parameter(BuiltInParameter.ALL_MODEL_INSTANCE_COMMENTS).Set(TAG_PREFIX + key)
+
+
+def rebar_key(rebar):
+    # Record key of a bar created from a plan, or None for any other bar
+    comments = rebar.get_Parameter(BuiltInParameter.ALL_MODEL_INSTANCE_COMMENTS).AsString()
+    if comments and comments.startswith(TAG_PREFIX):
+        return comments[len(TAG_PREFIX):]
+    return None
+
+
+def plan_bar_types(plan):
+    return sorted(set(record["type"] for record in plan["records"]))
+
+
+def layout_normal(record, frame):
+    # Unit vector of the set spacing in project coordinates and its length in feet
+    sx, sy, sz = record["spacing"]
+    length = math.sqrt(sx * sx + sy * sy + sz * sz)
+    if length == 0:
+        return None, 0.0
+    (xx, xy, xz), (yx, yy, yz) = frame.x_axis, frame.y_axis
+    ux, uy, uz = sx / length, sy / length, sz / length
+    return XYZ(ux * xx + uy * yx, ux * xy + uy * yy, ux * xz + uy * yz + uz), length * MM_TO_FEET
+
+
+def replay_record(doc, host, bar_types, record, frame):
+    # Create the rebar (set) of one record; the caller owns the open transaction
+    normal, spacing = layout_normal(record, frame)
+    rebar = Rebar.CreateFromCurves(doc, RebarStyle.Standard, bar_types[record["type"]], None, None, host,
+                                   normal or XYZ.BasisZ, to_curve_list(record["points"], frame),
+                                   RebarHookOrientation.Left, RebarHookOrientation.Right, True, True)
+    if record["count"] > 1 and normal is not None:
+        rebar.GetShapeDrivenAccessor().SetLayoutAsNumberWithSpacing(record["count"], spacing, True, True, True)
+    tag_rebar(rebar, record_key(record))
+    return rebar
+
+
+def replay_panel(doc, host, operations, bar_types, ledger):
+    # Apply the operations of one panel; the caller owns the open transaction. Returns
+    # the (layer, index, element id) of the bars created, for the caller to record in
+    # the ledger once the transaction is committed.
+    frame = panel_frame(host)
+    created = {}
+    for operation in operations:
+        op, layer, index = operation["op"], operation["layer"], operation["index"]
+        bar = created.get((layer, index)) or ledger.get(host, layer, index)
+        if op == "bar":
+            if bar is None:
+                created[(layer, index)] = replay_record(doc, host, bar_types, operation, frame)
+        elif bar is None:
+            print("Panel {}: no bar {}/{} to {}.".format(host.Id.IntegerValue, layer, index, op))
+        elif op == "mirror":
+            if (layer, operation["to"]) not in created and ledger.get(host, layer, operation["to"]) is None:
+                mirrored_id, = mirror_copies(doc, [bar], panel_mirror_plane(host))
+                mirrored = doc.GetElement(mirrored_id)
+                # The copy has the tag of its source
+                tag_rebar(mirrored, "{}/{}".format(layer, operation["to"]))
+                created[(layer, operation["to"])] = mirrored
+        elif bar.NumberOfBarPositions == 1:
+            # copy: the links are laid out down the wall (see dwall.exlink.layout_ex_links)
+            sx, sy, sz = operation["spacing"]
+            layout_ex_links(doc, [bar], operation["count"], math.sqrt(sx * sx + sy * sy + sz * sz))
+    return [(layer, index, rebar.Id) for (layer, index), rebar in created.items()]
+
+
+def replay_parameters(doc, operations):
+    # Set the bar type parameters of the log, one sync_parameter per parameter
+    lookup = get_lookup(doc)
+    by_parameter = {}
+    for operation in operations:
+        bar_type = lookup.bar_type(operation["type"])
+        if bar_type is None:
+            print("Rebar type '{}' not found.".format(operation["type"]))
+            continue
+        by_parameter.setdefault((operation["name"], operation["unit"]), []).append((bar_type, operation["value"]))
+    for (name, unit), values in sorted(by_parameter.items()):
+        sync_parameter(doc, [bar_type for bar_type, _ in values], name, [value for _, value in values],
+                       UNITS[unit], "Set {}".format(name))
+
+
+def replay_log(doc, operations, chunk_size=REPLAY_CHUNK_SIZE, name="Replay operation log"):
+    # Apply the operations (e.g. dwall.oplog.read_log(path)) panel by panel; returns the
+    # number of panels applied and the number of panels skipped or rolled back
+    lookup = get_lookup(doc)
+    ledger = get_ledger(doc)
+    bar_types = {}
+    parameters = []
+    applied, skipped = 0, 0
+    scheduler = TransactionScheduler(doc, name, chunk_size)
+
+    def apply(chunk):
+        return [replay_panel(doc, host, panel_operations, bar_types, ledger) for host, panel_operations in chunk]
+
+    def flush(chunk):
+        # Apply a chunk and record the bars of its panels if it was committed; returns the
+        # number of panels applied
+        results = scheduler.run(chunk, apply, "Replay panels")
+        for (host, _), records in zip(chunk, results):
+            for layer, index, element_id in records or ():
+                ledger.record(host, layer, index, 0, element_id)
+        return len([records for records in results if records is not None])
+
+    try:
+        with scheduler:
+            chunk = []
+            for panel, panel_operations in panel_groups(operations):
+                if panel is None:
+                    parameters.extend(panel_operations)
+                    continue
+                host = doc.GetElement(ElementId(panel))
+                if host is None:
+                    print("Panel {} not found in the model.".format(panel))
+                    skipped += 1
+                    continue
+                names = set(operation["type"] for operation in panel_operations if operation["op"] == "bar")
+                for type_name in names - set(bar_types):
+                    bar_types[type_name] = lookup.bar_type(type_name)
+                missing = sorted(type_name for type_name in names if bar_types[type_name] is None)
+                if missing:
+                    print("Panel {} skipped: rebar type(s) not found: {}".format(panel, ", ".join(missing)))
+                    skipped += 1
+                    continue
+                chunk.append((host, panel_operations))
+                if len(chunk) == scheduler.chunk_size:
+                    done = flush(chunk)
+                    applied, skipped, chunk = applied + done, skipped + len(chunk) - done, []
+            if chunk:
+                done = flush(chunk)
+                applied, skipped = applied + done, skipped + len(chunk) - done
+            if parameters:
+                replay_parameters(doc, parameters)
+    except Exception:
+        # The whole group was rolled back
+        ledger.load()
+        raise
+    ledger.save()
+    scheduler.print_timings()
+    print("{} panels replayed, {} skipped or rolled back.".format(applied, skipped))
+    return applied, skipped
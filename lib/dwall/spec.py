@@ -0,0 +1,302 @@
+# Declarative cage specification and its compiler into a placement plan.
+#
+# A spec is a JSON (or YAML, when PyYAML is installed) document with the panel
+# parameters, the lap chain of every main layer and the EX-link; see
+# specs/d_wall_panel.json. compile_spec validates it and returns a plan: a plain,
+# JSON-serialisable dict whose "records" list holds one record per bar or bar set:
+#
+#     {"layer": "A", "index": 0, "type": "H40", "host": "D-wall panel",
+#      "points": [[x, y, z], [x, y, z]], "count": 20, "spacing": [119, 0, 0]}
+#
+# Points are in mm in the panel frame (see dwall.geometry); "count" bars are laid
+# out "spacing" apart, starting from the bar given by "points". The EX-link may name
+# its "shape" (dwall.linkshapes; the trapezoid of the original scripts when left out).
+#
+# Instead of its lap chain, a layer may give the level its bars go down to and the
+# length of the stock bars:
+#
+#     "A": {"face": 1, "row": 1, "bottom": -33000, "stock_length": 12000}
+#
+# The chain from the top of the panel down to "bottom" is then solved by
+# dwall.lapsolver: full stock bars with the last one cut to fit, the bar types of its
+# diameter zones and the laps of its lap rule.
+#
+# The Revit side only replays the plan (dwall.replay), so the plan can be built and
+# cached anywhere.
+import json
+import os
+import sys
+
+from dwall.geometry import (BAR_DIAMETERS, DEFAULT_PANEL, DEFAULT_EX_LINK, LAYERS, Panel, LayerSpec, ExLinkSpec,
+                            layer_chain)
+
+PLAN_VERSION = 1
+
+# Fields of a layer whose lap chain is solved (see above)
+LEVEL_FIELDS = ('face', 'row', 'bottom', 'stock_length')
+
+# Fields counting bars, which must be whole numbers
+COUNT_FIELDS = ('bar_count', 'count')
+
+# The sloped leg of the EX-link is bent less than a right angle
+MAX_BEND_ANGLE = 90
+
+
+class SpecError(ValueError):
+    def __init__(self, errors):
+        ValueError.__init__(self, "Invalid cage specification:\n  " + "\n  ".join(errors))
+        self.errors = errors
+
+
+def load_spec(path):
+    with open(path) as f:
+        if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def _number(errors, where, value, positive=True, integer=False):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        errors.append("{}: expected a number, got {!r}".format(where, value))
+        return False
+    if integer and value != int(value):
+        errors.append("{}: expected a whole number, got {}".format(where, value))
+        return False
+    if positive and value <= 0:
+        errors.append("{}: must be positive, got {}".format(where, value))
+        return False
+    return True
+
+
+def _fields(errors, where, data, names):
+    # Every field of a record must be present; unknown fields are reported too
+    if not isinstance(data, dict):
+        errors.append("{}: expected a mapping".format(where))
+        return False
+    for name in names:
+        if name not in data:
+            errors.append("{}: missing '{}'".format(where, name))
+    for name in data:
+        if name not in names:
+            errors.append("{}: unknown field '{}'".format(where, name))
+    return all(name in data for name in names)
+
+
+def _list(errors, where, value):
+    if not isinstance(value, list):
+        errors.append("{}: expected a list, got {!r}".format(where, value))
+        return False
+    return True
+
+
+def _bar_type(errors, where, value):
+    if not isinstance(value, str) or value not in BAR_DIAMETERS:
+        errors.append("{}: unknown bar type {!r}".format(where, value))
+
+
+def validate_panel(errors, data):
+    if _fields(errors, "panel", data, Panel._fields):
+        valid = [_number(errors, "panel.{}".format(name), data[name], positive=name != 'top',
+                         integer=name in COUNT_FIELDS) for name in Panel._fields]
+        if all(valid) and data['cover'] * 2 >= data['thickness']:
+            errors.append("panel.cover: cover of {} mm on both faces leaves no room in a panel {} mm thick".format(
+                data['cover'], data['thickness']))
+        if not errors:
+            return Panel(**dict((name, int(value) if name in COUNT_FIELDS else value)
+                                for name, value in data.items()))
+    return None
+
+
+def _face_row(errors, where, data):
+    if data['face'] not in (1, -1):
+        errors.append("{}.face: must be 1 or -1".format(where))
+    if data['row'] not in (1, 2):
+        errors.append("{}.row: must be 1 or 2".format(where))
+
+
+def validate_solved_layer(errors, where, data, panel):
+    # A layer given by its bottom level and stock length. dwall.lapsolver (and NumPy) is
+    # imported here, so specs with explicit lap chains never load it.
+    from dwall.lapsolver import chain_solutions, to_layer_spec
+    if not _fields(errors, where, data, LEVEL_FIELDS):
+        return None
+    _face_row(errors, where, data)
+    if not (_number(errors, "{}.bottom".format(where), data['bottom'], positive=False) &
+            _number(errors, "{}.stock_length".format(where), data['stock_length'])) or panel is None:
+        return None
+    if data['bottom'] >= panel.top:
+        errors.append("{}.bottom: must be below the top of the panel ({} mm)".format(where, panel.top))
+        return None
+    try:
+        solution, = chain_solutions([panel.top], [data['bottom']], data['stock_length'])
+    except ValueError as e:
+        errors.append("{}: {}".format(where, e))
+        return None
+    return to_layer_spec(solution, data['face'], data['row'])
+
+
+def validate_layer(errors, name, data, panel=DEFAULT_PANEL):
+    where = "layers.{}".format(name)
+    if isinstance(data, dict) and 'bottom' in data:
+        return validate_solved_layer(errors, where, data, panel)
+    if not _fields(errors, where, data, LayerSpec._fields):
+        return None
+    _face_row(errors, where, data)
+    bar_types, lengths, laps = data['bar_types'], data['lengths'], data['laps']
+    if not all([_list(errors, "{}.{}".format(where, field), data[field]) for field in ('bar_types', 'lengths', 'laps')]):
+        return None
+    if not lengths or len(bar_types) != len(lengths):
+        errors.append("{}: needs one bar type per bar length".format(where))
+    if len(laps) != max(len(lengths) - 1, 0):
+        errors.append("{}: needs one lap less than there are bars".format(where))
+    for i, bar_type in enumerate(bar_types):
+        _bar_type(errors, "{}.bar_types[{}]".format(where, i), bar_type)
+    valid_lengths = [_number(errors, "{}.lengths[{}]".format(where, i), length) for i, length in enumerate(lengths)]
+    for i, lap in enumerate(laps):
+        if (_number(errors, "{}.laps[{}]".format(where, i), lap) and i < len(lengths) and valid_lengths[i] and
+                lap >= lengths[i]):
+            errors.append("{}.laps[{}]: lap of {} mm is not shorter than the bar above".format(where, i, lap))
+    return LayerSpec(data['face'], data['row'], tuple(bar_types), tuple(lengths), tuple(laps))
+
+
+def validate_ex_link(errors, data):
+    # The shape is the only optional field. dwall.linkshapes (and NumPy) is imported
+    # here, so specs without an EX-link, like those of the layer scripts, never load it.
+    from dwall.linkshapes import DEFAULT_SHAPE, LINK_SHAPES
+    names = ExLinkSpec._fields + ('type', 'mirror')
+    if isinstance(data, dict):
+        data = dict(data)
+        shape = data.pop('shape', DEFAULT_SHAPE)
+        if not isinstance(shape, str) or shape not in LINK_SHAPES:
+            errors.append("ex_link.shape: unknown shape {!r}, expected one of {}".format(
+                shape, ", ".join(LINK_SHAPES)))
+    if not _fields(errors, "ex_link", data, names):
+        return None, None, False, None
+    valid = dict((name, _number(errors, "ex_link.{}".format(name), data[name], integer=name in COUNT_FIELDS))
+                 for name in ExLinkSpec._fields)
+    if valid['bend_angle'] and data['bend_angle'] >= MAX_BEND_ANGLE:
+        errors.append("ex_link.bend_angle: must be less than {} degrees, got {}".format(
+            MAX_BEND_ANGLE, data['bend_angle']))
+    _bar_type(errors, "ex_link.type", data['type'])
+    link = ExLinkSpec(**dict((name, int(data[name]) if name in COUNT_FIELDS and valid[name] else data[name])
+                             for name in ExLinkSpec._fields))
+    return link, data['type'], bool(data['mirror']), shape
+
+
+def validate(spec):
+    # Check the whole spec and return (host, panel, layers, link, link type, mirror, shape);
+    # raises SpecError listing every problem found
+    errors = []
+    if not _fields(errors, "spec", spec, ('host', 'panel', 'layers', 'ex_link')):
+        raise SpecError(errors)
+    if not isinstance(spec['host'], str) or not spec['host']:
+        errors.append("host: expected the name of the host walls, got {!r}".format(spec['host']))
+    panel = validate_panel(errors, spec['panel'])
+    layers = {}
+    if not isinstance(spec['layers'], dict):
+        errors.append("layers: expected a mapping of layer name to layer")
+    else:
+        for name in sorted(spec['layers']):
+            layers[name] = validate_layer(errors, name, spec['layers'][name], panel)
+    link, link_type, mirror, shape = (None, None, False, None)
+    if spec['ex_link'] is not None:
+        link, link_type, mirror, shape = validate_ex_link(errors, spec['ex_link'])
+    if errors:
+        raise SpecError(errors)
+    return spec['host'], panel, layers, link, link_type, mirror, shape
+
+
+def _record(layer, index, bar_type, host, points, count, spacing):
+    return {
+        "layer": layer,
+        "index": index,
+        "type": bar_type,
+        "host": host,
+        "points": [[float(c) for c in point] for point in points],
+        "count": count,
+        "spacing": [float(c) for c in spacing],
+    }
+
+
+def compile_spec(spec):
+    # Spec -> placement plan
+    host, panel, layers, link, link_type, mirror, shape = validate(spec)
+    records = []
+    for name in sorted(layers):
+        for bar in layer_chain(panel, name, layers[name]):
+            records.append(_record(name, bar.index, bar.type_name, host, [bar.start, bar.end],
+                                   panel.bar_count, (panel.bar_spacing, 0, 0)))
+    if link is not None:
+        from dwall.linkshapes import link_shape
+        points = link_shape(panel, link, shape)
+        spacing = (0, 0, -link.spacing)
+        records.append(_record("EX", 0, link_type, host, points, link.count, spacing))
+        if mirror:
+            # Mirrored about the centre plane of the panel
+            records.append(_record("EX", 1, link_type, host, [(x, -y, z) for x, y, z in points],
+                                   link.count, spacing))
+    return {"version": PLAN_VERSION, "host": host, "panel": panel._asdict(), "records": records}
+
+
+def default_spec(host="D-wall panel"):
+    # The spec of the cage built by the original scripts
+    ex_link = DEFAULT_EX_LINK._asdict()
+    ex_link.update({"type": "H20", "mirror": True})
+    return {
+        "host": host,
+        "panel": DEFAULT_PANEL._asdict(),
+        "layers": dict((name, {"face": spec.face, "row": spec.row, "bar_types": list(spec.bar_types),
+                               "lengths": list(spec.lengths), "laps": list(spec.laps)})
+                       for name, spec in LAYERS.items()),
+        "ex_link": ex_link,
+    }
+
+
+def with_panel(spec, panel):
+    # Copy of the spec for a panel with other parameters, e.g. from dwall.adapter.panel_parameters
+    spec = dict(spec)
+    spec["panel"] = dict(panel._asdict())
+    return spec
+
+
+def select(spec, layers=(), ex_link=False):
+    # Copy of the spec with only some of the layers, and the EX-link or not; used by the
+    # scripts that build one part of the cage
+    spec = dict(spec)
+    spec["layers"] = dict((name, layer) for name, layer in spec["layers"].items() if name in layers)
+    if not ex_link:
+        spec["ex_link"] = None
+    return spec
+
+
+def save_plan(plan, path):
+    with open(path, 'w') as f:
+        json.dump(plan, f, separators=(',', ':'))
+
+
+def load_plan(path):
+    with open(path) as f:
+        plan = json.load(f)
+    if plan.get("version") != PLAN_VERSION:
+        raise ValueError("Unsupported plan version {!r}".format(plan.get("version")))
+    return plan
+
+
+def main(argv):
+    # python -m dwall.spec SPEC PLAN  (with 'lib' on PYTHONPATH)
+    if len(argv) != 2:
+        print("usage: python -m dwall.spec SPEC PLAN")
+        return 2
+    try:
+        plan = compile_spec(load_spec(argv[0]))
+    except SpecError as e:
+        print(str(e))
+        return 1
+    save_plan(plan, argv[1])
+    print("{} records written to {}".format(len(plan["records"]), argv[1]))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
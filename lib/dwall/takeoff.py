@@ -0,0 +1,185 @@
+# Bar bending schedule and steel takeoff, computed from the bar geometry instead of
+# Revit schedules.
+#
+# The bars come in as "rows": a dict of equally long NumPy columns with one row per
+# bar or bar set (panel, layer, index, type, diameter, segments, length per bar in mm
+# and count). plan_rows builds them from placement plans (no Revit needed) and
+# ledger_rows from the bars recorded in the ledger. Grouping and sums are vectorised,
+# so a whole site takes milliseconds.
+import csv
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+from dwall.geometry import BAR_DIAMETERS, MM_TO_FEET
+from dwall.spec import compile_spec, load_spec
+
+STEEL_DENSITY = 7850  # kg/m3
+
+# Unit weights in kg/m of the bar types used in the cage; other types get the weight
+# of their diameter from unit_weight
+UNIT_WEIGHTS = {
+    'H40': 9.864,
+    'H32': 6.313,
+    'H25': 3.854,
+    'H20': 2.470,
+    'H16': 1.580,
+    'H13': 1.040,
+}
+
+ROW_COLUMNS = ('panel', 'layer', 'index', 'type', 'diameter', 'segments', 'length', 'count')
+
+
+def unit_weight(diameter, density=STEEL_DENSITY):
+    # kg/m of a bar of 'diameter' mm (a number or an array): density * pi * d^2 / 4
+    d = np.asarray(diameter, dtype=float) / 1000
+    return density * np.pi * d * d / 4
+
+
+def unit_weights(types, diameters):
+    # kg/m of every row: from UNIT_WEIGHTS where the type is listed, otherwise derived
+    # from the diameter
+    weights = unit_weight(diameters)
+    for name, weight in UNIT_WEIGHTS.items():
+        weights = np.where(types == name, weight, weights)
+    return weights
+
+
+def bar_type_unit_weights(bar_types, derive_all=False):
+    # kg/m of Revit bar types from their name and nominal diameter; with derive_all the
+    # table is ignored and every weight comes from the diameter
+    names = np.array([bar_type.Name for bar_type in bar_types], dtype=str)
+    diameters = np.array([bar_type.BarNominalDiameter / MM_TO_FEET for bar_type in bar_types], dtype=float)
+    return unit_weight(diameters) if derive_all else unit_weights(names, diameters)
+
+
+def _rows(panel, layer, index, types, diameter, segments, length, count):
+    return OrderedDict(zip(ROW_COLUMNS, (
+        np.asarray(panel, dtype=np.int64), np.asarray(layer, dtype=str), np.asarray(index, dtype=np.int64),
+        np.asarray(types, dtype=str), np.asarray(diameter, dtype=float), np.asarray(segments, dtype=np.int64),
+        np.asarray(length, dtype=float), np.asarray(count, dtype=np.int64))))
+
+
+def plan_rows(plan, panel=0):
+    # Rows of a placement plan; the length of a bar is that of its polyline
+    records = plan["records"]
+    sizes = np.array([len(record["points"]) for record in records])
+    points = np.array([point for record in records for point in record["points"]], dtype=float).reshape(-1, 3)
+    along = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))])
+    ends = np.cumsum(sizes) - 1
+    types = [record["type"] for record in records]
+    return _rows(np.full(len(records), panel), [record["layer"] for record in records],
+                 [record["index"] for record in records], types, [BAR_DIAMETERS[t] for t in types], sizes - 1,
+                 along[ends] - along[ends - sizes + 1], [record["count"] for record in records])
+
+
+def ledger_rows(ledger):
+    # Rows of every bar recorded in the ledger, read from the model
+    from Autodesk.Revit.DB.Structure import MultiplanarOption
+    doc = ledger.doc
+    bar_types = {}
+    columns = [[] for _ in ROW_COLUMNS]
+    for key, rebar in ledger.entries():
+        type_id = rebar.GetTypeId()
+        if type_id not in bar_types:
+            bar_types[type_id] = doc.GetElement(type_id)
+        bar_type = bar_types[type_id]
+        count = rebar.Quantity
+        curves = rebar.GetCenterlineCurves(False, True, True, MultiplanarOption.IncludeOnlyPlanarCurves, 0)
+        row = (key.panel, key.layer, key.index, bar_type.Name, bar_type.BarNominalDiameter / MM_TO_FEET,
+               len(curves), rebar.TotalLength / MM_TO_FEET / count, count)
+        for column, value in zip(columns, row):
+            column.append(value)
+    return _rows(*columns)
+
+
+def concat_rows(rows_list):
+    rows_list = list(rows_list)
+    if not rows_list:
+        return _rows(*[[] for _ in ROW_COLUMNS])
+    return OrderedDict((name, np.concatenate([rows[name] for rows in rows_list])) for name in ROW_COLUMNS)
+
+
+def _group(rows, fields):
+    keys = np.rec.fromarrays([rows[name] for name in fields], names=list(fields))
+    return np.unique(keys, return_inverse=True)
+
+
+def takeoff(rows, by=('panel', 'layer', 'diameter')):
+    # Number of bars, total length in m and weight in kg per group
+    groups, inverse = _group(rows, by)
+    length = rows['length'] * rows['count'] / 1000
+    weight = length * unit_weights(rows['type'], rows['diameter'])
+    table = OrderedDict((name, groups[name]) for name in by)
+    table['bars'] = np.bincount(inverse, weights=rows['count'], minlength=len(groups)).astype(np.int64)
+    table['length_m'] = np.bincount(inverse, weights=length, minlength=len(groups))
+    table['weight_kg'] = np.bincount(inverse, weights=weight, minlength=len(groups))
+    return table
+
+
+def bending_schedule(rows):
+    # One line per bar mark (panel, layer, bar index): type, shape, cut length and number
+    table = takeoff(rows, ('panel', 'layer', 'index', 'type'))
+    groups, inverse = _group(rows, ('panel', 'layer', 'index', 'type'))
+    bars = np.maximum(table['bars'], 1)
+    diameter = np.zeros(len(groups))
+    segments = np.zeros(len(groups), dtype=np.int64)
+    diameter[inverse] = rows['diameter']
+    segments[inverse] = rows['segments']
+    schedule = OrderedDict((name, table[name]) for name in ('panel', 'layer', 'index', 'type'))
+    schedule['diameter'] = diameter
+    schedule['segments'] = segments
+    schedule['cut_length'] = table['length_m'] * 1000 / bars
+    for name in ('bars', 'length_m', 'weight_kg'):
+        schedule[name] = table[name]
+    return schedule
+
+
+def write_csv(table, path):
+    names = list(table)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        for row in zip(*[table[name].tolist() for name in names]):
+            writer.writerow([round(value, 3) if isinstance(value, float) else value for value in row])
+
+
+def write_parquet(table, path):
+    # Needs pyarrow
+    import pyarrow
+    import pyarrow.parquet
+    pyarrow.parquet.write_table(pyarrow.table(dict((name, column) for name, column in table.items())), path)
+
+
+def export(table, path):
+    if path.lower().endswith('.parquet'):
+        write_parquet(table, path)
+    else:
+        write_csv(table, path)
+
+
+def print_totals(rows):
+    table = takeoff(rows, ('diameter',))
+    for diameter, bars, length, weight in zip(table['diameter'], table['bars'], table['length_m'],
+                                              table['weight_kg']):
+        print("  {:>3.0f} mm: {:>7} bars, {:>10.1f} m, {:>9.1f} kg".format(diameter, bars, length, weight))
+    print("  Total : {:.3f} t".format(table['weight_kg'].sum() / 1000))
+
+
+def main(argv):
+    # python -m dwall.takeoff SPEC OUTPUT [panels]  (with 'lib' on PYTHONPATH); OUTPUT
+    # is a .csv or .parquet bending schedule of 'panels' panels of the spec
+    if len(argv) not in (2, 3):
+        print("usage: python -m dwall.takeoff SPEC OUTPUT [panels]")
+        return 2
+    rows = plan_rows(compile_spec(load_spec(argv[0])))
+    panels = int(argv[2]) if len(argv) == 3 else 1
+    rows = concat_rows(OrderedDict(rows, panel=np.full(len(rows['panel']), panel)) for panel in range(panels))
+    export(bending_schedule(rows), argv[1])
+    print_totals(rows)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
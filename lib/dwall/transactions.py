@@ -0,0 +1,91 @@
+# Chunked transactions: many model operations in transactions of chunk_size operations
+# each, all inside one transaction group that is assimilated into a single undo step.
+#
+# A failing chunk is rolled back on its own and the others are kept, so one bad
+# operation does not undo a long run. Every chunk is timed; the timings show which
+# chunk size gives the best throughput for a model (large chunks build large undo
+# records, small chunks pay the regeneration of every commit).
+#
+#     scheduler = TransactionScheduler(doc, "Copy EX-links", chunk_size=50)
+#     ids = scheduler.run(offsets, lambda chunk: copy_ex_links(doc, links, chunk))
+#     scheduler.print_timings()
+#
+# 'apply' gets a list of operations and returns one result per operation; the results
+# of a failed chunk are None. Several run() calls share one group inside a with block.
+import time
+from collections import namedtuple
+
+from Autodesk.Revit.DB import Transaction, TransactionGroup
+
+DEFAULT_CHUNK_SIZE = 50
+
+# One chunk: its transaction name, the index of its first operation, the number of
+# operations, the time from Start to Commit (or RollBack) and the error if it failed
+ChunkTiming = namedtuple('ChunkTiming', ['name', 'first', 'size', 'seconds', 'error'])
+
+
+class TransactionScheduler(object):
+    def __init__(self, doc, name, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.doc = doc
+        self.name = name
+        self.chunk_size = chunk_size
+        self.timings = []
+        self._group = None
+
+    def __enter__(self):
+        self._group = TransactionGroup(self.doc, self.name)
+        self._group.Start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        group, self._group = self._group, None
+        if exc_type is None:
+            group.Assimilate()
+        else:
+            group.RollBack()
+        return False
+
+    @property
+    def failed(self):
+        return [timing for timing in self.timings if timing.error is not None]
+
+    def run(self, operations, apply, name=None):
+        # Results of apply over the operations, chunk by chunk
+        if self._group is None:
+            with self:
+                return self.run(operations, apply, name)
+        operations = list(operations)
+        name = name or self.name
+        chunk_size = self.chunk_size or len(operations) or 1
+        results = []
+        for first in range(0, len(operations), chunk_size):
+            chunk = operations[first:first + chunk_size]
+            chunk_name = "{} {}-{}".format(name, first + 1, first + len(chunk))
+            start = time.perf_counter()
+            t = Transaction(self.doc, chunk_name)
+            t.Start()
+            try:
+                chunk_results = list(apply(chunk))
+                if len(chunk_results) != len(chunk):
+                    raise ValueError("{} results for {} operations".format(len(chunk_results), len(chunk)))
+                t.Commit()
+                error = None
+            except Exception as e:
+                t.RollBack()
+                chunk_results = [None] * len(chunk)
+                error = str(e)
+                print("{} rolled back: {}".format(chunk_name, error))
+            self.timings.append(ChunkTiming(chunk_name, first, len(chunk), time.perf_counter() - start, error))
+            results.extend(chunk_results)
+        return results
+
+    def print_timings(self):
+        if not self.timings:
+            return
+        operations = sum(timing.size for timing in self.timings)
+        seconds = sum(timing.seconds for timing in self.timings)
+        slowest = max(self.timings, key=lambda timing: timing.seconds)
+        print("{}: {} operations in {} chunks of up to {}, {:.2f} s ({:.0f} operations/s), "
+              "slowest chunk {} {:.3f} s, {} rolled back.".format(
+                  self.name, operations, len(self.timings), self.chunk_size or operations, seconds,
+                  operations / seconds if seconds else 0, slowest.name, slowest.seconds, len(self.failed)))
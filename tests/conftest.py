@@ -0,0 +1,32 @@
+# The tests run on the fake Revit API of dwall.fakeapi, installed here before any
+# dwall module that imports the API.
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'lib'))
+
+from dwall import fakeapi
+
+fakeapi.install()
+
+import pytest
+
+
+@pytest.fixture
+def saved_doc(tmp_path):
+    # A fake model of three panels saved at a path, so it has a ledger file
+    doc = fakeapi.new_document(panels=3)
+    doc.PathName = str(tmp_path / 'model.rvt')
+    return doc
+
+
+def run_script(folder, doc):
+    # Run one of the pyRevit scripts on a fake model
+    fakeapi.run_script(os.path.join(ROOT, folder, 'main.py'), doc)
+
+
+def rebars(doc):
+    from Autodesk.Revit.DB import FilteredElementCollector
+    from Autodesk.Revit.DB.Structure import Rebar
+    return list(FilteredElementCollector(doc).OfClass(Rebar))
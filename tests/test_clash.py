@@ -0,0 +1,72 @@
+# Segment distances and the violations of a placement plan.
+import numpy as np
+import pytest
+
+from dwall.clash import check_plan, segment_distances
+from dwall.geometry import DEFAULT_PANEL
+
+
+def distance(p1, q1, p2, q2):
+    distances, points = segment_distances(*[np.array([point], dtype=float) for point in (p1, q1, p2, q2)])
+    return distances[0], points[0]
+
+
+@pytest.mark.parametrize('p1, q1, p2, q2, expected', [
+    # parallel, side by side
+    ((0, 0, 0), (0, 0, 100), (10, 0, 0), (10, 0, 100), 10),
+    # parallel, one past the end of the other
+    ((0, 0, 0), (0, 0, 100), (0, 0, 130), (0, 0, 200), 30),
+    # skew, crossing at right angles 5 apart
+    ((-50, 0, 0), (50, 0, 0), (0, -50, 5), (0, 50, 5), 5),
+    # the closest point is an end of the second segment
+    ((0, 0, 0), (100, 0, 0), (50, 20, 0), (50, 80, 0), 20),
+    # crossing
+    ((0, 0, 0), (100, 100, 0), (0, 100, 0), (100, 0, 0), 0),
+    # one segment is a point
+    ((0, 0, 0), (100, 0, 0), (30, 40, 0), (30, 40, 0), 40),
+])
+def test_segment_distance(p1, q1, p2, q2, expected):
+    assert distance(p1, q1, p2, q2)[0] == pytest.approx(expected)
+
+
+def test_middle_of_the_closest_points():
+    _, point = distance((-50, 0, 0), (50, 0, 0), (0, -50, 5), (0, 50, 5))
+    assert point == pytest.approx([0, 0, 2.5])
+
+
+def test_distances_row_by_row():
+    p1 = np.zeros((3, 3))
+    q1 = np.array([[0, 0, 100.0]] * 3)
+    p2 = np.array([[10.0, 0, 0], [20.0, 0, 0], [0, 30.0, 0]])
+    distances, _ = segment_distances(p1, q1, p2, p2 + q1)
+    assert distances == pytest.approx([10, 20, 30])
+
+
+def bar(layer, index, x, y=0.0, bar_type='H40'):
+    return {"layer": layer, "index": index, "type": bar_type, "host": "D-wall panel",
+            "points": [[x, y, 0.0], [x, y, -3000.0]], "count": 1, "spacing": [0.0, 0.0, 0.0]}
+
+
+def check(*records):
+    plan = {"panel": DEFAULT_PANEL._asdict(), "records": list(records)}
+    return [(violation.kind, violation.first, violation.second) for violation in check_plan(plan)]
+
+
+def test_bars_far_enough_apart():
+    assert check(bar('A', 0, 1000), bar('B', 0, 1100)) == []
+
+
+def test_overlapping_bars_clash():
+    assert check(bar('A', 0, 1000), bar('B', 0, 1030)) == [('clash', 'A/0 H40', 'B/0 H40')]
+
+
+def test_bars_too_close():
+    assert check(bar('A', 0, 1000), bar('B', 0, 1070)) == [('spacing', 'A/0 H40', 'B/0 H40')]
+
+
+def test_lapped_bars_may_touch():
+    assert check(bar('A', 0, 1000), bar('A', 1, 1040)) == []
+
+
+def test_bar_in_the_cover():
+    assert check(bar('A', 0, 1000, y=480)) == [('cover', 'A/0 H40', None)]
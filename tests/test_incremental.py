@@ -0,0 +1,67 @@
+# diff_plan: the changes that bring the bars of a panel in line with its plan.
+from dwall.incremental import ExistingBar, diff_plan
+from dwall.replay import record_key
+from dwall.spec import compile_spec, default_spec, select
+
+
+def plan_records(layers=('B',)):
+    return compile_spec(select(default_spec(), list(layers)))["records"]
+
+
+def as_built(record, rebar_id, **changes):
+    # The bar a record creates, read back from the model
+    bar = ExistingBar(record_key(record), rebar_id, record["type"], [list(p) for p in record["points"]],
+                      record["count"], record["spacing"][0])
+    return bar._replace(**changes)
+
+
+def actions(changes):
+    return sorted((change.action, change.key) for change in changes)
+
+
+def test_up_to_date_panel_has_no_changes():
+    records = plan_records()
+    assert diff_plan(records, [as_built(r, i) for i, r in enumerate(records)], {'B'}) == []
+
+
+def test_missing_bars_are_created():
+    records = plan_records()
+    changes = diff_plan(records, [as_built(records[0], 1)], {'B'})
+    assert actions(changes) == [('create', 'B/1')]
+    assert changes[0].record is records[1]
+
+
+def test_bar_without_record_and_duplicate_are_deleted():
+    records = plan_records()
+    existing = [as_built(r, i) for i, r in enumerate(records)]
+    existing += [as_built(records[0], 10), as_built(records[0], 11, key='B/7')]
+    assert actions(diff_plan(records, existing, {'B'})) == [('delete', 'B/0'), ('delete', 'B/7')]
+
+
+def test_bars_of_other_layers_are_left_alone():
+    records = plan_records()
+    existing = [as_built(r, i) for i, r in enumerate(records)] + [as_built(records[0], 10, key='A/0')]
+    assert diff_plan(records, existing, {'B'}) == []
+
+
+def test_moved_retyped_and_relaid_bars():
+    records = plan_records()
+    moved = [[x + 50, y, z] for x, y, z in records[0]["points"]]
+    existing = [as_built(records[0], 1, points=moved, type='H32'), as_built(records[1], 2, count=5)]
+    changes = diff_plan(records, existing, {'B'})
+    assert actions(changes) == [('layout', 'B/1'), ('move', 'B/0'), ('retype', 'B/0')]
+    move, = [change for change in changes if change.action == 'move']
+    assert move.offset == [-50, 0, 0]
+
+
+def test_bar_of_another_shape_is_replaced():
+    records = plan_records()
+    longer = [records[0]["points"][0], [p + d for p, d in zip(records[0]["points"][1], (0, 0, -500))]]
+    existing = [as_built(records[0], 1, points=longer), as_built(records[1], 2)]
+    assert actions(diff_plan(records, existing, {'B'})) == [('replace', 'B/0')]
+
+
+def test_untagged_bar_in_place_is_adopted():
+    records = plan_records()
+    existing = [as_built(records[0], 1, key=None), as_built(records[1], 2)]
+    assert actions(diff_plan(records, existing, {'B'})) == [('tag', 'B/0')]
@@ -0,0 +1,45 @@
+# Profiling of the API calls of a run: what is timed, and nothing left wrapped after.
+import json
+
+from dwall import instrument, query
+
+from conftest import rebars, run_script
+
+
+def api_calls(report, stage):
+    return dict((api, data["calls"]) for api, data in report["stages"][stage]["api"].items())
+
+
+def test_pipeline_calls_are_timed_by_stage(saved_doc, tmp_path, monkeypatch):
+    monkeypatch.setenv(instrument.ENVIRONMENT_VARIABLE, str(tmp_path))
+    run_script('Cage pipeline', saved_doc)
+    assert not instrument.is_enabled()
+    path, = tmp_path.glob('Cage pipeline *.json')
+    with open(str(path)) as f:
+        report = json.load(f)
+    assert report["stages"]["create"]["calls"] > 0
+    assert api_calls(report, "mirror") == {"ElementTransformUtils.MirrorElements": 3}
+    assert report["stages"]["commit"]["calls"] > 0
+    assert list(tmp_path.glob('Cage pipeline *.folded'))
+
+
+def test_id_iterator_steps_are_timed(saved_doc):
+    run_script('Cage pipeline', saved_doc)
+    recorder = instrument.enable()
+    try:
+        ids = list(query.iter_rebar_ids(saved_doc))
+    finally:
+        instrument.disable()
+    assert len(ids) == len(rebars(saved_doc))
+    assert api_calls(recorder.report(), "lookup") == {
+        "FilteredElementCollector.GetElementIdIterator": 1,
+        "FilteredElementIdIterator.MoveNext": len(ids) + 1,
+    }
+
+
+def test_disable_puts_the_api_back():
+    from Autodesk.Revit.DB import FilteredElementCollector
+    instrument.enable()
+    assert query.FilteredElementCollector is not FilteredElementCollector
+    instrument.disable()
+    assert query.FilteredElementCollector is FilteredElementCollector
@@ -0,0 +1,63 @@
+# Lap chains solved from the top of the panel down to a bottom level.
+import numpy as np
+import pytest
+
+from dwall.lapsolver import DEFAULT_LAP_RULE, chain_solutions, lap_length, solve_chain, to_layer_spec
+from dwall.spec import SpecError, default_spec, validate
+
+TOPS = [6400, 6400, 0, 1000]
+BOTTOMS = [-33000, -20000, -9000, -40000]
+
+
+def test_chain_reaches_the_bottom_with_laps_between_bars():
+    solution = solve_chain(6400, -33000, [12000])
+    levels = solution.levels
+    assert levels[0, 0] == 6400 and levels[-1, 1] == -33000
+    assert np.all(solution.lengths <= 12000)
+    for i, lap in enumerate(solution.laps):
+        assert levels[i + 1, 0] - levels[i, 1] == lap
+        assert lap == lap_length(DEFAULT_LAP_RULE, solution.bar_types[i], solution.bar_types[i + 1])
+    assert solution.waste == 12000 - solution.lengths[-1]
+
+
+def test_bar_types_follow_the_diameter_zones():
+    solution = solve_chain(0, -40000, [12000])
+    for bar_type, (start, _) in zip(solution.bar_types, solution.levels):
+        assert bar_type == ('H40' if -start < 17000 else 'H32')
+
+
+def test_vectorised_chains_match_the_single_chain_solver():
+    for solution, top, bottom in zip(chain_solutions(TOPS, BOTTOMS, 12000), TOPS, BOTTOMS):
+        expected = solve_chain(top, bottom, [12000])
+        assert solution.bar_types == expected.bar_types
+        np.testing.assert_allclose(solution.levels, expected.levels)
+        np.testing.assert_allclose(solution.laps, expected.laps)
+        assert solution.waste == expected.waste
+
+
+def test_least_waste_never_wastes_more():
+    fewest = solve_chain(6400, -33000, [6000, 9000, 12000])
+    least = solve_chain(6400, -33000, [6000, 9000, 12000], mode='min_waste')
+    assert least.waste <= fewest.waste and least.levels[-1, 1] == -33000
+
+
+@pytest.mark.parametrize('top, bottom, stock', [(0, 0, [12000]), (0, -1000, [900])])
+def test_unsolvable_chains_are_rejected(top, bottom, stock):
+    with pytest.raises(ValueError):
+        solve_chain(top, bottom, stock)
+
+
+def test_spec_layer_given_by_its_bottom_is_solved():
+    spec = default_spec()
+    spec['layers']['A'] = {'face': 1, 'row': 1, 'bottom': -33000, 'stock_length': 12000}
+    layers = validate(spec)[2]
+    solution, = chain_solutions([6400], [-33000], 12000)
+    assert layers['A'] == to_layer_spec(solution, 1, 1)
+
+
+def test_spec_layer_bottom_above_the_top_is_rejected():
+    spec = default_spec()
+    spec['layers']['A'] = {'face': 1, 'row': 1, 'bottom': 7000, 'stock_length': 12000}
+    with pytest.raises(SpecError) as raised:
+        validate(spec)
+    assert raised.value.errors == ["layers.A.bottom: must be below the top of the panel (6400 mm)"]
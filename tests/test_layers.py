@@ -0,0 +1,26 @@
+# The main layer scripts: each layer in one transaction, its bars as rebar sets.
+import pytest
+
+from dwall import fakeapi
+from dwall.geometry import DEFAULT_PANEL, LAYERS
+
+from conftest import rebars, run_script
+
+
+@pytest.mark.parametrize('letter', sorted(LAYERS))
+def test_layer_is_one_transaction_of_rebar_sets(letter):
+    doc = fakeapi.new_document()
+    run_script('Creation of main rebar layer {}'.format(letter), doc)
+    bars = rebars(doc)
+    assert doc.counters['transactions'] == 1
+    assert sorted(doc.GetElement(bar.GetTypeId()).Name for bar in bars) == sorted(LAYERS[letter].bar_types)
+    assert all(bar.NumberOfBarPositions == DEFAULT_PANEL.bar_count for bar in bars)
+
+
+def test_running_a_layer_again_changes_nothing():
+    doc = fakeapi.new_document()
+    run_script('Creation of main rebar layer A', doc)
+    before = sorted(bar.Id.IntegerValue for bar in rebars(doc))
+    run_script('Creation of main rebar layer A', doc)
+    assert sorted(bar.Id.IntegerValue for bar in rebars(doc)) == before
+    assert doc.counters['transactions'] == 1
@@ -0,0 +1,94 @@
+# The ledger file next to the model, and the entries it rejects.
+import os
+
+from Autodesk.Revit.DB import Transaction
+
+from dwall.ledger import Ledger, ledger_path
+from dwall.lookup import get_lookup
+
+from conftest import rebars, run_script
+
+
+def test_entries_survive_a_new_session(saved_doc):
+    run_script('Cage pipeline', saved_doc)
+    ledger = Ledger(saved_doc)
+    panels = get_lookup(saved_doc).walls('D-wall panel')
+    assert len(ledger) == len(rebars(saved_doc))
+    assert sorted(set(key.panel for key, _ in ledger.entries())) == [wall.Id.IntegerValue for wall in panels]
+    for wall in panels:
+        link = ledger.get(wall, 'EX', 0)
+        assert link is not None and link.GetHostId() == wall.Id
+
+
+def test_unchanged_ledger_is_not_rewritten(saved_doc):
+    run_script('Cage pipeline', saved_doc)
+    path = ledger_path(saved_doc)
+    modified = os.path.getmtime(path)
+    os.utime(path, (modified - 100, modified - 100))
+    run_script('Cage pipeline', saved_doc)
+    assert os.path.getmtime(path) == modified - 100
+
+
+def test_model_never_saved_has_no_ledger_file(tmp_path):
+    from dwall import fakeapi
+    ledger = Ledger(fakeapi.new_document())
+    ledger.record(1, 'A', 0, 0, 2)
+    ledger.save()
+    assert ledger.path is None and len(ledger) == 1
+
+
+def test_bar_of_another_panel_is_rejected(saved_doc):
+    run_script('Cage pipeline', saved_doc)
+    ledger = Ledger(saved_doc)
+    first, second = get_lookup(saved_doc).walls('D-wall panel')[:2]
+    ledger.record(first, 'EX', 0, 0, ledger.get(second, 'EX', 0).Id)
+    assert ledger.get(first, 'EX', 0) is None
+    assert ledger.entries(panel=first, layer='EX', index=0) == []
+    assert ledger.dirty
+
+
+def test_deleted_bar_is_dropped(saved_doc):
+    run_script('Cage pipeline', saved_doc)
+    ledger = Ledger(saved_doc)
+    wall = get_lookup(saved_doc).wall('D-wall panel')
+    transaction = Transaction(saved_doc, "Delete the mirrored EX-link")
+    transaction.Start()
+    saved_doc.Delete(ledger.get(wall, 'EX', 1).Id)
+    transaction.Commit()
+    assert ledger.get(wall, 'EX', 1) is None
+    assert ledger.get(wall, 'EX', 0) is not None
+
+
+def test_restore_puts_back_a_panel(saved_doc):
+    ledger = Ledger(saved_doc)
+    ledger.record(1, 'A', 0, 0, 10)
+    ledger.record(2, 'A', 0, 0, 20)
+    entries = ledger.snapshot(1)
+    ledger.record(1, 'A', 0, 0, 11)
+    ledger.record(1, 'A', 1, 0, 12)
+    ledger.restore(1, entries)
+    assert ledger.snapshot(1) == entries
+    assert len(ledger) == 2
+
+
+def test_copies_are_recorded_against_their_source(saved_doc, monkeypatch):
+    # CopyElements does not promise the order of the ids it returns
+    from dwall import fakeapi
+    from dwall.pipeline import run_pipeline
+    copy = fakeapi.FakeDocument._copy
+    monkeypatch.setattr(fakeapi.FakeDocument, '_copy', lambda doc, ids, transform: copy(doc, ids, transform)[::-1])
+    run_pipeline(saved_doc, ('ex-link', 'mirror', 'copy'), use_layout=False)
+    ledger = Ledger(saved_doc)
+
+    def plan_position(rebar):
+        start = rebar.curves[0].GetEndPoint(0)
+        return round(start.X, 6), round(start.Y, 6)
+
+    for wall in get_lookup(saved_doc).walls('D-wall panel'):
+        link, mirrored = ledger.get(wall, 'EX', 0), ledger.get(wall, 'EX', 1)
+        assert plan_position(link) != plan_position(mirrored)
+        for index, source in ((0, link), (1, mirrored)):
+            copies = [rebar for key, rebar in ledger.entries(panel=wall, layer='EX', index=index) if key.copy]
+            assert copies
+            for copied in copies:
+                assert plan_position(copied) == plan_position(source)
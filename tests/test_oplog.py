@@ -0,0 +1,92 @@
+# The operation log reads back exactly what was written, in both encodings.
+import pytest
+
+from dwall.geometry import DEFAULT_PANEL
+from dwall.oplog import LOG_VERSION, panel_groups, read_log, write_log
+from dwall.planner import site_operations
+from dwall.spec import default_spec
+
+# Revit 2024 element ids are 64-bit
+PANELS = [(100006, DEFAULT_PANEL), (2 ** 40 + 7, DEFAULT_PANEL._replace(length=7000))]
+
+
+def operations():
+    return list(site_operations(default_spec(), PANELS))
+
+
+@pytest.mark.parametrize('name', ['site.dwop', 'site.jsonl'])
+def test_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    written = operations()
+    assert write_log(path, written) == len(written)
+    assert list(read_log(path)) == written
+
+
+def test_binary_log_is_detected_by_its_content(tmp_path):
+    path = str(tmp_path / 'site.log')
+    write_log(path, operations(), binary=True)
+    assert list(read_log(path)) == operations()
+
+
+def test_truncated_binary_log(tmp_path):
+    path = tmp_path / 'site.dwop'
+    write_log(str(path), operations())
+    path.write_bytes(path.read_bytes()[:-5])
+    with pytest.raises(ValueError):
+        list(read_log(str(path)))
+
+
+def test_log_of_another_version(tmp_path):
+    path = tmp_path / 'site.jsonl'
+    path.write_text('{{"op": "log", "version": {}}}\n'.format(LOG_VERSION - 1))
+    with pytest.raises(ValueError):
+        list(read_log(str(path)))
+
+
+def test_unknown_operation(tmp_path):
+    with pytest.raises(ValueError):
+        write_log(str(tmp_path / 'site.dwop'), [{"op": "delete", "panel": 1}])
+
+
+def test_panel_groups():
+    groups = list(panel_groups(operations()))
+    assert [panel for panel, _ in groups] == [100006, 2 ** 40 + 7, None]
+    assert all(operation["op"] == "param" for operation in groups[-1][1])
+
+
+@pytest.mark.parametrize('name', ['site.dwop', 'site.jsonl'])
+def test_empty_log(tmp_path, name):
+    path = str(tmp_path / name)
+    assert write_log(path, []) == 0
+    assert list(read_log(path)) == []
+
+
+@pytest.mark.parametrize('content', [b'', b'not a log\n', b'DWOP\x01\x00'])
+def test_file_that_is_not_a_log(tmp_path, content):
+    path = tmp_path / 'site.log'
+    path.write_bytes(content)
+    with pytest.raises(ValueError):
+        list(read_log(str(path)))
+
+
+def test_unknown_operation_code(tmp_path):
+    path = tmp_path / 'site.dwop'
+    write_log(str(path), [])
+    path.write_bytes(path.read_bytes() + b'\x09')
+    with pytest.raises(ValueError):
+        list(read_log(str(path)))
+
+
+@pytest.mark.parametrize('name', ['site.dwop', 'site.jsonl'])
+def test_values_are_kept_exactly(tmp_path, name):
+    path = str(tmp_path / name)
+    written = [{"op": "bar", "panel": 2 ** 62, "layer": "Ä", "index": 65535, "type": "H40",
+                "points": [[0.1, -1e-300, 1e300]], "count": 2 ** 32 - 1, "spacing": [1 / 3.0, 0.0, -0.0]},
+               {"op": "param", "type": "H40", "name": "Masse linéique", "value": 9.864, "unit": "kg/m"}]
+    write_log(path, written)
+    assert list(read_log(path)) == written
+
+
+def test_panel_groups_split_on_every_change_of_panel():
+    log = [{"op": "mirror", "panel": panel, "layer": "EX", "index": 0, "to": 1} for panel in (1, 1, 2, 1)]
+    assert [(panel, len(group)) for panel, group in panel_groups(log)] == [(1, 2), (2, 1), (1, 1)]
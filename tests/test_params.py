@@ -0,0 +1,55 @@
+# Bulk parameter writes: only what changed is written, in one transaction.
+from Autodesk.Revit.DB import FilteredElementCollector, StorageType, UnitTypeId
+from Autodesk.Revit.DB.Structure import RebarBarType
+
+from dwall import fakeapi
+from dwall.params import ParameterSync, sync_parameter
+
+
+def bar_types(doc):
+    return sorted(FilteredElementCollector(doc).OfClass(RebarBarType), key=lambda bar_type: bar_type.Name)
+
+
+def stored(elements, name='Unit weight'):
+    return [element.LookupParameter(name).AsDouble() for element in elements]
+
+
+def test_second_sync_writes_nothing():
+    doc = fakeapi.new_document(panels=0)
+    types = bar_types(doc)
+    weights = [float(i + 1) for i in range(len(types))]
+    assert sync_parameter(doc, types, 'Unit weight', weights, UnitTypeId.KilogramsPerMeter) == \
+        ParameterSync(len(types), 0, 0)
+    assert stored(types) == [weight * 0.3048 for weight in weights]
+    transactions = doc.counters['transactions']
+    weights[0] *= 1 + 1e-9
+    assert sync_parameter(doc, types, 'Unit weight', weights, UnitTypeId.KilogramsPerMeter) == \
+        ParameterSync(0, len(types), 0)
+    assert doc.counters['transactions'] == transactions
+
+
+def test_only_changed_values_are_written():
+    doc = fakeapi.new_document(panels=0)
+    types = bar_types(doc)
+    sync_parameter(doc, types, 'Unit weight', [1.0] * len(types))
+    writes = doc.counters['Parameter.Set']
+    assert sync_parameter(doc, types, 'Unit weight', [2.0] + [1.0] * (len(types) - 1)) == \
+        ParameterSync(1, len(types) - 1, 0)
+    assert doc.counters['Parameter.Set'] == writes + 1
+
+
+def test_read_only_and_missing_parameters_are_counted():
+    doc = fakeapi.new_document(panels=0)
+    types = bar_types(doc)
+    doc.add_parameter(types[0], 'Unit weight', StorageType.Double, 5.0).IsReadOnly = True
+    # A bar type without the shared parameter
+    types.append(doc.add_element(fakeapi.RebarBarType(doc, 'H50', 50 / 304.8)))
+    assert sync_parameter(doc, types, 'Unit weight', [1.0] * len(types)) == ParameterSync(len(types) - 2, 0, 2)
+    assert stored(types[:1]) == [5.0]
+
+
+def test_unknown_parameter_writes_nothing():
+    doc = fakeapi.new_document(panels=0)
+    types = bar_types(doc)
+    assert sync_parameter(doc, types, 'Mass', [1.0] * len(types)) == ParameterSync(0, 0, len(types))
+    assert doc.counters['transactions'] == 0
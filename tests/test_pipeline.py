@@ -0,0 +1,29 @@
+# The stages of dwall.pipeline and what they leave alone.
+import os
+
+import pytest
+
+from dwall import pipeline
+from dwall.ledger import get_ledger, ledger_path
+from dwall.pipeline import run_pipeline
+from dwall.spec import default_spec
+
+from conftest import rebars, run_script
+
+
+def test_spec_without_ex_link_mirrors_nothing(saved_doc):
+    run_script('Creation of EX-link', saved_doc)
+    spec = default_spec()
+    spec["ex_link"] = None
+    run_pipeline(saved_doc, ('mirror', 'copy'), spec)
+    assert len(rebars(saved_doc)) == 1
+
+
+@pytest.mark.parametrize('function', ['create_ex_link_rebar', 'sync_plan'])
+def test_failed_stage_rolls_back_the_run(saved_doc, monkeypatch, function):
+    monkeypatch.setattr(pipeline, function, lambda *args, **kwargs: None)
+    with pytest.raises(RuntimeError):
+        run_pipeline(saved_doc)
+    assert rebars(saved_doc) == []
+    assert len(get_ledger(saved_doc)) == 0
+    assert not os.path.exists(ledger_path(saved_doc))
@@ -0,0 +1,55 @@
+# Plans cached by their spec: shared by identical panels, dropped when the code changes.
+import os
+
+import numpy as np
+
+from dwall import plancache
+from dwall.plancache import PlanCache, pack_plan, spec_key, unpack_plan
+from dwall.spec import compile_spec, default_spec
+
+
+def test_same_parameters_give_the_same_key():
+    spec = default_spec()
+    other = default_spec()
+    other['panel']['length'] = 6000.0000000001
+    assert spec_key(spec) == spec_key(other)
+    other['panel']['length'] = 6100
+    assert spec_key(spec) != spec_key(other)
+
+
+def test_key_changes_with_the_code(monkeypatch):
+    key = spec_key(default_spec())
+    monkeypatch.setattr(plancache, 'CODE_VERSION', 'another version')
+    assert spec_key(default_spec()) != key
+
+
+def test_packed_plan_unpacks_to_the_compiled_plan():
+    plan = compile_spec(default_spec())
+    unpacked = unpack_plan(pack_plan(plan))
+    assert unpacked["host"] == plan["host"] and dict(unpacked["panel"]) == dict(plan["panel"])
+    assert len(unpacked["records"]) == len(plan["records"])
+    for record, expected in zip(unpacked["records"], plan["records"]):
+        assert dict(record, points=None) == dict(expected, points=None)
+        np.testing.assert_allclose(record["points"], expected["points"])
+
+
+def test_plan_is_compiled_once_and_read_back_from_disk(tmp_path):
+    spec = default_spec()
+    plan, hit = PlanCache(str(tmp_path)).get_or_compile(spec)
+    assert not hit
+    cache = PlanCache(str(tmp_path))
+    cached, hit = cache.get_or_compile(spec)
+    assert hit and cache.hits == 1 and len(cached["records"]) == len(plan["records"])
+
+
+def test_least_recently_used_plans_are_evicted(tmp_path):
+    cache = PlanCache(str(tmp_path))
+    specs = [default_spec() for _ in range(3)]
+    for i, spec in enumerate(specs):
+        spec['panel']['length'] = 6000 + 100 * i
+        cache.get_or_compile(spec)
+        # The last use of a plan is the time of its file
+        os.utime(cache._path(spec_key(spec)), (1000 + i, 1000 + i))
+    cache.max_bytes = cache.size() - 1
+    cache.evict()
+    assert len(cache.entries()) == 2 and spec_key(specs[0]) not in cache
@@ -0,0 +1,29 @@
+# Headless planning of a site: the pool of workers writes the log of the serial run.
+import pytest
+
+from dwall.geometry import DEFAULT_PANEL
+from dwall.planner import pack_operations, panel_operations, plan_panels, plan_site, save_site, unpack_operations
+from dwall.spec import default_spec
+
+# Some panels share their parameters, so they are planned once
+PANELS = [(100006 + i, DEFAULT_PANEL._replace(length=5000 + 250 * (i % 7), thickness=800 + 200 * (i % 2)))
+          for i in range(24)]
+
+
+@pytest.mark.parametrize('log_name', ['site.dwop', 'site.jsonl'])
+def test_parallel_log_is_the_serial_log(tmp_path, log_name):
+    site = str(tmp_path / 'site.json')
+    save_site(site, default_spec(), PANELS)
+    serial, parallel = tmp_path / ('serial-' + log_name), tmp_path / ('parallel-' + log_name)
+    assert plan_site(site, str(serial)) == plan_site(site, str(parallel), workers=3)
+    assert serial.read_bytes() == parallel.read_bytes()
+
+
+def test_parallel_plans_are_the_serial_plans():
+    panels = [panel for _, panel in PANELS]
+    assert plan_panels(default_spec(), panels, workers=3) == plan_panels(default_spec(), panels)
+
+
+def test_packed_operations_unpack_to_the_same():
+    plans = [panel_operations(default_spec(), panel) for _, panel in PANELS[:3]]
+    assert unpack_operations(*pack_operations(plans), size=3) == plans
@@ -0,0 +1,33 @@
+# Rebar queries narrowed by type, host and panel outline on the native side.
+from dwall.lookup import get_lookup
+from dwall.query import iter_rebar_ids
+
+from conftest import rebars, run_script
+
+
+def ids_of(elements):
+    return sorted(element.Id.IntegerValue for element in elements)
+
+
+def test_filters_match_a_scan(saved_doc):
+    run_script('Cage pipeline', saved_doc)
+    everything = rebars(saved_doc)
+    lookup = get_lookup(saved_doc)
+    link_type = lookup.bar_type('H20').Id
+    first, second = lookup.walls('D-wall panel')[:2]
+
+    def found(**filters):
+        return sorted(element_id.IntegerValue for element_id in iter_rebar_ids(saved_doc, **filters))
+
+    assert found() == ids_of(everything)
+    assert found(type_id=link_type) == ids_of(r for r in everything if r.GetTypeId() == link_type)
+    assert found(host=first) == ids_of(r for r in everything if r.GetHostId() == first.Id)
+    assert found(panel=second) == ids_of(r for r in everything if r.GetHostId() == second.Id)
+    assert found(type_id=link_type, host=first) == ids_of(
+        r for r in everything if r.GetHostId() == first.Id and r.GetTypeId() == link_type)
+    assert found(host=second, panel=first) == []
+
+
+def test_host_without_rebar_finds_nothing(saved_doc):
+    wall = saved_doc.add_wall(start=(1000, 1000, 0))
+    assert list(iter_rebar_ids(saved_doc, host=wall)) == []
@@ -0,0 +1,84 @@
+# Bugs found in review: a rolled back replay chunk left in the ledger, a batch rerun
+# doubling the rebar, and walls added between runs missed by the lookup cache.
+import pytest
+
+from dwall import batch, pipeline, replay
+from dwall.geometry import DEFAULT_PANEL
+from dwall.ledger import get_ledger
+from dwall.lookup import LookupCache, get_lookup
+from dwall.planner import site_operations
+from dwall.spec import default_spec
+
+from conftest import rebars, run_script
+
+
+def site_log(doc):
+    walls = get_lookup(doc).walls('D-wall panel')
+    return walls, list(site_operations(default_spec(), [(wall.Id.IntegerValue, DEFAULT_PANEL) for wall in walls]))
+
+
+def test_rolled_back_replay_chunk_is_not_in_the_ledger(saved_doc, monkeypatch):
+    walls, operations = site_log(saved_doc)
+    create = replay.replay_record
+
+    def failing(doc, host, bar_types, record, frame):
+        if host.Id == walls[0].Id and record["layer"] == 'E':
+            raise RuntimeError("cannot create the bar")
+        return create(doc, host, bar_types, record, frame)
+
+    monkeypatch.setattr(replay, 'replay_record', failing)
+    assert replay.replay_log(saved_doc, operations, chunk_size=1) == (2, 1)
+    ledger = get_ledger(saved_doc)
+    assert sorted(set(key.panel for key, _ in ledger.entries())) == [wall.Id.IntegerValue for wall in walls[1:]]
+    assert len(ledger) == len(rebars(saved_doc))
+
+    # Replayed again, the failed panel is completed and nothing else changes
+    monkeypatch.setattr(replay, 'replay_record', create)
+    assert replay.replay_log(saved_doc, operations, chunk_size=1) == (3, 0)
+    assert len(ledger) == len(rebars(saved_doc)) == 45
+
+
+def test_replay_skips_panel_with_missing_bar_type(saved_doc):
+    walls, operations = site_log(saved_doc)
+    for operation in operations:
+        if operation.get("panel") == walls[1].Id.IntegerValue and operation["op"] == 'bar':
+            operation["type"] = 'H99'
+    assert replay.replay_log(saved_doc, operations) == (2, 1)
+    assert set(rebar.GetHostId() for rebar in rebars(saved_doc)) == set([walls[0].Id, walls[2].Id])
+
+
+def test_batch_rerun_adds_nothing(saved_doc):
+    batch.run_batch(saved_doc)
+    built = len(rebars(saved_doc))
+    assert built == 45
+    report = batch.run_batch(saved_doc)
+    assert [status for _, status, _, _ in report] == ['done'] * 3
+    assert len(rebars(saved_doc)) == built
+
+
+def test_batch_reports_failed_panel(saved_doc, monkeypatch):
+    monkeypatch.setattr(pipeline, 'create_ex_link_rebar', lambda *args: None)
+    report = batch.run_batch(saved_doc)
+    assert [status for _, status, _, _ in report] == [
+        'failed: the EX-link of panel {} was not created'.format(panel) for panel, _, _, _ in report]
+    assert rebars(saved_doc) == []
+    assert len(get_ledger(saved_doc)) == 0
+
+
+def test_wall_added_between_runs_is_built(saved_doc):
+    run_script('Cage pipeline', saved_doc)
+    saved_doc.add_wall('D-wall panel', start=(0, 100, 0))
+    run_script('Cage pipeline', saved_doc)
+    walls = get_lookup(saved_doc).walls('D-wall panel')
+    assert len(walls) == 4
+    assert all(get_ledger(saved_doc).get(wall, 'EX', 0) is not None for wall in walls)
+
+
+@pytest.mark.parametrize('name', ['No such wall', 'D-wall panel'])
+def test_lookup_miss_does_not_rebuild(name):
+    from dwall import fakeapi
+    lookup = LookupCache(fakeapi.new_document())
+    lookup.walls(name)
+    lookup.walls('No such wall')
+    lookup.bar_type('H99')
+    assert lookup.builds == 2
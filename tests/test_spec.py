@@ -0,0 +1,80 @@
+# Validation of the cage specification: every problem is reported, with where it is.
+import pytest
+
+from dwall.spec import SpecError, default_spec, validate
+
+
+def errors_of(spec):
+    with pytest.raises(SpecError) as raised:
+        validate(spec)
+    return raised.value.errors
+
+
+def test_default_spec_is_valid():
+    host, panel, layers, link, link_type, mirror, shape = validate(default_spec())
+    assert host == 'D-wall panel' and sorted(layers) == ['A', 'B', 'D', 'E']
+    assert link.count == 243 and link_type == 'H20' and mirror
+
+
+@pytest.mark.parametrize('section, field, value', [
+    ('panel', 'bar_count', 2.5),
+    ('panel', 'bar_count', True),
+    ('ex_link', 'count', 242.5),
+    ('ex_link', 'count', False),
+])
+def test_counts_must_be_whole_numbers(section, field, value):
+    spec = default_spec()
+    spec[section][field] = value
+    errors = errors_of(spec)
+    assert len(errors) == 1 and errors[0].startswith("{}.{}: expected a".format(section, field))
+
+
+def test_whole_float_counts_are_accepted_as_integers():
+    spec = default_spec()
+    spec['panel']['bar_count'] = 20.0
+    spec['ex_link']['count'] = 243.0
+    _, panel, _, link, _, _, _ = validate(spec)
+    assert type(panel.bar_count) is int and type(link.count) is int
+
+
+def test_cover_must_fit_in_the_panel():
+    spec = default_spec()
+    spec['panel']['cover'] = 500
+    assert errors_of(spec) == [
+        "panel.cover: cover of 500 mm on both faces leaves no room in a panel 1000 mm thick"]
+
+
+@pytest.mark.parametrize('angle', [0, 90, 135])
+def test_bend_angle_is_within_range(angle):
+    spec = default_spec()
+    spec['ex_link']['bend_angle'] = angle
+    errors = errors_of(spec)
+    assert len(errors) == 1 and errors[0].startswith("ex_link.bend_angle:")
+
+
+def test_every_problem_is_reported():
+    spec = default_spec()
+    spec['host'] = ''
+    spec['panel']['thickness'] = -1
+    spec['layers']['A']['laps'] = [1140, 995]
+    spec['layers']['B']['bar_types'] = ['H40', 'H41']
+    spec['ex_link']['type'] = 'H21'
+    del spec['ex_link']['spacing']
+    errors = errors_of(spec)
+    assert errors[0].startswith("host:")
+    assert "panel.thickness: must be positive, got -1" in errors
+    assert "layers.A: needs one lap less than there are bars" in errors
+    assert "layers.B.bar_types[1]: unknown bar type 'H41'" in errors
+    assert "ex_link: missing 'spacing'" in errors
+
+
+def test_lap_not_shorter_than_its_bar_is_rejected():
+    spec = default_spec()
+    spec['layers']['E']['laps'] = [9300]
+    assert errors_of(spec) == ["layers.E.laps[0]: lap of 9300 mm is not shorter than the bar above"]
+
+
+def test_spec_without_ex_link_is_valid():
+    spec = default_spec()
+    spec['ex_link'] = None
+    assert validate(spec)[3:] == (None, None, False, None)
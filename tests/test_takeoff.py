@@ -0,0 +1,45 @@
+# Steel takeoff from placement plans and from the bars in the model.
+import numpy as np
+
+from dwall.ledger import Ledger
+from dwall.spec import compile_spec, default_spec
+from dwall.takeoff import (UNIT_WEIGHTS, bending_schedule, concat_rows, ledger_rows, plan_rows, takeoff,
+                           unit_weight, write_csv)
+
+from conftest import run_script
+
+
+def test_unit_weights_come_from_the_table_or_the_diameter():
+    assert abs(unit_weight(40) - UNIT_WEIGHTS['H40']) < 0.01
+    assert abs(unit_weight(10) - 0.617) < 0.001
+
+
+def test_plan_takeoff_totals():
+    rows = plan_rows(compile_spec(default_spec()), panel=7)
+    table = takeoff(rows, ('diameter',))
+    assert table['diameter'].tolist() == [20.0, 32.0, 40.0]
+    assert table['bars'].sum() == rows['count'].sum()
+    expected = sum(length * count / 1000 * UNIT_WEIGHTS[bar_type] for length, count, bar_type in
+                   zip(rows['length'], rows['count'], rows['type']))
+    assert np.isclose(table['weight_kg'].sum(), expected)
+
+
+def test_panels_are_summed_separately():
+    rows = plan_rows(compile_spec(default_spec()))
+    site = concat_rows([rows, plan_rows(compile_spec(default_spec()), panel=1)])
+    table = takeoff(site, ('panel',))
+    assert table['panel'].tolist() == [0, 1]
+    assert np.allclose(table['weight_kg'], takeoff(rows, ('panel',))['weight_kg'][0])
+
+
+def test_model_takeoff_matches_the_plan(saved_doc, tmp_path):
+    run_script('Cage pipeline', saved_doc)
+    model = takeoff(ledger_rows(Ledger(saved_doc)), ('layer', 'diameter'))
+    plan = takeoff(plan_rows(compile_spec(default_spec())), ('layer', 'diameter'))
+    assert model['layer'].tolist() == plan['layer'].tolist()
+    assert model['bars'].tolist() == [3 * bars for bars in plan['bars'].tolist()]
+    assert np.allclose(model['weight_kg'], 3 * plan['weight_kg'])
+    path = tmp_path / 'schedule.csv'
+    write_csv(bending_schedule(ledger_rows(Ledger(saved_doc))), str(path))
+    header = path.read_text().splitlines()[0]
+    assert header == 'panel,layer,index,type,diameter,segments,cut_length,bars,length_m,weight_kg'
@@ -0,0 +1,51 @@
+# Chunked transactions: a failing chunk is rolled back alone, the rest is kept.
+import pytest
+
+from Autodesk.Revit.DB import FilteredElementCollector
+
+from dwall import fakeapi
+from dwall.transactions import TransactionScheduler
+
+
+def walls(doc):
+    return sorted(wall.Name for wall in FilteredElementCollector(doc).OfClass(fakeapi.Wall))
+
+
+def add_walls(doc, fail_on=None):
+    def apply(chunk):
+        added = [doc.add_wall(name).Id for name in chunk]
+        if fail_on in chunk:
+            raise ValueError("cannot add " + fail_on)
+        return added
+    return apply
+
+
+def test_failed_chunk_is_rolled_back_alone():
+    doc = fakeapi.new_document(panels=0)
+    names = ["wall {}".format(i) for i in range(10)]
+    scheduler = TransactionScheduler(doc, "Add walls", chunk_size=4)
+    ids = scheduler.run(names, add_walls(doc, fail_on="wall 5"))
+    assert [i is None for i in ids] == [False] * 4 + [True] * 4 + [False] * 2
+    assert walls(doc) == sorted(names[:4] + names[8:])
+    assert [(timing.first, timing.size) for timing in scheduler.timings] == [(0, 4), (4, 4), (8, 2)]
+    failed, = scheduler.failed
+    assert failed.name == "Add walls 5-8" and failed.error == "cannot add wall 5"
+    assert doc.counters['transaction groups'] == 1 and doc.counters['rollbacks'] == 1
+
+
+def test_wrong_number_of_results_fails_the_chunk():
+    doc = fakeapi.new_document(panels=0)
+    ids = TransactionScheduler(doc, "Add walls", chunk_size=0).run(
+        ["a", "b"], lambda chunk: [doc.add_wall(chunk[0]).Id])
+    assert ids == [None, None] and walls(doc) == []
+
+
+def test_error_in_a_group_rolls_back_every_chunk():
+    doc = fakeapi.new_document(panels=0)
+    with pytest.raises(RuntimeError):
+        with TransactionScheduler(doc, "Add walls", chunk_size=1) as scheduler:
+            scheduler.run(["a", "b"], add_walls(doc))
+            scheduler.run(["c"], add_walls(doc), name="More walls")
+            raise RuntimeError("stop")
+    assert walls(doc) == []
+    assert [timing.name for timing in scheduler.timings] == ["Add walls 1-1", "Add walls 2-2", "More walls 1-1"]